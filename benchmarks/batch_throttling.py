@@ -0,0 +1,93 @@
+"""Benchmark batch_async_get_data_points when some requests are throttled.
+
+A local stub server answers /v2/data, returning 429 a few times for a fraction
+of the requested items. The same batch is run twice: once with the retry
+backoff blocking the IOLoop (the behaviour before backoff used gen.sleep), and
+once with the non-blocking backoff.
+
+    python benchmarks/batch_throttling.py --requests 200 --throttled-fraction 0.1
+"""
+
+import argparse
+import time
+
+from tornado import gen
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from groclient import GroClient
+from stub_server import StubServer, use_stub_server
+
+
+@gen.coroutine
+def blocking_sleep(seconds):
+    time.sleep(seconds)
+
+
+def run_batch(num_requests, throttled_items, args):
+    with StubServer(
+        latency=args.latency,
+        throttled_items=throttled_items,
+        throttles_per_item=args.throttles_per_item,
+    ) as server:
+        client = use_stub_server(GroClient(server.api_host, "benchmark-token"))
+        client.get_logger().setLevel("ERROR")
+        selections = [
+            {
+                "metric_id": 860032,
+                "item_id": item_id,
+                "region_id": 1215,
+                "frequency_id": 9,
+                "source_id": 2,
+            }
+            for item_id in range(num_requests)
+        ]
+        start = time.time()
+        results = client.batch_async_get_data_points(selections)
+        elapsed = time.time() - start
+        failed = sum(1 for result in results if isinstance(result, Exception))
+        return elapsed, server.stats["requests"], failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--throttled-fraction", type=float, default=0.1)
+    parser.add_argument("--throttles-per-item", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    step = (
+        max(1, int(round(1 / args.throttled_fraction)))
+        if args.throttled_fraction
+        else 0
+    )
+    throttled_items = set(range(0, args.requests, step)) if step else set()
+    print(
+        "{} requests, {} throttled {} time(s) each, {:.0f} ms server latency".format(
+            args.requests,
+            len(throttled_items),
+            args.throttles_per_item,
+            args.latency * 1000,
+        )
+    )
+    for label, sleep in [("blocking backoff", blocking_sleep), ("async backoff", None)]:
+        if sleep is None:
+            elapsed, served, failed = run_batch(args.requests, throttled_items, args)
+        else:
+            with patch("groclient.client.gen.sleep", sleep):
+                elapsed, served, failed = run_batch(
+                    args.requests, throttled_items, args
+                )
+        print(
+            "{:>17}: {:6.2f} s, {:7.1f} series/s ({} HTTP requests, {} failed)".format(
+                label, elapsed, args.requests / elapsed, served, failed
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark assembling the get_df DataFrame from many series.
+
+Frames for synthetic series are added to a GroClient the way get_df adds each
+response, then materialized. The loop that concatenated every new frame into
+the accumulated one (what add_points_to_df did before) is timed alongside the
+single concat, for increasing numbers of series. Time per series should stay
+flat for the single concat and grow linearly for the loop.
+
+    python benchmarks/get_df_assembly.py --series 250 500 1000 2000 --points 365
+"""
+
+import argparse
+import time
+
+import pandas
+
+from groclient import GroClient, lib
+
+
+def make_list_of_series(region_id, num_points):
+    dates = pandas.date_range("2000-01-01", periods=num_points, freq="D")
+    dates = dates.strftime("%Y-%m-%dT00:00:00.000Z")
+    return [
+        {
+            "series": {
+                "metricId": 860032,
+                "itemId": 274,
+                "regionId": region_id,
+                "partnerRegionId": 0,
+                "frequencyId": 1,
+                "unitId": 14,
+            },
+            "data": [
+                [date, date, float(i), None, 14, {}, date]
+                for i, date in enumerate(dates)
+            ],
+        }
+    ]
+
+
+def concat_per_series(frames):
+    data_frame = pandas.DataFrame()
+    for tmp in frames:
+        tmp = tmp.copy()
+        tmp["source_id"] = 2
+        for column in ["end_date", "start_date", "reporting_date", "available_date"]:
+            tmp[column] = pandas.to_datetime(tmp[column])
+        if data_frame.empty:
+            data_frame = tmp
+        else:
+            data_frame = pandas.concat([data_frame, tmp])
+    return data_frame
+
+
+def concat_once(frames):
+    client = GroClient("localhost", "benchmark-token")
+    for tmp in frames:
+        client._add_data_frame(None, {"source_id": 2}, tmp.copy())
+    client._concat_pending_frames()
+    return client._data_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--series", type=int, nargs="+", default=[250, 500, 1000, 2000])
+    parser.add_argument("--points", type=int, default=365)
+    args = parser.parse_args()
+
+    series = make_list_of_series(1215, args.points)
+    frame = lib.list_of_series_to_df(series)
+    print("{} points per series".format(args.points))
+    for num_series in args.series:
+        frames = [frame] * num_series
+        for label, assemble in [
+            ("concat per series", concat_per_series),
+            ("single concat", concat_once),
+        ]:
+            start = time.time()
+            data_frame = assemble(frames)
+            elapsed = time.time() - start
+            print(
+                "{:>5} series, {:>17}: {:6.2f} s, {:5.2f} ms/series ({} rows)".format(
+                    num_series,
+                    label,
+                    elapsed,
+                    1000 * elapsed / num_series,
+                    len(data_frame),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
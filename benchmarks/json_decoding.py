@@ -0,0 +1,110 @@
+"""Benchmark JSON decoding backends on API response payloads.
+
+Each payload is decoded with every installed backend of groclient.decoding.
+Pass recorded responses, e.g. saved with
+`curl -H "Authorization: Bearer $GROAPI_TOKEN" "https://api.gro-intelligence.com/v2/data?..."`,
+as arguments. Without arguments, synthetic payloads shaped like a /v2/data
+response for daily series and a /v2/geocentres?includeGeojson=true response
+are used.
+
+    python benchmarks/json_decoding.py data.json geocentres.json --repeat 5
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+from groclient import decoding
+
+
+def make_data_payload(num_series=20, num_points=3650):
+    random.seed(0)
+    series_list = []
+    for region_id in range(num_series):
+        series_list.append(
+            {
+                "series": {
+                    "metricId": 2100031,
+                    "itemId": 2039,
+                    "regionId": 1000 + region_id,
+                    "partnerRegionId": 0,
+                    "frequencyId": 1,
+                    "unitId": 2,
+                    "belongsTo": {"regionId": 1000 + region_id},
+                },
+                "data": [
+                    [
+                        "2010-01-{:02d}T00:00:00.000Z".format(day % 28 + 1),
+                        "2010-01-{:02d}T00:00:00.000Z".format(day % 28 + 1),
+                        random.random() * 100,
+                        None,
+                        2,
+                        {},
+                        "2010-02-01T00:00:00.000Z",
+                    ]
+                    for day in range(num_points)
+                ],
+            }
+        )
+    return json.dumps(series_list).encode("utf-8")
+
+
+def make_geocentres_payload(num_regions=200, num_vertices=2000):
+    random.seed(0)
+    regions = []
+    for region_id in range(num_regions):
+        ring = [
+            [random.uniform(-180, 180), random.uniform(-90, 90)]
+            for _ in range(num_vertices)
+        ]
+        regions.append(
+            {
+                "regionId": region_id,
+                "regionName": "Region {}".format(region_id),
+                "centreLat": random.uniform(-90, 90),
+                "centreLon": random.uniform(-180, 180),
+                "geojson": {"type": "MultiPolygon", "coordinates": [[ring]]},
+            }
+        )
+    return json.dumps({"data": regions}).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("payloads", nargs="*", help="recorded JSON responses")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.payloads:
+        payloads = []
+        for path in args.payloads:
+            with open(path, "rb") as payload_file:
+                payloads.append((os.path.basename(path), payload_file.read()))
+    else:
+        payloads = [
+            ("synthetic v2/data", make_data_payload()),
+            ("synthetic v2/geocentres", make_geocentres_payload()),
+        ]
+
+    for name, payload in payloads:
+        print("{} ({:.1f} MB)".format(name, len(payload) / 1e6))
+        timings = []
+        for backend in decoding.BACKENDS:
+            decoding.set_backend(backend)
+            start = time.time()
+            for _ in range(args.repeat):
+                decoding.loads(payload)
+            timings.append((backend, (time.time() - start) / args.repeat))
+        baseline = dict(timings)["json"]
+        for backend, elapsed in timings:
+            print(
+                "  {:>9}: {:7.1f} ms, {:4.1f}x json".format(
+                    backend, 1000 * elapsed, baseline / elapsed
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""A local stand-in for the Gro API, used by the benchmarks in this directory.
+
+The stub serves canned responses over plain HTTP on localhost. Clients are
+pointed at it with :func:`use_stub_server`, which rewrites the https:// URLs
+the client builds to http:// so no certificates are needed.
+"""
+
+import asyncio
+import json
+import threading
+
+from tornado.httpserver import HTTPServer
+from tornado.netutil import bind_sockets
+from tornado.web import Application, RequestHandler
+
+
+def make_list_of_series(item_id, num_points=2):
+    """A small /v2/data response body for the given item."""
+    return [
+        {
+            "series": {
+                "metricId": 860032,
+                "itemId": item_id,
+                "regionId": 1215,
+                "partnerRegionId": 0,
+                "frequencyId": 9,
+                "unitId": 14,
+                "belongsTo": {
+                    "metricId": 860032,
+                    "itemId": item_id,
+                    "regionId": 1215,
+                    "frequencyId": 9,
+                    "sourceId": 2,
+                },
+            },
+            "data": [
+                [
+                    "{}-01-01T00:00:00.000Z".format(2000 + year),
+                    "{}-12-31T00:00:00.000Z".format(2000 + year),
+                    year * 100.0,
+                    None,
+                    14,
+                    {},
+                ]
+                for year in range(num_points)
+            ],
+        }
+    ]
+
+
+class DataHandler(RequestHandler):
+    """Serve /v2/data, throttling selected items a fixed number of times."""
+
+    def initialize(self, stats, latency, throttled_items, throttles_per_item):
+        self.stats = stats
+        self.latency = latency
+        self.throttled_items = throttled_items
+        self.throttles_per_item = throttles_per_item
+
+    async def get(self):
+        item_id = int(self.get_argument("itemId", 0))
+        self.stats["requests"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        throttled = self.stats["throttled"].get(item_id, 0)
+        if item_id in self.throttled_items and throttled < self.throttles_per_item:
+            self.stats["throttled"][item_id] = throttled + 1
+            self.set_status(429)
+            self.write({"error": "Too Many Requests"})
+            return
+        self.write(json.dumps(make_list_of_series(item_id)))
+
+
+class StubServer(object):
+    """Run the stub API on a background thread.
+
+    Parameters
+    ----------
+    latency : float
+        Seconds each request takes to be answered.
+    throttled_items : set of ints
+        Item ids whose requests get a 429 response the first few times.
+    throttles_per_item : int
+        How many 429 responses each throttled item gets before succeeding.
+
+    """
+
+    def __init__(self, latency=0.0, throttled_items=(), throttles_per_item=1):
+        self.stats = {"requests": 0, "throttled": {}}
+        self._handler_kwargs = dict(
+            stats=self.stats,
+            latency=latency,
+            throttled_items=set(throttled_items),
+            throttles_per_item=throttles_per_item,
+        )
+        self._loop = None
+        self._thread = None
+        self.port = None
+
+    def __enter__(self):
+        sockets = bind_sockets(0, "127.0.0.1")
+        self.port = sockets[0].getsockname()[1]
+        started = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            app = Application(
+                [(r"/v2/data", DataHandler, self._handler_kwargs)],
+                log_function=lambda handler: None,
+            )
+            server = HTTPServer(app)
+            server.add_sockets(sockets)
+            self._loop.call_soon(started.set)
+            self._loop.run_forever()
+            server.stop()
+
+        self._thread = threading.Thread(target=serve, daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    @property
+    def api_host(self):
+        return "127.0.0.1:{}".format(self.port)
+
+
+def use_stub_server(client):
+    """Send a GroClient's async requests to the plain-HTTP stub server."""
+    fetch = client._async_http_client.fetch
+
+    def fetch_over_http(request, *args, **kwargs):
+        request.url = request.url.replace("https://", "http://", 1)
+        return fetch(request, *args, **kwargs)
+
+    client._async_http_client.fetch = fetch_over_http
+    return client
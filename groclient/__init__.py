@@ -1,4 +1,5 @@
 from groclient.client import GroClient
+from groclient.async_client import AsyncGroClient
 from groclient.crop_model import CropModel
 from groclient.experimental import Experimental
 
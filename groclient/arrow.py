@@ -0,0 +1,467 @@
+"""Apache Arrow tables and Parquet files of data points.
+
+Requires pyarrow, which is an optional dependency: :code:`pip install pyarrow`.
+
+Tables are built from the columns of :func:`groclient.lib.list_of_series_to_columns`
+without going through a pandas DataFrame. Id columns are dictionary encoded and
+dates are UTC timestamps, so the tables can be handed to DuckDB, Spark or
+Polars as they are. :class:`PartitionedDataset` stores them on disk, one
+Parquet file per data series, for point sets larger than memory, and
+:class:`SyncedDataset` keeps such a store up to date by merging in only the
+points that changed.
+"""
+
+import json
+import os
+
+import numpy
+import pandas
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.dataset
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from groclient import lib
+from groclient.constants import DATA_POINTS_UNIQUE_COLS, DATA_SERIES_UNIQUE_TYPES_ID
+
+DATE_COLUMNS = ["start_date", "end_date", "reporting_date", "available_date"]
+ID_COLUMNS = [
+    "unit_id",
+    "input_unit_id",
+    "metric_id",
+    "item_id",
+    "region_id",
+    "partner_region_id",
+    "frequency_id",
+    "source_id",
+]
+
+
+def require_pyarrow():
+    if pyarrow is None:
+        raise ImportError(
+            "pyarrow is required for Arrow and Parquet output: pip install pyarrow"
+        )
+
+
+def to_arrow_array(name, values):
+    """Convert a column of :func:`lib.list_of_series_to_columns` to Arrow."""
+    if name in DATE_COLUMNS:
+        # Parsed to datetime64[ns] with pandas' vectorized ISO 8601 parser.
+        timestamps = pandas.to_datetime(values, utc=True).values
+        return pyarrow.array(
+            timestamps, pyarrow.timestamp("ns", tz="UTC"), from_pandas=True
+        ).cast(pyarrow.timestamp("ms", tz="UTC"))
+    if name in ID_COLUMNS:
+        return pyarrow.array(
+            values, pyarrow.int64(), from_pandas=True
+        ).dictionary_encode()
+    if name == "value":
+        return pyarrow.array(values, pyarrow.float64(), from_pandas=True)
+    return pyarrow.array(values, from_pandas=True)
+
+
+def columns_to_table(columns, source_id=None):
+    """Build an Arrow table from :func:`lib.list_of_series_to_columns` output.
+
+    Parameters
+    ----------
+    columns : dict of arrays
+    source_id : integer, optional
+        Added as a column, since responses don't include it.
+
+    Returns
+    -------
+    pyarrow.Table
+
+    """
+    require_pyarrow()
+    columns = dict(columns)
+    if source_id is not None:
+        columns["source_id"] = [source_id] * len(next(iter(columns.values()), []))
+    return pyarrow.table(
+        {name: to_arrow_array(name, values) for name, values in columns.items()}
+    )
+
+
+def list_of_series_to_table(series_list, include_historical=True, source_id=None):
+    """Convert list_of_series format from API into an Arrow table.
+
+    See :func:`lib.list_of_series_to_columns` and :func:`columns_to_table`.
+    """
+    return columns_to_table(
+        lib.list_of_series_to_columns(series_list, include_historical), source_id
+    )
+
+
+def empty_table():
+    """Table of no data points, with the columns every table has."""
+    return columns_to_table(lib.list_of_series_to_columns([]), source_id=0)
+
+
+def concat_tables(tables):
+    """Concatenate tables of data points, whose metadata columns may differ.
+
+    Returns
+    -------
+    pyarrow.Table
+        Columns missing from some of the tables are null in their rows. With
+        no tables, an empty table with the usual columns.
+
+    """
+    require_pyarrow()
+    if not tables:
+        return empty_table()
+    try:
+        return pyarrow.concat_tables(tables, promote_options="default")
+    except TypeError:
+        # pyarrow < 14
+        return pyarrow.concat_tables(tables, promote=True)
+
+
+def conform_table(table, schema):
+    """Cast :code:`table` to :code:`schema`, adding missing columns as nulls.
+
+    Returns
+    -------
+    pyarrow.Table
+        Columns not in :code:`schema`, like metadata keys that only appear in
+        some series, are left out.
+
+    """
+    return pyarrow.table(
+        [
+            (
+                table.column(field.name).cast(field.type)
+                if field.name in table.column_names
+                else pyarrow.nulls(len(table), field.type)
+            )
+            for field in schema
+        ],
+        schema=schema,
+    )
+
+
+class ParquetWriter(object):
+    """Write Arrow tables of data points to one Parquet file as they arrive.
+
+    The schema is taken from the first table written. Later tables are
+    conformed to it by :func:`conform_table`.
+
+    Parameters
+    ----------
+    path : string
+    logger : logging.Logger, optional
+    **kwargs
+        Passed to :code:`pyarrow.parquet.ParquetWriter`, e.g.
+        :code:`compression`.
+
+    """
+
+    def __init__(self, path, logger=None, **kwargs):
+        require_pyarrow()
+        self.path = path
+        self.rows = 0
+        self._logger = logger
+        self._kwargs = kwargs
+        self._writer = None
+
+    def write_table(self, table):
+        if self._writer is None:
+            self._writer = pyarrow.parquet.ParquetWriter(
+                self.path, table.schema, **self._kwargs
+            )
+        else:
+            dropped = set(table.column_names) - set(self._writer.schema.names)
+            if dropped and self._logger is not None:
+                self._logger.warning(
+                    "Columns {} are not in the Parquet schema of {} and were "
+                    "not written".format(sorted(dropped), self.path)
+                )
+            table = conform_table(table, self._writer.schema)
+        self._writer.write_table(table)
+        self.rows += len(table)
+
+    def close(self):
+        if self._writer is None:
+            # Nothing was written: leave an empty file with the usual columns.
+            self.write_table(empty_table())
+        self._writer.close()
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PartitionedDataset(object):
+    """Points of many data series, stored as one Parquet file per series.
+
+    A lazy handle on a directory: points are only read when asked for, and only
+    from the files of the series asked for. The directory can be reopened by
+    later runs, and series written again replace their previous points.
+
+    Files are named after the series ids, as
+    <metric_id>-<item_id>-<region_id>-<partner_region_id>-<frequency_id>-<source_id>.parquet,
+    and written to a temporary name first, so a run that is interrupted never
+    leaves a partial series behind.
+
+    Parameters
+    ----------
+    path : string
+        Directory, created if it doesn't exist.
+    logger : logging.Logger, optional
+    **kwargs
+        Passed to :code:`pyarrow.parquet.ParquetWriter` when writing, e.g.
+        :code:`compression`.
+
+    """
+
+    SUFFIX = ".parquet"
+
+    def __init__(self, path, logger=None, **kwargs):
+        require_pyarrow()
+        self.path = path
+        self._logger = logger
+        self._kwargs = kwargs
+        self._writer = None
+        self._writing = None
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    @classmethod
+    def series_key(cls, data_series):
+        return "-".join(
+            str(data_series.get(type_id, 0 if type_id == "partner_region_id" else ""))
+            for type_id in DATA_SERIES_UNIQUE_TYPES_ID
+        )
+
+    def series(self, **series_ids):
+        """Ids of the stored series.
+
+        Parameters
+        ----------
+        **series_ids
+            Only series with these ids, e.g. :code:`region_id=[1215, 1216]`.
+
+        Returns
+        -------
+        list of dicts
+
+        """
+        return [data_series for data_series, _ in self._files(**series_ids)]
+
+    def _files(self, **series_ids):
+        unknown = set(series_ids) - set(DATA_SERIES_UNIQUE_TYPES_ID)
+        if unknown:
+            raise ValueError("Can only filter on series ids, not {}".format(unknown))
+        wanted = {
+            type_id: {ids} if isinstance(ids, int) else set(ids)
+            for type_id, ids in series_ids.items()
+        }
+        files = []
+        for name in os.listdir(self.path):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                ids = [int(i) for i in name[: -len(self.SUFFIX)].split("-")]
+            except ValueError:
+                continue
+            data_series = dict(zip(DATA_SERIES_UNIQUE_TYPES_ID, ids))
+            if all(data_series[key] in values for key, values in wanted.items()):
+                files.append((ids, data_series, os.path.join(self.path, name)))
+        return [(data_series, path) for _, data_series, path in sorted(files)]
+
+    def write_table(self, data_series, table):
+        """Add points of a data series.
+
+        Consecutive tables of the same series are appended to each other. The
+        series' file is complete once points of another series are written, or
+        on :meth:`close`.
+        """
+        key = self.series_key(data_series)
+        if key != self._writing:
+            self.close()
+            self._writer = ParquetWriter(
+                os.path.join(self.path, key + self.SUFFIX + ".tmp"),
+                self._logger,
+                **self._kwargs
+            )
+            self._writing = key
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(self._writer.path, self._writer.path[: -len(".tmp")])
+        self._writer = None
+        self._writing = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None and self._writer is not None:
+            # Leave out the series that was being written when it failed.
+            self._writer.close()
+            os.remove(self._writer.path)
+            self._writer = None
+            self._writing = None
+        self.close()
+
+    def __len__(self):
+        """Number of points, from the file footers."""
+        return sum(
+            pyarrow.parquet.read_metadata(path).num_rows for _, path in self._files()
+        )
+
+    def __iter__(self):
+        """Yield each series' ids and points as a DataFrame, reading one file at
+        a time."""
+        for data_series, path in self._files():
+            yield data_series, to_pandas(pyarrow.parquet.read_table(path))
+
+    def to_table(self, columns=None, filter=None, **series_ids):
+        """Read points into an Arrow table.
+
+        Parameters
+        ----------
+        columns : list of strings, optional
+            Only read these columns.
+        filter : pyarrow.dataset.Expression, optional
+            Only read the points matching it, e.g.
+            :code:`pyarrow.dataset.field("end_date") >= pandas.Timestamp("2020-01-01", tz="UTC")`.
+        **series_ids
+            Only read the files of series with these ids. See :meth:`series`.
+
+        Returns
+        -------
+        pyarrow.Table
+            Columns missing from some of the files are null in their rows.
+
+        """
+        paths = [path for _, path in self._files(**series_ids)]
+        if not paths:
+            table = empty_table()
+            return table.select(columns) if columns is not None else table
+        schema = pyarrow.unify_schemas(
+            [pyarrow.parquet.read_schema(path) for path in paths]
+        )
+        dataset = pyarrow.dataset.dataset(paths, schema=schema, format="parquet")
+        return dataset.to_table(columns=columns, filter=filter)
+
+    def to_pandas(self, columns=None, filter=None, **series_ids):
+        """Read points into a DataFrame, with the columns of :meth:`GroClient.get_df`.
+
+        See :meth:`to_table`.
+        """
+        return to_pandas(self.to_table(columns, filter, **series_ids))
+
+
+class SyncedDataset(PartitionedDataset):
+    """A :class:`PartitionedDataset` that is kept up to date incrementally.
+
+    Each series' watermark, the date it was last synced, is recorded in
+    watermarks.json next to its points. Later syncs only fetch the points
+    made available since then, and merge them in with :meth:`merge_table`.
+    Watermarks are saved when the dataset is closed as a context manager, so
+    an interrupted sync fetches the series whose watermarks weren't saved
+    again, which is harmless since merging is idempotent.
+
+    Parameters
+    ----------
+    path : string
+    logger : logging.Logger, optional
+    **kwargs
+        See :class:`PartitionedDataset`.
+
+    """
+
+    WATERMARKS = "watermarks.json"
+
+    def __init__(self, path, logger=None, **kwargs):
+        super(SyncedDataset, self).__init__(path, logger, **kwargs)
+        watermarks_path = os.path.join(self.path, self.WATERMARKS)
+        self._watermarks = {}
+        if os.path.exists(watermarks_path):
+            with open(watermarks_path) as watermarks_file:
+                self._watermarks = json.load(watermarks_file)
+
+    def watermark(self, data_series):
+        """Date the series was last synced, None if it never was."""
+        return self._watermarks.get(self.series_key(data_series))
+
+    def merge_table(self, data_series, table, watermark, keep_versions=False):
+        """Merge points of a series into its stored points, and set its watermark.
+
+        Points with the same ids, start_date, end_date and reporting_date as
+        stored ones are revisions of them, and replace them. Others are added.
+        With :code:`keep_versions`, for points of complete_history, revisions
+        are only replaced by points with the same available_date, so every
+        version of a point is kept.
+        """
+        key = self.series_key(data_series)
+        self._watermarks[key] = watermark
+        if not len(table):
+            return
+        path = os.path.join(self.path, key + self.SUFFIX)
+        if os.path.exists(path):
+            table = merge_tables(pyarrow.parquet.read_table(path), table, keep_versions)
+        self.write_table(data_series, table)
+        self.close()
+
+    def save_watermarks(self):
+        path = os.path.join(self.path, self.WATERMARKS)
+        with open(path + ".tmp", "w") as watermarks_file:
+            json.dump(self._watermarks, watermarks_file, indent=0, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super(SyncedDataset, self).__exit__(exc_type, exc_value, traceback)
+        self.save_watermarks()
+
+
+def merge_tables(stored, fetched, keep_versions=False):
+    """Points of both tables, with points of :code:`fetched` replacing those of
+    :code:`stored` with the same DATA_POINTS_UNIQUE_COLS, and with
+    :code:`keep_versions` the same available_date.
+
+    Returns
+    -------
+    pyarrow.Table
+        Sorted by end_date, with the order of each date's points kept.
+
+    """
+    # Ids are read back from Parquet as plain integers, so the fetched
+    # table's dictionaries are decoded to match.
+    table = concat_tables([_decode_dictionaries(stored), _decode_dictionaries(fetched)])
+    keys = DATA_POINTS_UNIQUE_COLS + (["available_date"] if keep_versions else [])
+    keys = [column for column in keys if column in table.column_names]
+    if keys:
+        duplicated = to_pandas(table.select(keys)).duplicated(keep="last")
+        table = table.take(numpy.flatnonzero(~duplicated.values))
+    if "end_date" in table.column_names:
+        table = table.take(pyarrow.compute.sort_indices(table.column("end_date")))
+    return table
+
+
+def _decode_dictionaries(table):
+    for i, field in enumerate(table.schema):
+        if pyarrow.types.is_dictionary(field.type):
+            table = table.set_column(
+                i, field.name, table.column(i).cast(field.type.value_type)
+            )
+    return table
+
+
+def to_pandas(table):
+    """Convert a table of data points to a DataFrame, with integer ids as in
+    :meth:`GroClient.get_df` rather than categoricals."""
+    return _decode_dictionaries(table).to_pandas()
@@ -0,0 +1,222 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from unittest import TestCase
+
+import pytest
+
+pyarrow = pytest.importorskip("pyarrow")
+import pyarrow.dataset
+import pyarrow.parquet
+
+from groclient import arrow
+from groclient.mock_data import mock_list_of_series_points
+
+METADATA_SERIES = [
+    {
+        "series": {"metricId": 1, "itemId": 2, "regionId": 3, "frequencyId": 9},
+        "data": [
+            ["2003-01-01", "2003-12-31", 1.5, None, 15, {"confInterval": 2}],
+            ["2004-01-01", "2004-12-31", None, None, 15, {}],
+        ],
+    }
+]
+
+
+class ArrowTests(TestCase):
+    def test_list_of_series_to_table(self):
+        table = arrow.list_of_series_to_table(mock_list_of_series_points, source_id=2)
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(
+            table.schema.field("end_date").type, pyarrow.timestamp("ms", tz="UTC")
+        )
+        self.assertTrue(pyarrow.types.is_dictionary(table.schema.field("item_id").type))
+        rows = table.to_pylist()
+        self.assertEqual(
+            rows[0]["start_date"], datetime(2017, 1, 1, tzinfo=timezone.utc)
+        )
+        self.assertEqual(rows[0]["value"], 40891)
+        self.assertIsNone(rows[0]["reporting_date"])
+        self.assertEqual(rows[1]["unit_id"], 10)
+        self.assertEqual(rows[1]["source_id"], 2)
+        self.assertEqual(rows[1]["region_id"], 1215)
+
+    def test_concat_tables(self):
+        table = arrow.concat_tables(
+            [
+                arrow.list_of_series_to_table(mock_list_of_series_points, source_id=2),
+                arrow.list_of_series_to_table(METADATA_SERIES, source_id=3),
+            ]
+        )
+        self.assertEqual(table.num_rows, 4)
+        self.assertEqual(
+            table.column("metadata_conf_interval").to_pylist(), [None, None, 2, None]
+        )
+        self.assertEqual(table.column("value").to_pylist(), [40891, 56789, 1.5, None])
+        self.assertEqual(arrow.concat_tables([]).schema, arrow.empty_table().schema)
+
+
+class ParquetWriterTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "points.parquet")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write_tables(self):
+        with arrow.ParquetWriter(self.path) as writer:
+            writer.write_table(
+                arrow.list_of_series_to_table(mock_list_of_series_points, source_id=2)
+            )
+            writer.write_table(
+                arrow.list_of_series_to_table(METADATA_SERIES, source_id=3)
+            )
+        self.assertEqual(writer.rows, 4)
+        table = pyarrow.parquet.read_table(self.path)
+        # Columns that weren't in the first table are left out.
+        self.assertNotIn("metadata_conf_interval", table.column_names)
+        self.assertEqual(table.column("source_id").to_pylist(), [2, 2, 3, 3])
+
+    def test_empty(self):
+        with arrow.ParquetWriter(self.path) as writer:
+            pass
+        self.assertEqual(writer.rows, 0)
+        table = pyarrow.parquet.read_table(self.path)
+        self.assertEqual(table.num_rows, 0)
+        self.assertIn("end_date", table.column_names)
+
+
+class PartitionedDatasetTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.series = {
+            "metric_id": 1,
+            "item_id": 2,
+            "region_id": 3,
+            "partner_region_id": 0,
+            "frequency_id": 9,
+            "source_id": 5,
+        }
+        with arrow.PartitionedDataset(self.directory) as dataset:
+            dataset.write_table(
+                self.series, arrow.list_of_series_to_table(METADATA_SERIES, source_id=5)
+            )
+            for region_id in [1215, 1216]:
+                table = arrow.list_of_series_to_table(
+                    mock_list_of_series_points, source_id=2
+                )
+                # Consecutive tables of a series are appended.
+                dataset.write_table(dict(self.series, region_id=region_id), table)
+                dataset.write_table(dict(self.series, region_id=region_id), table)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_read(self):
+        dataset = arrow.PartitionedDataset(self.directory)
+        self.assertEqual(len(dataset), 10)
+        self.assertEqual(
+            [data_series["region_id"] for data_series in dataset.series()],
+            [3, 1215, 1216],
+        )
+        df = dataset.to_pandas()
+        self.assertEqual(len(df), 10)
+        self.assertEqual(df["item_id"].dtype, "int64")
+        self.assertEqual(df["metadata_conf_interval"].notna().sum(), 1)
+        table = dataset.to_table(
+            columns=["value"],
+            filter=pyarrow.dataset.field("value") > 50000,
+            region_id=[1216, 3],
+        )
+        self.assertEqual(table.column("value").to_pylist(), [56789, 56789])
+        self.assertEqual(dataset.to_table(region_id=7).num_rows, 0)
+        with self.assertRaises(ValueError):
+            dataset.series(start_date="2001-01-01")
+        self.assertEqual(
+            [(data_series["region_id"], len(df)) for data_series, df in dataset],
+            [(3, 2), (1215, 4), (1216, 4)],
+        )
+
+    def test_replace(self):
+        dataset = arrow.PartitionedDataset(self.directory)
+        with self.assertRaises(RuntimeError):
+            with dataset:
+                dataset.write_table(
+                    self.series, arrow.list_of_series_to_table([], source_id=5)
+                )
+                raise RuntimeError("Interrupted")
+        # The series written when interrupted keeps its points.
+        self.assertEqual(len(dataset.to_table(region_id=3)), 2)
+        with dataset:
+            dataset.write_table(
+                self.series, arrow.list_of_series_to_table([], source_id=5)
+            )
+        self.assertEqual(len(dataset.to_table(region_id=3)), 0)
+        # No temporary files are left behind.
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+
+class SyncedDatasetTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.series = {
+            "metric_id": 860032,
+            "item_id": 274,
+            "region_id": 1215,
+            "partner_region_id": 0,
+            "frequency_id": 9,
+            "source_id": 2,
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_merge_table(self):
+        with arrow.SyncedDataset(self.directory) as dataset:
+            self.assertIsNone(dataset.watermark(self.series))
+            dataset.merge_table(
+                self.series,
+                arrow.list_of_series_to_table(mock_list_of_series_points, source_id=2),
+                "2020-01-01",
+            )
+        revised = [
+            dict(
+                mock_list_of_series_points[0],
+                data=[
+                    # A new point, and a revision of the 2017 point.
+                    ["2016-01-01", "2016-12-31", 3, None, 14, {"confInterval": 1}],
+                    ["2017-01-01", "2017-12-31", 2, None, 14],
+                ],
+            )
+        ]
+        with arrow.SyncedDataset(self.directory) as dataset:
+            self.assertEqual(dataset.watermark(self.series), "2020-01-01")
+            dataset.merge_table(
+                self.series,
+                arrow.list_of_series_to_table(revised, source_id=2),
+                "2020-02-01",
+            )
+            # No change: only the watermark moves.
+            dataset.merge_table(
+                dict(self.series, region_id=1216), arrow.empty_table(), "2020-02-01"
+            )
+        dataset = arrow.SyncedDataset(self.directory)
+        self.assertEqual(dataset.watermark(self.series), "2020-02-01")
+        self.assertEqual(
+            dataset.watermark(dict(self.series, region_id=1216)), "2020-02-01"
+        )
+        self.assertEqual(len(dataset.series()), 1)
+        df = dataset.to_pandas()
+        self.assertEqual(list(df["value"]), [3, 2, 56789])
+        self.assertEqual(df["metadata_conf_interval"].notna().sum(), 1)
+
+    def test_watermarks_kept_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with arrow.SyncedDataset(self.directory) as dataset:
+                dataset.merge_table(self.series, arrow.empty_table(), "2020-01-01")
+                raise RuntimeError()
+        self.assertEqual(
+            arrow.SyncedDataset(self.directory).watermark(self.series), "2020-01-01"
+        )
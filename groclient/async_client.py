@@ -0,0 +1,434 @@
+"""asyncio-native API client.
+
+AsyncGroClient mirrors a subset of :class:`~groclient.GroClient` with
+:code:`async def` methods that run on the caller's event loop, so it can be
+awaited from asyncio services and Jupyter notebooks without a second event loop.
+"""
+
+import asyncio
+import os
+import time
+
+# Python3 support
+try:
+    # Python3
+    from urllib.parse import urlencode
+except ImportError:
+    # Python2
+    from urllib import urlencode
+
+from typing import Dict, List, Optional
+
+import pandas as pd
+from tornado.httpclient import AsyncHTTPClient, HTTPError, HTTPRequest
+
+from groclient import cfg, decoding, lib
+from groclient.client import BatchError
+from groclient.constants import DATA_SERIES_UNIQUE_TYPES_ID
+from groclient.ratelimit import RateLimiter
+from groclient.units import UnitConverter
+from groclient.utils import str_snake_to_camel
+
+
+class AsyncGroClient(object):
+    """API client whose methods are coroutines.
+
+    All requests made by one AsyncGroClient share a single HTTP client, and so a
+    single pool of at most :code:`connection_pool_size` concurrent connections.
+    The HTTP client is created on first use, on the event loop that is running
+    at that time; use the AsyncGroClient from that loop only.
+
+    Example::
+
+        async with AsyncGroClient(access_token="your_token_here") as client:
+            points = await client.get_data_points(**selection)
+
+    """
+
+    def __init__(
+        self,
+        api_host=cfg.API_HOST,
+        access_token=None,
+        proxy_host=None,
+        proxy_port=None,
+        proxy_username=None,
+        proxy_pass=None,
+        connection_pool_size=cfg.CONNECTION_POOL_SIZE,
+        max_queries_per_second=cfg.MAX_QUERIES_PER_SECOND,
+        endpoint_queries_per_second=None,
+    ):
+        """Construct an AsyncGroClient instance.
+
+        Parameters
+        ----------
+        api_host : string, optional
+            The API server hostname.
+        access_token : string, optional
+            Your Gro API authentication token. If not specified, the
+            :code:`$GROAPI_TOKEN` environment variable is used.
+        proxy_host : string, optional
+        proxy_port : int, optional
+        proxy_username : string, optional
+        proxy_pass : string, optional
+            See :meth:`groclient.GroClient.__init__`.
+        connection_pool_size : int, optional
+            Maximum number of requests in flight at once.
+        max_queries_per_second : float, optional
+        endpoint_queries_per_second : dict, optional
+            See :meth:`groclient.GroClient.__init__`.
+
+        Raises
+        ------
+            RuntimeError
+                Raised when neither the :code:`access_token` parameter nor
+                :code:`$GROAPI_TOKEN` environment variable are set.
+
+        """
+        if access_token is None:
+            access_token = os.environ.get("GROAPI_TOKEN")
+            if access_token is None:
+                raise RuntimeError(
+                    "$GROAPI_TOKEN environment variable must be set when "
+                    "AsyncGroClient is constructed without the access_token argument"
+                )
+        self.api_host = api_host
+        self.access_token = access_token
+        self._proxy_host = proxy_host
+        self._proxy_port = proxy_port
+        self._proxy_username = proxy_username
+        self._proxy_pass = proxy_pass
+        self._connection_pool_size = connection_pool_size
+        self._logger = lib.get_default_logger()
+        self._http_client = None
+        self._rate_limiter = RateLimiter(
+            max_queries_per_second, endpoint_queries_per_second
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the underlying HTTP client and its connections."""
+        if self._http_client is not None:
+            self._http_client.close()
+            self._http_client = None
+
+    def get_logger(self):
+        return self._logger
+
+    def get_rate_limit_stats(self):
+        """See :meth:`groclient.GroClient.get_rate_limit_stats`."""
+        return self._rate_limiter.stats()
+
+    def _get_http_client(self):
+        if self._http_client is None:
+            # Note: force_instance is needed to disable Tornado's
+            # pseudo-singleton AsyncHTTPClient caching behavior.
+            if self._proxy_host and self._proxy_port:
+                from tornado.curl_httpclient import CurlAsyncHTTPClient
+
+                defaults_dict = {
+                    "proxy_host": self._proxy_host,
+                    "proxy_port": self._proxy_port,
+                }
+                if self._proxy_username and self._proxy_pass:
+                    defaults_dict["proxy_username"] = self._proxy_username
+                    defaults_dict["proxy_pass"] = self._proxy_pass
+                self._http_client = CurlAsyncHTTPClient(
+                    force_instance=True,
+                    max_clients=self._connection_pool_size,
+                    defaults=defaults_dict,
+                )
+            else:
+                self._http_client = AsyncHTTPClient(
+                    force_instance=True, max_clients=self._connection_pool_size
+                )
+        return self._http_client
+
+    def _headers(self):
+        headers = {"authorization": "Bearer " + self.access_token}
+        headers.update(lib.get_version_info())
+        return headers
+
+    def _log_request(self, url, params, start_time, retry_count, msg, status_code):
+        log_record = dict(route=url, params=params)
+        log_record["elapsed_time_in_ms"] = 1000 * (time.time() - start_time)
+        log_record["retry_count"] = retry_count
+        log_record["status_code"] = status_code
+        if status_code == 200:
+            self._logger.debug(msg, extra=log_record)
+        else:
+            self._logger.warning(msg, extra=log_record)
+
+    def _check_retry_after(self, url, response):
+        """See :meth:`groclient.GroClient._check_retry_after`."""
+        headers = getattr(response, "headers", None)
+        retry_after = lib.get_retry_after(headers) if headers is not None else None
+        if retry_after:
+            self._rate_limiter.pause(url, retry_after)
+        return retry_after
+
+    async def get_data(self, url, params=None):
+        """General 'make api request' coroutine.
+
+        Assigns headers and builds in retries and logging, like
+        :func:`groclient.lib.get_data`.
+
+        Returns
+        -------
+        data : list or dict or None
+            The decoded JSON response body.
+
+        """
+        self._logger.debug(url)
+        retry_count = 0
+        while retry_count <= cfg.MAX_RETRIES:
+            await asyncio.sleep(self._rate_limiter.reserve(url))
+            start_time = time.time()
+            request_url = url
+            if params:
+                request_url = "{}?{}".format(url, urlencode(params, doseq=True))
+            http_request = HTTPRequest(
+                request_url,
+                method="GET",
+                headers=self._headers(),
+                request_timeout=cfg.TIMEOUT,
+                connect_timeout=cfg.TIMEOUT,
+            )
+            try:
+                response = await self._get_http_client().fetch(http_request)
+                self._log_request(url, params, start_time, retry_count, "OK", 200)
+                self._check_retry_after(url, response)
+                return decoding.loads(response.body) if response.body else None
+            except HTTPError as e:
+                response = e.response if e.response is not None else e
+                status_code = e.code
+            except Exception as e:
+                # socket.gaierror and friends are raised on connection errors
+                response = e
+                status_code = None
+            if status_code in [204, 206]:
+                log_msg = {204: "No Content", 206: "Partial Content"}[status_code]
+                self._log_request(
+                    url, params, start_time, retry_count, log_msg, status_code
+                )
+                body = getattr(response, "body", None)
+                return decoding.loads(body) if body else None
+            self._log_request(
+                url, params, start_time, retry_count, response, status_code
+            )
+            if status_code in [400, 401, 402, 404]:
+                break  # Do not retry. Go right to raising an Exception.
+            if status_code == 301:
+                new_params = lib.redirect(
+                    params, decoding.loads(response.body)["data"][0]
+                )
+                self._logger.warning("Redirecting {} to {}".format(params, new_params))
+                params = new_params
+            else:
+                retry_after = self._check_retry_after(url, response)
+                await asyncio.sleep(lib.get_backoff_delay(retry_count, retry_after))
+            retry_count += 1
+        raise BatchError(response, retry_count, url, params)
+
+    async def post_data(self, url, body, content_type=None):
+        """Make a single POST request and return the decoded JSON response.
+
+        Raises
+        ------
+        BatchError
+            If the response status is anything other than 200.
+
+        """
+        await asyncio.sleep(self._rate_limiter.reserve(url))
+        start_time = time.time()
+        headers = self._headers()
+        if content_type:
+            headers["Content-Type"] = content_type
+        http_request = HTTPRequest(
+            url,
+            method="POST",
+            headers=headers,
+            body=body,
+            request_timeout=cfg.TIMEOUT,
+            connect_timeout=cfg.TIMEOUT,
+        )
+        try:
+            response = await self._get_http_client().fetch(http_request)
+        except HTTPError as e:
+            self._log_request(url, None, start_time, 0, e, e.code)
+            raise BatchError(e.response if e.response is not None else e, 0, url, None)
+        self._log_request(url, None, start_time, 0, "OK", response.code)
+        return decoding.loads(response.body)
+
+    async def lookup(self, entity_type, entity_ids):
+        """Retrieve details about a given id or list of ids of type entity_type.
+
+        See :meth:`groclient.GroClient.lookup`. Lists of ids are looked up in
+        chunks, concurrently.
+        """
+        url = "/".join(["https:", "", self.api_host, "v2", entity_type])
+        try:  # Convert iterable types like numpy arrays or tuples into plain lists
+            entity_ids = list(entity_ids)
+        except TypeError:
+            entity_id = int(entity_ids)
+            response = await self.get_data(url, {"ids": [entity_id]})
+            return response["data"].get(str(entity_id))
+        responses = await asyncio.gather(
+            *[
+                self.get_data(url, {"ids": [int(entity_id) for entity_id in id_batch]})
+                for id_batch in lib.get_lookup_chunks(url, entity_ids)
+            ]
+        )
+        all_results = {}
+        for response in responses:
+            all_results.update(response["data"])
+        return all_results
+
+    async def search(self, entity_type, search_terms):
+        """Search for the given search term. See :meth:`groclient.GroClient.search`."""
+        url = "/".join(["https:", "", self.api_host, "v2/search", entity_type])
+        return await self.get_data(url, {"q": search_terms})
+
+    async def get_data_series(self, **selection):
+        """Get available data series for the given selections.
+
+        See :meth:`groclient.GroClient.get_data_series`.
+        """
+        url = "/".join(["https:", "", self.api_host, "v2/data_series/list"])
+        response = await self.get_data(url, lib.get_params_from_selection(**selection))
+        try:
+            data_series = response["data"]
+        except (KeyError, TypeError):
+            raise Exception(response)
+        if any(
+            series.get("metadata", {}).get("includes_historical_region", False)
+            for series in data_series
+        ):
+            self._logger.warning(
+                "Data series have some historical regions, "
+                "see https://developers.gro-intelligence.com/faq.html"
+            )
+        return data_series
+
+    async def get_data_points(self, **selection):
+        """Get all the data points for a given selection.
+
+        See :meth:`groclient.GroClient.get_data_points`.
+        """
+        url = "/".join(["https:", "", self.api_host, "v2/data"])
+        params = lib.get_data_call_params(**selection)
+        required_params = [
+            str_snake_to_camel(type_id)
+            for type_id in DATA_SERIES_UNIQUE_TYPES_ID
+            if type_id != "partner_region_id"
+        ]
+        missing_params = list(required_params - params.keys())
+        if len(missing_params):
+            message = (
+                "API request cannot be processed because {} not specified.".format(
+                    missing_params[0] + " is"
+                    if len(missing_params) == 1
+                    else ", ".join(missing_params[:-1])
+                    + " and "
+                    + missing_params[-1]
+                    + " are"
+                )
+            )
+            self._logger.warning(message)
+            raise ValueError(message)
+        list_of_series = await self.get_data(url, params)
+        points = lib.list_of_series_to_single_series(
+            list_of_series, False, selection.get("include_historical", True)
+        )
+        if "unit_id" in selection:
+            return await self._convert_units(points, selection["unit_id"])
+        return points
+
+    async def _convert_units(self, points, target_unit_id):
+        unit_ids = {
+            point["unit_id"]
+            for point in points
+            if point.get("unit_id") is not None and point["unit_id"] != target_unit_id
+        }
+        if not unit_ids:
+            return points
+        units = await self.lookup("units", list(unit_ids) + [target_unit_id])
+        return UnitConverter(units.values()).convert_points(points, target_unit_id)
+
+    async def get_descendant(
+        self,
+        entity_type,
+        entity_id,
+        distance=None,
+        include_details=True,
+        descendant_level=None,
+        include_historical=True,
+    ):
+        """Given an item, metric or region, returns all its descendants.
+
+        See :meth:`groclient.GroClient.get_descendant`.
+        """
+        url = "https://{}/v2/{}/contains".format(self.api_host, entity_type)
+        params = {"ids": [entity_id]}
+        if distance:
+            params["distance"] = distance
+        else:
+            if entity_type == "regions" and descendant_level:
+                params["level"] = descendant_level
+            else:
+                params["distance"] = -1
+        if entity_type == "regions":
+            params["includeHistorical"] = include_historical
+        response = await self.get_data(url, params)
+        descendant_entity_ids = response["data"][str(entity_id)]
+        if include_details:
+            entity_details = await self.lookup(entity_type, descendant_entity_ids)
+            return [
+                entity_details[str(child_entity_id)]
+                for child_entity_id in descendant_entity_ids
+            ]
+        return [
+            {"id": descendant_entity_id}
+            for descendant_entity_id in descendant_entity_ids
+        ]
+
+    async def reverse_geocode_points(self, points: list):
+        """Takes a list of lat/long pairs and return a list of corresponding Gro regions.
+
+        See :meth:`groclient.GroClient.reverse_geocode_points`.
+        """
+        # Don't need to send empty request to API
+        if len(points) == 0:
+            return []
+        response = await self.post_data(
+            "https://{}/v2/geocode".format(self.api_host),
+            urlencode({"latlng": "{}".format(points)}),
+            "application/x-www-form-urlencoded",
+        )
+        return response["data"]
+
+    async def get_area_weighted_series_df(
+        self,
+        series: Dict[str, int],
+        region_ids: List[int],
+        weights: Optional[List[Dict[str, int]]] = None,
+        weight_names: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        method: Optional[str] = "sum",
+    ) -> pd.DataFrame:
+        """Compute weighted average on selected series with the given weights.
+
+        See :meth:`groclient.GroClient.get_area_weighted_series_df`.
+        """
+        payload = lib.generate_payload_for_v2_area_weighting(
+            series, region_ids, weights, weight_names, start_date, end_date, method
+        )
+        response = await self.post_data(
+            "https://{}/v2/area-weighting".format(self.api_host), payload
+        )
+        return lib.format_v2_area_weighting_response(response)
@@ -0,0 +1,175 @@
+import asyncio
+import json
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from urllib.parse import parse_qs, urlparse
+
+from tornado.concurrent import Future
+from tornado.httpclient import HTTPError, HTTPResponse
+
+from groclient import AsyncGroClient
+from groclient.client import BatchError
+from groclient.mock_data import (
+    mock_data_series,
+    mock_entities,
+    mock_error_selection,
+    mock_list_of_series_points,
+)
+
+MOCK_HOST = "pytest.groclient.url"
+MOCK_TOKEN = "pytest.groclient.token"
+
+
+def respond(request, body, code=200):
+    future = Future()
+    future.set_result(HTTPResponse(request, code, buffer=StringIO(json.dumps(body))))
+    return future
+
+
+def mock_tornado_fetch(request):
+    url = urlparse(request.url)
+    query = parse_qs(url.query)
+    if url.path == "/v2/data":
+        if int(query["itemId"][0]) < 0:
+            raise HTTPError(400, "Negative item ids are not allowed", request)
+        return respond(request, mock_list_of_series_points)
+    if url.path == "/v2/units":
+        return respond(
+            request,
+            {
+                "data": {
+                    entity_id: mock_entities["units"][int(entity_id)]
+                    for entity_id in query["ids"]
+                }
+            },
+        )
+    if url.path == "/v2/regions/contains":
+        return respond(request, {"data": {query["ids"][0]: [1215, 12345]}})
+    if url.path == "/v2/regions":
+        return respond(
+            request,
+            {
+                "data": {
+                    entity_id: mock_entities["regions"][int(entity_id)]
+                    for entity_id in query["ids"]
+                }
+            },
+        )
+    if url.path == "/v2/search/items":
+        return respond(request, [{"id": 274}])
+    if url.path == "/v2/data_series/list":
+        return respond(request, {"data": mock_data_series})
+    if url.path == "/v2/geocode":
+        return respond(request, {"data": [{"l3_id": 1215}]})
+    raise HTTPError(404, "Not Found", request)
+
+
+@patch(
+    "tornado.httpclient.AsyncHTTPClient.fetch",
+    MagicMock(side_effect=mock_tornado_fetch),
+)
+class AsyncGroClientTests(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.client = AsyncGroClient(MOCK_HOST, MOCK_TOKEN)
+
+    def tearDown(self):
+        self.client.close()
+        self.loop.close()
+
+    def run_coroutine(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_get_data_points(self):
+        points = self.run_coroutine(self.client.get_data_points(**mock_data_series[0]))
+        self.assertEqual(points[0]["start_date"], "2017-01-01T00:00:00.000Z")
+        self.assertEqual(points[0]["value"], 40891)
+        self.assertEqual(points[0]["unit_id"], 14)
+
+    def test_get_data_points_unit_conversion(self):
+        selection = dict(mock_data_series[0], unit_id=10)
+        points = self.run_coroutine(self.client.get_data_points(**selection))
+        self.assertEqual(points[0]["value"], 40891000)
+        self.assertEqual(points[0]["unit_id"], 10)
+        self.assertEqual(points[1]["value"], 56789)
+
+    def test_get_data_points_missing_params(self):
+        with self.assertRaises(ValueError):
+            self.run_coroutine(self.client.get_data_points(metric_id=1))
+
+    def test_get_data_points_bad_request(self):
+        with self.assertRaises(BatchError):
+            self.run_coroutine(self.client.get_data_points(**mock_error_selection))
+
+    def test_concurrent_requests_share_http_client(self):
+        async def fan_out():
+            return await asyncio.gather(
+                *[
+                    self.client.get_data_points(**series)
+                    for series in mock_data_series * 5
+                ]
+            )
+
+        results = self.run_coroutine(fan_out())
+        self.assertEqual(len(results), 10)
+        http_client = self.client._http_client
+        self.run_coroutine(self.client.lookup("units", [10, 14]))
+        self.assertIs(self.client._http_client, http_client)
+
+    def test_lookup(self):
+        self.assertEqual(
+            self.run_coroutine(self.client.lookup("units", 10))["name"], "kilogram"
+        )
+        units = self.run_coroutine(self.client.lookup("units", [10, 14]))
+        self.assertEqual(set(units.keys()), {"10", "14"})
+
+    def test_search(self):
+        self.assertEqual(
+            self.run_coroutine(self.client.search("items", "Corn")), [{"id": 274}]
+        )
+
+    def test_get_data_series(self):
+        self.assertEqual(
+            self.run_coroutine(self.client.get_data_series(item_id=274)),
+            mock_data_series,
+        )
+
+    def test_get_descendant(self):
+        descendants = self.run_coroutine(self.client.get_descendant("regions", 0))
+        self.assertEqual(
+            [region["name"] for region in descendants], ["United States", "Minnesota"]
+        )
+        self.assertEqual(
+            self.run_coroutine(
+                self.client.get_descendant("regions", 0, include_details=False)
+            ),
+            [{"id": 1215}, {"id": 12345}],
+        )
+
+    def test_reverse_geocode_points(self):
+        self.assertEqual(
+            self.run_coroutine(self.client.reverse_geocode_points([[1.0, 2.0]])),
+            [{"l3_id": 1215}],
+        )
+        self.assertEqual(self.run_coroutine(self.client.reverse_geocode_points([])), [])
+
+    @patch("groclient.lib.get_backoff_delay", MagicMock(return_value=0))
+    def test_retries_throttled_requests(self):
+        throttled = []
+
+        def throttle_once(request):
+            if not throttled:
+                throttled.append(request)
+                raise HTTPError(429, "Too Many Requests", request)
+            return mock_tornado_fetch(request)
+
+        with patch(
+            "tornado.httpclient.AsyncHTTPClient.fetch",
+            MagicMock(side_effect=throttle_once),
+        ):
+            points = self.run_coroutine(
+                self.client.get_data_points(**mock_data_series[0])
+            )
+        self.assertEqual(len(throttled), 1)
+        self.assertEqual(points[0]["value"], 40891)
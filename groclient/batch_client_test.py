@@ -6,16 +6,22 @@ except ImportError:
     # Python 2.7
     from mock import patch, MagicMock
     from StringIO import StringIO
-from unittest import TestCase
+from unittest import TestCase, skipIf
 import json
+import os
+import shutil
+import tempfile
 from datetime import date
 
+from tornado import gen
 from tornado.httpclient import HTTPResponse, HTTPError
+from tornado.httputil import HTTPHeaders
 from tornado.concurrent import Future
 from tornado.ioloop import IOLoop
 
-from groclient import GroClient
+from groclient import GroClient, arrow, decoding
 from groclient.client import BatchError
+from groclient.lib import get_backoff_delay
 from groclient.utils import str_camel_to_snake
 from groclient.mock_data import (
     mock_list_of_series_points,
@@ -27,7 +33,7 @@ MOCK_HOST = "pytest.groclient.url"
 MOCK_TOKEN = "pytest.groclient.token"
 
 
-def mock_rank_series_by_source(access_token, api_host, selections_list):
+def mock_rank_series_by_source(access_token, api_host, selections_list, session=None):
     for data_series in mock_data_series:
         yield data_series
 
@@ -134,6 +140,180 @@ class BatchTests(TestCase):
         ahc_id2 = id(client._async_http_client)
         self.assertNotEqual(ahc_id1, ahc_id2)
 
+    @patch("groclient.lib.get_backoff_delay", MagicMock(return_value=0.01))
+    def test_batch_async_get_data_points_retries_without_blocking(self):
+        throttled = []
+
+        def throttle_first_request(request):
+            if not throttled:
+                throttled.append(request)
+                raise HTTPError(429, "Too Many Requests", request)
+            return mock_tornado_fetch(request)
+
+        selection = {
+            "metric_id": 1,
+            "item_id": 2,
+            "region_id": 3,
+            "frequency_id": 4,
+            "source_id": 5,
+        }
+        with patch.object(
+            self.client._async_http_client,
+            "fetch",
+            MagicMock(side_effect=throttle_first_request),
+        ), patch("time.sleep") as blocking_sleep:
+            data_points = self.client.batch_async_get_data_points(
+                [selection, dict(selection, item_id=6)]
+            )
+        self.assertEqual(len(throttled), 1)
+        self.assertEqual(data_points[0][0]["value"], 40891)
+        self.assertEqual(data_points[1][0]["value"], 40891)
+        blocking_sleep.assert_not_called()
+
+    def test_batch_async_get_data_points_redirect(self):
+        requests = []
+        body = json.dumps({"data": [{"old_item_id": 2, "new_item_id": 6}]})
+
+        def redirect_first_request(request):
+            requests.append(request.url)
+            if len(requests) == 1:
+                response = HTTPResponse(request, 301, buffer=StringIO(body))
+                raise HTTPError(301, "Moved Permanently", response)
+            return mock_tornado_fetch(request)
+
+        selection = dict(mock_data_series[0], item_id=2)
+        with patch.object(
+            self.client._async_http_client,
+            "fetch",
+            MagicMock(side_effect=redirect_first_request),
+        ), patch("groclient.decoding.loads", wraps=decoding.loads) as loads:
+            data_points = self.client.batch_async_get_data_points([selection])
+        self.assertEqual(data_points[0][0]["value"], 40891)
+        self.assertIn("itemId=2", requests[0])
+        self.assertIn("itemId=6", requests[1])
+        # Redirects are decoded like every other response.
+        self.assertEqual(loads.call_args_list[0][0][0], body)
+
+    def test_batch_async_get_data_points_retry_after(self):
+        throttled = []
+
+        def throttle_first_request(request):
+            if not throttled:
+                throttled.append(request)
+                response = HTTPResponse(
+                    request, 429, headers=HTTPHeaders({"Retry-After": "0.2"})
+                )
+                raise HTTPError(429, "Too Many Requests", response)
+            return mock_tornado_fetch(request)
+
+        selection = dict(mock_data_series[0], item_id=2)
+        with patch.object(
+            self.client._async_http_client,
+            "fetch",
+            MagicMock(side_effect=throttle_first_request),
+        ), patch(
+            "groclient.lib.get_backoff_delay", wraps=get_backoff_delay
+        ) as backoff, patch.object(
+            self.client._rate_limiter, "pause"
+        ) as pause:
+            data_points = self.client.batch_async_get_data_points(
+                [selection, dict(selection, item_id=6)]
+            )
+        self.assertEqual(data_points[1][0]["value"], 40891)
+        backoff.assert_called_once_with(0, 0.2)
+        # Requests sharing the rate limit are held back too.
+        pause.assert_called_once_with("https://{}/v2/data".format(MOCK_HOST), 0.2)
+
+    def test_batch_async_get_data_points_rate_limited(self):
+        client = GroClient(
+            MOCK_HOST, MOCK_TOKEN, endpoint_queries_per_second={"v2/data": 50}
+        )
+        selections = [dict(mock_data_series[0], item_id=i) for i in range(1, 11)]
+        with patch("time.sleep") as blocking_sleep:
+            data_points = client.batch_async_get_data_points(selections)
+        self.assertEqual(len(data_points), 10)
+        # The limiter paces the batch on the IOLoop, never by blocking it.
+        blocking_sleep.assert_not_called()
+        stats = client.get_rate_limit_stats()["v2/data"]
+        self.assertEqual(stats["requests"], 10)
+        self.assertGreater(stats["wait_time"], 0)
+        self.assertLessEqual(stats["rate"], 50.01)
+
+    @patch("groclient.lib.get_backoff_delay", MagicMock(return_value=0.01))
+    def test_batch_async_get_data_points_adaptive_concurrency(self):
+        client = GroClient(
+            MOCK_HOST,
+            MOCK_TOKEN,
+            max_queries_per_second=None,
+            adaptive_concurrency=True,
+        )
+        in_flight = []
+        peak = []
+        throttled = []
+
+        def track_concurrency(request):
+            in_flight.append(request)
+            peak.append(len(in_flight))
+            future = Future()
+
+            def respond():
+                in_flight.remove(request)
+                if len(throttled) < 2 and len(peak) > 20:
+                    throttled.append(request)
+                    future.set_exception(
+                        HTTPError(429, "Too Many Requests", HTTPResponse(request, 429))
+                    )
+                else:
+                    future.set_result(mock_tornado_fetch(request).result())
+
+            IOLoop.current().call_later(0.005, respond)
+            return future
+
+        selections = [dict(mock_data_series[0], item_id=i) for i in range(1, 41)]
+        with patch.object(
+            client._async_http_client,
+            "fetch",
+            MagicMock(side_effect=track_concurrency),
+        ):
+            data_points = client.batch_async_get_data_points(selections)
+        self.assertEqual(len(data_points), 40)
+        self.assertEqual(data_points[-1][0]["value"], 40891)
+        history = [
+            concurrency for _, concurrency in client._concurrency_limiter.history
+        ]
+        # Starts low, grows while requests succeed, backs off when throttled.
+        self.assertEqual(history[0], 2)
+        self.assertGreater(max(history), 2)
+        self.assertTrue(any(b < a for a, b in zip(history, history[1:])))
+        self.assertLessEqual(max(peak), max(history))
+
+    def test_batch_async_get_data_points_rate_limited_concurrency(self):
+        client = GroClient(
+            MOCK_HOST,
+            MOCK_TOKEN,
+            max_queries_per_second=50,
+            adaptive_concurrency=True,
+        )
+        limiter = client._concurrency_limiter
+        reserve = client._rate_limiter.reserve
+        slots_at_reserve = []
+
+        def track_reserve(url):
+            slots_at_reserve.append((limiter._in_flight, limiter.concurrency))
+            return reserve(url)
+
+        selections = [dict(mock_data_series[0], item_id=i) for i in range(1, 11)]
+        with patch.object(
+            client._rate_limiter, "reserve", MagicMock(side_effect=track_reserve)
+        ):
+            data_points = client.batch_async_get_data_points(selections)
+        self.assertEqual(len(data_points), 10)
+        # Tokens are only reserved by requests holding a concurrency slot, so
+        # requests queued for one don't use up the rate limit meanwhile.
+        self.assertEqual(len(slots_at_reserve), 10)
+        for in_flight, concurrency in slots_at_reserve:
+            self.assertTrue(0 < in_flight <= concurrency)
+
     def test_batch_async_get_data_points_bad_request_error(self):
         responses = self.client.batch_async_get_data_points([mock_error_selection])
         self.assertTrue(isinstance(responses[0], BatchError))
@@ -165,6 +345,110 @@ class BatchTests(TestCase):
         self.assertEqual(df.iloc[0]["end_date"].date(), date(2017, 12, 31))
         self.assertEqual(df.iloc[0]["value"], 40891)
 
+    @skipIf(arrow.pyarrow is None, "pyarrow is not installed")
+    def test_async_get_df_arrow(self):
+        for item_id in [2, 3]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], item_id=item_id)
+            )
+        table = self.client.get_df(async_mode=True, output="arrow")
+        self.assertEqual(table.num_rows, 4)
+        self.assertEqual(
+            sorted(table.column("value").to_pylist()), [40891, 40891, 56789, 56789]
+        )
+
+    @skipIf(arrow.pyarrow is None, "pyarrow is not installed")
+    def test_async_load_data_series_error(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        loads = [
+            lambda: self.client.get_df(async_mode=True),
+            lambda: self.client.get_df(async_mode=True, output="arrow"),
+            lambda: self.client.get_df(
+                async_mode=True, spill_to=os.path.join(directory, "spill")
+            ),
+            lambda: self.client.to_parquet(
+                os.path.join(directory, "points.parquet"), async_mode=True
+            ),
+            lambda: self.client.sync(os.path.join(directory, "sync"), async_mode=True),
+        ]
+        for load in loads:
+            for selection in [mock_data_series[0], mock_error_selection]:
+                self.client.add_single_data_series(selection)
+            with self.assertRaises(BatchError):
+                load()
+            # The client's IOLoop is still usable.
+            data_points = self.client.batch_async_get_data_points([mock_data_series[0]])
+            self.assertEqual(len(data_points[0]), 2)
+            self.client._data_series_list = set()
+
+    def test_async_get_df_columns(self):
+        for item_id in [2, 3]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], item_id=item_id)
+            )
+        df = self.client.get_df(async_mode=True, columns=["item_id", "value"])
+        self.assertEqual(list(df.columns), ["value", "item_id"])
+        self.assertEqual(sorted(df["value"]), [40891, 40891, 56789, 56789])
+
+    def test_iter_async_queue(self):
+        finished = []
+
+        @gen.coroutine
+        def sleep(delay):
+            if delay < 0:
+                raise ValueError("Negative delay")
+            yield gen.sleep(delay)
+            finished.append(delay)
+            raise gen.Return(delay)
+
+        results = self.client.iter_async_queue(sleep, [0.03, 0.01, -1, 0.02])
+        self.assertTrue(isinstance(next(results)[1], ValueError))
+        self.assertEqual([result for _, result in results], [0.01, 0.02, 0.03])
+
+        # Stopping early stops the remaining calls.
+        del finished[:]
+        results = self.client.iter_async_queue(sleep, [0.01, 0.02, 0.03], max_pending=1)
+        self.assertEqual(next(results), (0.01, 0.01))
+        results.close()
+        self.client.batch_async_get_data_points([mock_data_series[0]])
+        self.assertLessEqual(len(finished), 2)
+
+    def test_get_df_iter(self):
+        for item_id in [2, 3]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], item_id=item_id)
+            )
+        results = list(self.client.get_df_iter(async_mode=True, max_pending=1))
+        self.assertEqual(
+            sorted(data_series["item_id"] for data_series, _ in results), [2, 3]
+        )
+        for _, df in results:
+            self.assertEqual(list(df["value"]), [40891, 56789])
+            self.assertEqual(df.iloc[0]["end_date"].date(), date(2017, 12, 31))
+
+        self.client.add_single_data_series(mock_error_selection)
+        with self.assertRaises(BatchError):
+            list(self.client.get_df_iter(async_mode=True))
+
+    def test_batch_async_get_data_points_merge_requests(self):
+        selections = [
+            dict(mock_data_series[0], region_id=region_id) for region_id in [1215, 1216]
+        ] + [mock_error_selection]
+        with patch(
+            "tornado.httpclient.AsyncHTTPClient.fetch",
+            MagicMock(side_effect=mock_tornado_fetch),
+        ) as fetch:
+            data_points = self.client.batch_async_get_data_points(
+                selections, merge_requests=True
+            )
+        self.assertEqual(fetch.call_count, 2)
+        self.assertIn("regionId=1215&regionId=1216", fetch.call_args_list[0][0][0].url)
+        # The response only has series of region 1215.
+        self.assertEqual([point["value"] for point in data_points[0]], [40891, 56789])
+        self.assertEqual(data_points[1], [])
+        self.assertTrue(isinstance(data_points[2], BatchError))
+
     def test_batch_async_rank_series_by_source(self):
         list_of_ranked_series_lists = self.client.batch_async_rank_series_by_source(
             [mock_data_series, mock_data_series]
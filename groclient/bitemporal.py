@@ -0,0 +1,287 @@
+"""Point-in-time queries of data points, answered locally.
+
+A complete_history or reporting_history response has every version of each
+point: its value as reported at each reporting_date, and as made available to
+Gro at each available_date. :class:`BitemporalStore` indexes those versions by
+the interval of time they were the latest known, so what a
+:code:`get_data_points(at_time=...)` request would return is found with one
+vectorized comparison, rather than a request per as-of date.
+"""
+
+import numpy
+import pandas
+
+from groclient.constants import DATA_SERIES_UNIQUE_TYPES_ID
+
+# A point's versions share its series and period.
+PERIOD_COLUMNS = DATA_SERIES_UNIQUE_TYPES_ID + ["start_date", "end_date"]
+
+
+def _timestamp(value):
+    timestamp = pandas.Timestamp(value)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize("UTC")
+    return timestamp.tz_convert("UTC")
+
+
+def _utc(column):
+    return pandas.to_datetime(column, utc=True)
+
+
+class BitemporalStore(object):
+    """Versions of data points, answering as-of queries.
+
+    Example::
+
+        client.add_data_series(item='corn', metric='production', region='brazil')
+        store = BitemporalStore(client.get_df(complete_history=True))
+        for day in pandas.date_range('2020-01-01', '2020-12-31'):
+            df = store.as_of(day)
+
+    The points can also come from a store kept up to date by
+    :code:`client.sync(path, complete_history=True).to_pandas()`, which keeps
+    every version of the points.
+
+    Parameters
+    ----------
+    points : pandas.DataFrame
+        Points with every version, as returned by :meth:`GroClient.get_df` with
+        complete_history or reporting_history. A version is known from its
+        available_date, or its reporting_date if it has none. Versions with
+        neither are known from the start.
+
+    """
+
+    def __init__(self, points):
+        if any(name in PERIOD_COLUMNS for name in points.index.names):
+            # As returned by get_df(index_by_series=True).
+            points = points.reset_index()
+        missing = [column for column in PERIOD_COLUMNS if column not in points.columns]
+        if missing:
+            raise ValueError("Points need the {} columns".format(", ".join(missing)))
+        df = points.reset_index(drop=True)
+        for column in ["start_date", "end_date", "reporting_date", "available_date"]:
+            if column in df.columns:
+                df[column] = _utc(df[column])
+        known_from = pandas.Series(
+            pandas.NaT, index=df.index, dtype="datetime64[ns, UTC]"
+        )
+        for column in ["reporting_date", "available_date"]:
+            if column in df.columns:
+                known_from = df[column].where(df[column].notna(), known_from)
+        # Versions of each point, in the order they became known. Ties keep the
+        # order of the response, so the last one listed wins as it would.
+        # lexsort sorts by its last key first.
+        order = numpy.lexsort(
+            [known_from.fillna(pandas.Timestamp.min.tz_localize("UTC")).values]
+            + [
+                pandas.factorize(df[column], sort=True)[0]
+                for column in reversed(PERIOD_COLUMNS)
+            ]
+        )
+        self._points = df.take(order).reset_index(drop=True)
+        self._known_from = known_from.take(order).reset_index(drop=True)
+        # A version is the latest known until the next version of its point.
+        self._known_until = self._known_from.groupby(
+            [self._points[column] for column in PERIOD_COLUMNS],
+            sort=False,
+            dropna=False,
+        ).shift(-1)
+
+    def __len__(self):
+        """Number of versions of all points."""
+        return len(self._points)
+
+    def series(self):
+        """Ids of the series with points in the store.
+
+        Returns
+        -------
+        list of dicts
+
+        """
+        return [
+            {
+                type_id: int(entity_id)
+                for type_id, entity_id in ids.items()
+                if pandas.notna(entity_id)
+            }
+            for ids in self._points[DATA_SERIES_UNIQUE_TYPES_ID]
+            .drop_duplicates()
+            .to_dict("records")
+        ]
+
+    def known_dates(self):
+        """Times at which a version became known, when as-of answers change.
+
+        Returns
+        -------
+        pandas.DatetimeIndex
+
+        """
+        return pandas.DatetimeIndex(self._known_from.dropna().unique()).sort_values()
+
+    def _mask(self, **series_ids):
+        mask = numpy.ones(len(self._points), dtype=bool)
+        for type_id, ids in series_ids.items():
+            if type_id not in DATA_SERIES_UNIQUE_TYPES_ID:
+                raise ValueError(
+                    "Can only filter on series ids, not {}".format(type_id)
+                )
+            ids = [ids] if isinstance(ids, int) else ids
+            mask &= self._points[type_id].isin(ids).values
+        return mask
+
+    def as_of(self, at_time, **series_ids):
+        """Points as they were known at a time in the past.
+
+        Parameters
+        ----------
+        at_time : string or datetime
+            Like the at_time of :meth:`GroClient.get_data_points`. Naive times are UTC.
+        **series_ids
+            Only points of series with these ids, e.g. :code:`region_id=[1215, 1216]`.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The latest version of each point known at :code:`at_time`, in the order of
+            their series and periods.
+
+        """
+        at_time = _timestamp(at_time)
+        known_from = self._known_from.values
+        known_until = self._known_until.values
+        mask = self._mask(**series_ids)
+        # NaT compares False, so is treated as always known before, and never
+        # superseded after.
+        mask &= ~(known_from > at_time.to_datetime64())
+        mask &= ~(known_until <= at_time.to_datetime64())
+        return self._points[mask].reset_index(drop=True)
+
+    def validate(
+        self,
+        client,
+        at_times=None,
+        num_samples=5,
+        random_state=None,
+        include_historical=True,
+        **series_ids
+    ):
+        """Compare as-of answers with the API's, for some as-of times.
+
+        Each series is requested from the API with :code:`at_time` for each time, so this makes
+        :code:`len(at_times) * len(series)` requests.
+
+        Parameters
+        ----------
+        client : GroClient
+        at_times : list of strings or datetimes, optional
+            Times to compare at. By default, :code:`num_samples` of :meth:`known_dates`, where
+            answers change and differences are most likely.
+        num_samples : integer, optional
+        random_state : integer, optional
+            Seed of the sample of times, for repeatable comparisons.
+        include_historical : boolean, optional
+            As the points were fetched with. True by default, as in :meth:`GroClient.get_df`,
+            and then the points of historical regions are compared as part of the series they
+            were returned for.
+        **series_ids
+            Only compare series with these ids.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per point that differs: its at_time, series ids, with the region_id of the
+            point rather than of the series it was requested with, start_date and end_date,
+            and local_value and api_value, which are NaN where the point is missing. Empty if
+            the local answers are the same as the API's.
+
+        """
+        if at_times is None:
+            known_dates = self.known_dates()
+            if len(known_dates) > num_samples:
+                known_dates = known_dates[
+                    numpy.sort(
+                        numpy.random.RandomState(random_state).choice(
+                            len(known_dates), num_samples, replace=False
+                        )
+                    )
+                ]
+            at_times = list(known_dates)
+        series_list = [
+            data_series
+            for data_series in self.series()
+            if all(
+                data_series.get(type_id) in ([ids] if isinstance(ids, int) else ids)
+                for type_id, ids in series_ids.items()
+            )
+        ]
+        differences = []
+        for at_time in at_times:
+            at_time = _timestamp(at_time)
+            for data_series in series_list:
+                api_points = pandas.DataFrame(
+                    client.get_data_points(
+                        at_time=at_time.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                        include_historical=include_historical,
+                        **data_series
+                    ),
+                    columns=["region_id", "start_date", "end_date", "value"],
+                )
+                # Compared with the local points of the historical regions the
+                # API returned too, as the points are stored under their own
+                # region_id.
+                region_ids = [data_series["region_id"]] + [
+                    int(region_id)
+                    for region_id in api_points["region_id"].dropna().unique()
+                ]
+                local_points = self.as_of(
+                    at_time, **dict(data_series, region_id=region_ids)
+                )
+                compared = pandas.merge(
+                    local_points[["region_id", "start_date", "end_date", "value"]],
+                    api_points.assign(
+                        region_id=api_points["region_id"].fillna(
+                            data_series["region_id"]
+                        ),
+                        start_date=_utc(api_points["start_date"]),
+                        end_date=_utc(api_points["end_date"]),
+                    ),
+                    on=["region_id", "start_date", "end_date"],
+                    how="outer",
+                    suffixes=("_local", "_api"),
+                    indicator=True,
+                )
+                local_value = compared["value_local"].astype(float)
+                api_value = compared["value_api"].astype(float)
+                differs = (compared["_merge"] != "both") | ~(
+                    (local_value == api_value) | (local_value.isna() & api_value.isna())
+                )
+                if differs.any():
+                    differences.append(
+                        compared[differs]
+                        .drop(columns="_merge")
+                        .rename(
+                            columns={
+                                "value_local": "local_value",
+                                "value_api": "api_value",
+                            }
+                        )
+                        .assign(
+                            at_time=at_time,
+                            **{
+                                type_id: entity_id
+                                for type_id, entity_id in data_series.items()
+                                if type_id != "region_id"
+                            }
+                        )
+                    )
+        columns = (
+            ["at_time"]
+            + DATA_SERIES_UNIQUE_TYPES_ID
+            + ["start_date", "end_date", "local_value", "api_value"]
+        )
+        if not differences:
+            return pandas.DataFrame(columns=columns)
+        return pandas.concat(differences, ignore_index=True).reindex(columns=columns)
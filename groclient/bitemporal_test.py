@@ -0,0 +1,126 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from groclient.bitemporal import BitemporalStore
+
+SERIES = {
+    "metric_id": 1,
+    "item_id": 2,
+    "region_id": 3,
+    "partner_region_id": 0,
+    "frequency_id": 9,
+    "source_id": 5,
+}
+
+
+def make_point(year, value, available_date, reporting_date=None, region_id=3):
+    return dict(
+        SERIES,
+        region_id=region_id,
+        start_date="{}-01-01T00:00:00.000Z".format(year),
+        end_date="{}-12-31T00:00:00.000Z".format(year),
+        value=value,
+        reporting_date=reporting_date,
+        available_date=available_date,
+    )
+
+
+# Versions of the points of 2018 and 2019, in no particular order.
+POINTS = pd.DataFrame(
+    [
+        make_point(2019, 20, "2020-02-01T00:00:00.000Z"),
+        make_point(2018, 10, "2019-02-01T00:00:00.000Z"),
+        make_point(2018, 11, "2019-06-01T00:00:00.000Z"),
+        make_point(2019, 21, None, reporting_date="2020-06-01T00:00:00.000Z"),
+        make_point(2018, 12, "2020-06-01T00:00:00.000Z"),
+        make_point(2018, 1, None, region_id=4),
+    ]
+)
+
+
+class BitemporalStoreTests(TestCase):
+    def setUp(self):
+        self.store = BitemporalStore(POINTS)
+
+    def test_as_of(self):
+        def values(at_time, **series_ids):
+            return list(self.store.as_of(at_time, **series_ids)["value"])
+
+        self.assertEqual(len(self.store), 6)
+        # Versions without dates are always known.
+        self.assertEqual(values("2000-01-01"), [1])
+        self.assertEqual(values("2019-02-01", region_id=3), [10])
+        self.assertEqual(values("2019-12-31", region_id=3), [11])
+        self.assertEqual(values("2020-02-01", region_id=3), [11, 20])
+        self.assertEqual(values(pd.Timestamp("2020-07-01", tz="UTC")), [12, 21, 1])
+        df = self.store.as_of("2020-07-01", region_id=3)
+        self.assertEqual(
+            list(df["start_date"].dt.year),
+            [2018, 2019],
+        )
+        self.assertEqual(self.store.as_of("2020-07-01", region_id=5).shape[0], 0)
+        with self.assertRaises(ValueError):
+            self.store.as_of("2020-07-01", unit_id=14)
+
+    def test_index_by_series(self):
+        store = BitemporalStore(POINTS.set_index(["metric_id", "region_id"]))
+        self.assertEqual(list(store.as_of("2019-12-31", region_id=3)["value"]), [11])
+        with self.assertRaises(ValueError):
+            BitemporalStore(POINTS.drop(columns=["end_date"]))
+
+    def test_validate(self):
+        def get_data_points(at_time, include_historical, **series_ids):
+            points = self.store.as_of(at_time, **series_ids)
+            for column in ["start_date", "end_date"]:
+                points[column] = points[column].dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            if series_ids["region_id"] == 3 and at_time >= "2020-06":
+                # The API knows of a later revision, and of a new point.
+                points.loc[0, "value"] = 13
+                points = pd.concat(
+                    [
+                        points,
+                        pd.DataFrame(
+                            [make_point(2020, 30, "2020-06-01T00:00:00.000Z")]
+                        ),
+                    ],
+                    ignore_index=True,
+                )
+            return points.to_dict("records")
+
+        client = MagicMock()
+        client.get_data_points.side_effect = get_data_points
+        self.assertEqual(self.store.series(), [SERIES, dict(SERIES, region_id=4)])
+        # Two of the times versions became known, for both series.
+        self.store.validate(client, num_samples=2, random_state=0)
+        self.assertEqual(client.get_data_points.call_count, 4)
+        differences = self.store.validate(
+            client, at_times=["2020-01-01", "2020-07-01"], region_id=3
+        )
+        self.assertEqual(client.get_data_points.call_count, 6)
+        self.assertEqual(list(differences["start_date"].dt.year), [2018, 2020])
+        self.assertEqual(list(differences["local_value"].fillna(-1)), [12, -1])
+        self.assertEqual(list(differences["api_value"]), [13, 30])
+        self.assertEqual(list(differences["region_id"]), [3, 3])
+
+    def test_validate_include_historical(self):
+        def get_data_points(at_time, include_historical, **series_ids):
+            # Region 4 is a historical region of region 3.
+            if series_ids["region_id"] == 3 and include_historical:
+                series_ids["region_id"] = [3, 4]
+            points = self.store.as_of(at_time, **series_ids)
+            return points.to_dict("records")
+
+        client = MagicMock()
+        client.get_data_points.side_effect = get_data_points
+        for include_historical in [True, False]:
+            differences = self.store.validate(
+                client,
+                at_times=["2019-12-31", "2020-07-01"],
+                include_historical=include_historical,
+            )
+            self.assertTrue(differences.empty)
+        self.assertTrue(
+            client.get_data_points.call_args[1]["include_historical"] is False
+        )
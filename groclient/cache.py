@@ -0,0 +1,351 @@
+"""Caches for API responses that rarely change.
+
+Ontology and discovery endpoints (entity lookups, searches, allowed units,
+geometries) return the same answers for days at a time. MemoryCache keeps them
+in process, within a memory budget. SQLiteCache keeps them on disk, so
+short-lived processes - cron jobs, notebook kernels, workers - skip those
+requests entirely after the first run.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple, OrderedDict
+
+try:
+    # Python3
+    from urllib.parse import urlparse
+except ImportError:
+    # Python2
+    from urlparse import urlparse
+
+from groclient import cfg, decoding
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "entries", "size", "max_size"])
+
+
+def get_size(value):
+    """Approximate memory used by a decoded JSON value, in bytes."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(get_size(k) + get_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(get_size(item) for item in value)
+    return size
+
+
+class MemoryCache(object):
+    """Thread-safe in-memory LRU cache with a byte budget and expiry.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Approximate memory, in bytes, the cached values may use. The least
+        recently used entries are evicted to stay within it, and values larger
+        than the whole budget are not cached.
+    ttl : float, optional
+        Seconds after which an entry expires. None to keep entries until they
+        are evicted.
+
+    """
+
+    def __init__(self, max_size=cfg.MEMORY_CACHE_MAX_SIZE, ttl=cfg.CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, expires)
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Get the value cached under :code:`key`, or :code:`default`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = get_size(value)
+        if size > self.max_size:
+            return
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires)
+            self._size += size
+            while self._size > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        self._size -= self._entries.pop(key)[1]
+
+    def cache_info(self):
+        """Report cache statistics, like :code:`functools.lru_cache`.
+
+        Returns
+        -------
+        CacheInfo
+            A namedtuple of the number of :code:`hits` and :code:`misses`, the
+            number of :code:`entries`, and their approximate :code:`size` and
+            :code:`max_size` in bytes.
+
+        """
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, len(self._entries), self._size, self.max_size
+            )
+
+    def cache_clear(self):
+        """Remove every entry and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._hits = 0
+            self._misses = 0
+
+
+def get_default_cache_dir():
+    """Per-user cache directory, following the XDG base directory convention."""
+    return os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "groclient",
+    )
+
+
+class SQLiteCache(object):
+    """JSON response cache stored in an SQLite database.
+
+    Entries are keyed by URL and query parameters. Each expires after the TTL
+    configured for its endpoint, and the least recently used entries are
+    evicted when the cache grows beyond :code:`max_size` bytes. The size is
+    tracked as entries are written, so it only reflects other processes'
+    writes once it is next counted: when it seems to be over
+    :code:`max_size`, or every :code:`PURGE_INTERVAL` writes, when expired
+    entries are also deleted.
+
+    The database runs in write-ahead-log mode, so any number of threads and
+    processes can share one cache directory: readers never block, and writers
+    wait for each other instead of failing.
+
+    Parameters
+    ----------
+    cache_dir : string, optional
+        Directory holding the database. Defaults to
+        :code:`~/.cache/groclient`.
+    ttls : dict, optional
+        Seconds to keep responses, keyed by endpoint path relative to the API
+        host. A key also applies to the paths below it, so :code:`"v2/search"`
+        covers :code:`"v2/search/items"`. Defaults to :code:`cfg.CACHE_TTLS`.
+    default_ttl : float, optional
+        Seconds to keep responses from endpoints not in :code:`ttls`.
+    max_size : int, optional
+        Total size of the cached responses, in bytes, above which the least
+        recently used are evicted.
+    access_token : string, optional
+        Token the responses are fetched with. Responses can depend on the
+        entitlements of the token, like the series and sources available, so
+        they are only served to caches with the same token. Only a hash of it
+        is stored.
+
+    """
+
+    PURGE_INTERVAL = 1000
+
+    def __init__(
+        self,
+        cache_dir=None,
+        ttls=None,
+        default_ttl=cfg.CACHE_TTL,
+        max_size=cfg.CACHE_MAX_SIZE,
+        access_token=None,
+    ):
+        self.cache_dir = cache_dir if cache_dir is not None else get_default_cache_dir()
+        self.path = os.path.join(self.cache_dir, "responses.sqlite")
+        self.ttls = {
+            endpoint.strip("/"): ttl
+            for endpoint, ttl in (cfg.CACHE_TTLS if ttls is None else ttls).items()
+        }
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self._namespace = (
+            hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:32]
+            if access_token
+            else ""
+        )
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        # Size of the cached responses, None until counted, and writes since
+        # expired entries were last deleted.
+        self._size = None
+        self._writes = 0
+
+    def _connect(self):
+        # SQLite connections must not be shared with forked child processes.
+        if self._connection is None or self._pid != os.getpid():
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)"
+            )
+            self._connection = connection
+            self._pid = os.getpid()
+            self._size = None
+        return self._connection
+
+    def get_ttl(self, url):
+        """Seconds responses from :code:`url` are kept."""
+        endpoint = urlparse(url).path.strip("/")
+        matches = [
+            prefix
+            for prefix in self.ttls
+            if endpoint == prefix or endpoint.startswith(prefix + "/")
+        ]
+        return self.ttls[max(matches, key=len)] if matches else self.default_ttl
+
+    def get_key(self, url, params):
+        return "{}{}?{}".format(
+            self._namespace + ":" if self._namespace else "",
+            url,
+            json.dumps(params, sort_keys=True, default=str),
+        )
+
+    def get(self, url, params=None):
+        """Look up a cached response.
+
+        Returns
+        -------
+        list or dict or None
+            The decoded JSON response, or None if it isn't cached or expired.
+
+        """
+        key = self.get_key(url, params)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT value, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return decoding.loads(row[0])
+
+    def set(self, url, params, value):
+        """Store the decoded JSON response to a request for :code:`url`."""
+        self.set_many(url, [(params, value)])
+
+    def set_many(self, url, items):
+        """Store the responses to several requests for :code:`url` at once.
+
+        Parameters
+        ----------
+        url : string
+        items : list of (dict, list or dict)
+            Query parameters and decoded JSON response of each request. They
+            are written in a single transaction.
+
+        """
+        ttl = self.get_ttl(url)
+        if ttl <= 0 or not items:
+            return
+        now = time.time()
+        rows = []
+        for params, value in items:
+            serialized = json.dumps(value)
+            rows.append(
+                (self.get_key(url, params), serialized, len(serialized), now + ttl, now)
+            )
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO responses"
+                    " (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._writes += len(rows)
+                if self._size is not None:
+                    # Replaced entries are counted twice, until the next count.
+                    self._size += sum(row[2] for row in rows)
+                self._evict(connection, now)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                self._size = None
+                raise
+            connection.execute("COMMIT")
+
+    def _evict(self, connection, now):
+        if self._writes >= self.PURGE_INTERVAL:
+            self._writes = 0
+            self._size = None
+        elif self._size is not None and self._size <= self.max_size:
+            return
+        connection.execute("DELETE FROM responses WHERE expires < ?", (now,))
+        total_size = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        self._size = total_size
+        if total_size <= self.max_size:
+            return
+        # Walk entries from least to most recently used, summing their sizes,
+        # and drop all of them up to the point where enough has been freed.
+        freed = 0
+        cutoff = None
+        cursor = connection.execute(
+            "SELECT accessed, size FROM responses ORDER BY accessed"
+        )
+        for accessed, size in cursor:
+            freed += size
+            cutoff = accessed
+            if total_size - freed <= self.max_size:
+                break
+        cursor.close()
+        connection.execute("DELETE FROM responses WHERE accessed <= ?", (cutoff,))
+        self._size = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._connect().execute("DELETE FROM responses")
+            self._size = 0
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from groclient.cache import MemoryCache, SQLiteCache, get_default_cache_dir, get_size
+
+MOCK_HOST = "pytest.groclient.url"
+UNITS_URL = "https://{}/v2/units".format(MOCK_HOST)
+SEARCH_URL = "https://{}/v2/search/items".format(MOCK_HOST)
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = SQLiteCache(self.cache_dir, ttls={"v2/search": 60})
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.cache_dir)
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get(UNITS_URL, {"ids": [14]}))
+        self.cache.set(UNITS_URL, {"ids": [14]}, {"data": {"14": {"id": 14}}})
+        self.assertEqual(
+            self.cache.get(UNITS_URL, {"ids": [14]}), {"data": {"14": {"id": 14}}}
+        )
+        self.assertIsNone(self.cache.get(UNITS_URL, {"ids": [15]}))
+        self.assertIsNone(self.cache.get(UNITS_URL))
+
+    def test_shared_between_instances(self):
+        self.cache.set(UNITS_URL, None, {"data": []})
+        other = SQLiteCache(self.cache_dir)
+        self.assertEqual(other.get(UNITS_URL), {"data": []})
+        other.clear()
+        self.assertIsNone(self.cache.get(UNITS_URL))
+        other.close()
+
+    def test_keyed_by_token(self):
+        cache = SQLiteCache(self.cache_dir, access_token="token")
+        cache.set(UNITS_URL, None, {"data": [1]})
+        self.assertEqual(cache.get(UNITS_URL), {"data": [1]})
+        other = SQLiteCache(self.cache_dir, access_token="other token")
+        self.assertIsNone(other.get(UNITS_URL))
+        self.assertIsNone(self.cache.get(UNITS_URL))
+        self.assertEqual(
+            SQLiteCache(self.cache_dir, access_token="token").get(UNITS_URL),
+            {"data": [1]},
+        )
+        self.assertNotIn("token", cache.get_key(UNITS_URL, None))
+        cache.close()
+        other.close()
+
+    def test_ttl(self):
+        self.assertEqual(self.cache.get_ttl(SEARCH_URL), 60)
+        self.assertEqual(self.cache.get_ttl(UNITS_URL), self.cache.default_ttl)
+        with patch("time.time", return_value=1000.0):
+            self.cache.set(SEARCH_URL, {"q": "corn"}, [{"id": 274}])
+        with patch("time.time", return_value=1059.0):
+            self.assertEqual(self.cache.get(SEARCH_URL, {"q": "corn"}), [{"id": 274}])
+        with patch("time.time", return_value=1061.0):
+            self.assertIsNone(self.cache.get(SEARCH_URL, {"q": "corn"}))
+
+    def test_lru_eviction(self):
+        cache = SQLiteCache(self.cache_dir, max_size=50)
+        now = time.time()
+        for i in range(3):
+            with patch("time.time", return_value=now + i):
+                cache.set(UNITS_URL, {"ids": [i]}, "x" * 10)
+        with patch("time.time", return_value=now + 3):
+            # Using the oldest entry makes it the most recently used.
+            self.assertEqual(cache.get(UNITS_URL, {"ids": [0]}), "x" * 10)
+        with patch("time.time", return_value=now + 4):
+            cache.set(UNITS_URL, {"ids": [3]}, "y" * 30)
+        self.assertIsNone(cache.get(UNITS_URL, {"ids": [1]}))
+        self.assertIsNone(cache.get(UNITS_URL, {"ids": [2]}))
+        self.assertEqual(cache.get(UNITS_URL, {"ids": [0]}), "x" * 10)
+        self.assertEqual(cache.get(UNITS_URL, {"ids": [3]}), "y" * 30)
+        cache.close()
+
+    def test_set_many(self):
+        self.cache.set_many(
+            UNITS_URL, [({"id": i}, {"id": i, "name": str(i)}) for i in range(3)]
+        )
+        self.assertEqual(self.cache.get(UNITS_URL, {"id": 2}), {"id": 2, "name": "2"})
+        statements = []
+        self.cache._connect().set_trace_callback(statements.append)
+        for i in range(3, 50):
+            self.cache.set(UNITS_URL, {"id": i}, {"id": i})
+        # The size is counted once, not on every write.
+        self.assertLessEqual(
+            len([statement for statement in statements if "SUM(size)" in statement]), 1
+        )
+        self.assertEqual(self.cache.get(UNITS_URL, {"id": 49}), {"id": 49})
+
+    def test_default_cache_dir(self):
+        with patch.dict(os.environ, {"XDG_CACHE_HOME": self.cache_dir}):
+            self.assertEqual(
+                get_default_cache_dir(), os.path.join(self.cache_dir, "groclient")
+            )
+
+
+class MemoryCacheTests(TestCase):
+    def test_get_set(self):
+        cache = MemoryCache()
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", {"data": [1, 2]})
+        cache.set("b", None)
+        self.assertEqual(cache.get("a"), {"data": [1, 2]})
+        self.assertIsNone(cache.get("b", "missing"))
+        self.assertEqual(cache.get("c", "missing"), "missing")
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.entries), (2, 2, 2))
+        self.assertEqual(info.size, get_size({"data": [1, 2]}) + get_size(None))
+        cache.cache_clear()
+        self.assertEqual(cache.cache_info(), (0, 0, 0, 0, cache.max_size))
+
+    def test_lru_eviction(self):
+        value = "x" * 100
+        cache = MemoryCache(max_size=3 * get_size(value))
+        for key in ["a", "b", "c"]:
+            cache.set(key, value)
+        cache.get("a")
+        cache.set("d", value)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), value)
+        self.assertEqual(cache.cache_info().entries, 3)
+        # Values larger than the whole budget are not cached.
+        cache.set("e", value * 4)
+        self.assertIsNone(cache.get("e"))
+        self.assertEqual(cache.cache_info().entries, 3)
+
+    def test_ttl(self):
+        cache = MemoryCache(ttl=60)
+        with patch("time.time", return_value=1000.0):
+            cache.set("a", 1)
+        with patch("time.time", return_value=1059.0):
+            self.assertEqual(cache.get("a"), 1)
+        with patch("time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.cache_info().size, 0)
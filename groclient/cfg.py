@@ -1,6 +1,24 @@
 API_HOST = "api.gro-intelligence.com"
+# Persistent response cache: default time to live and size cap, in seconds and
+# bytes. Per-endpoint TTLs are keyed by path relative to the API host.
+CACHE_MAX_SIZE = 256 * 1024 * 1024
+CACHE_TTL = 7 * 24 * 60 * 60
+CACHE_TTLS = {
+    "v2/data_series/list": 60 * 60,
+    "v2/search": 24 * 60 * 60,
+    "v2/units/allowed": 24 * 60 * 60,
+}
+CONNECTION_POOL_SIZE = 10
+CONNECTION_RETRIES = 3
+INITIAL_CONCURRENCY = 2
+MAX_CONCURRENCY = 50
 MAX_QUERIES_PER_SECOND = 10
 MAX_RESULT_COMBINATION_DEPTH = 3
 MAX_RETRIES = 4
+# Longest request URL to send. Lookups of many ids are split to stay below it.
+MAX_URL_LENGTH = 8000
 MAX_SERIES_PER_COMB = 1000
+# Most series to request at once when merging selections into one v2/data request.
+MAX_SERIES_PER_REQUEST = 100
+MEMORY_CACHE_MAX_SIZE = 64 * 1024 * 1024
 TIMEOUT = 6000
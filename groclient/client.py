@@ -1,7 +1,8 @@
 from __future__ import print_function
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
+import datetime
 import itertools
-import json
 import os
 import time
 import pandas as pd
@@ -16,7 +17,10 @@ except ImportError:
     # Python2
     from urllib import urlencode
 
-from groclient import cfg, lib
+from groclient import arrow, cfg, decoding, lib, planner
+from groclient.cache import MemoryCache, SQLiteCache
+from groclient.ratelimit import AdaptiveConcurrencyLimiter, RateLimiter
+from groclient.units import UnitConverter
 from groclient.constants import (
     REGION_LEVELS,
     DATA_SERIES_UNIQUE_TYPES_ID,
@@ -25,9 +29,9 @@ from groclient.constants import (
 from groclient.utils import intersect, zip_selections, dict_unnest, str_snake_to_camel
 from groclient.lib import APIError
 
+import numpy
 import pandas
 from tornado import gen
-from tornado.escape import json_decode
 from tornado.httpclient import AsyncHTTPClient, HTTPRequest, HTTPError
 from tornado.ioloop import IOLoop
 from tornado.queues import Queue
@@ -45,7 +49,7 @@ class BatchError(APIError):
             self.response.code if hasattr(self.response, "code") else None
         )
         try:
-            json_content = json_decode(self.response.body)
+            json_content = decoding.loads(self.response.body)
             # 'error' should be something like 'Not Found' or 'Bad Request'
             self.message = json_content.get("error", "")
             # Some error responses give additional info.
@@ -73,6 +77,13 @@ class GroClient(object):
         proxy_port=None,
         proxy_username=None,
         proxy_pass=None,
+        connection_pool_size=cfg.CONNECTION_POOL_SIZE,
+        connection_retries=cfg.CONNECTION_RETRIES,
+        max_queries_per_second=cfg.MAX_QUERIES_PER_SECOND,
+        endpoint_queries_per_second=None,
+        adaptive_concurrency=False,
+        cache_dir=None,
+        memory_cache_size=cfg.MEMORY_CACHE_MAX_SIZE,
     ):
         """Construct a GroClient instance.
 
@@ -97,6 +108,38 @@ class GroClient(object):
             requires a username and password, you'll need to provide the proxy_username.
         proxy_pass : string optional
             Password for your proxy username.
+        connection_pool_size : int, optional
+            Maximum number of keep-alive connections the client holds open to
+            the API server for synchronous requests.
+        connection_retries : int, optional
+            Number of times a synchronous request is retried when the
+            connection itself fails, before any HTTP status is received.
+        max_queries_per_second : float, optional
+            Maximum rate of requests the client sends, shared by synchronous
+            and batch requests. :code:`None` disables rate limiting.
+        endpoint_queries_per_second : dict, optional
+            Separate rate limits for specific endpoints, keyed by path, e.g.
+            :code:`{"v2/data": 5}`. See :meth:`get_rate_limit_stats`.
+        adaptive_concurrency : boolean, optional
+            If True, batch methods start with :code:`cfg.INITIAL_CONCURRENCY`
+            requests in flight and adjust that number between 1 and
+            :code:`cfg.MAX_CONCURRENCY` as they go: growing while responses
+            stay fast and successful, halving on 429s, server errors and
+            timeouts. Each change is logged at INFO level. If False, batch
+            methods always run :code:`cfg.MAX_QUERIES_PER_SECOND` requests
+            concurrently.
+        cache_dir : string, optional
+            Directory in which to cache responses from lookup, search and other
+            endpoints whose results rarely change, so they persist across
+            processes. If not specified, the :code:`$GROCLIENT_CACHE_DIR`
+            environment variable is used. If neither is set, responses are
+            only cached in memory for the lifetime of the process. Expiry and
+            size limits are set by :code:`cfg.CACHE_TTLS`,
+            :code:`cfg.CACHE_TTL` and :code:`cfg.CACHE_MAX_SIZE`.
+        memory_cache_size : int, optional
+            Approximate number of bytes the client may use to keep lookup and
+            search results in memory. Least recently used results are evicted
+            beyond that. See :meth:`cache_info`.
 
         Raises
         ------
@@ -118,6 +161,8 @@ class GroClient(object):
         # access_token checking may cause constructor to exit early.
         self._async_http_client = None
         self._ioloop = None
+        self._session = None
+        self._cache = None
 
         self._proxy_host = proxy_host
         self._proxy_port = proxy_port
@@ -137,6 +182,30 @@ class GroClient(object):
         self._data_series_list = set()  # all that have been added
         self._data_series_queue = []  # added but not loaded in data frame
         self._data_frame = pandas.DataFrame()
+        self._pending_frames = []  # loaded but not yet concatenated
+        self._unit_converter = None
+        self._concurrency_limiter = (
+            AdaptiveConcurrencyLimiter(logger=self._logger)
+            if adaptive_concurrency
+            else None
+        )
+        # Synchronous and batch requests draw from the same rate limits.
+        self._rate_limiter = RateLimiter(
+            max_queries_per_second, endpoint_queries_per_second
+        )
+        if cache_dir is None:
+            cache_dir = os.environ.get("GROCLIENT_CACHE_DIR")
+        self._cache = (
+            SQLiteCache(cache_dir, access_token=access_token) if cache_dir else None
+        )
+        # Synchronous requests share one pool of keep-alive connections.
+        self._session = lib.APISession(
+            connection_pool_size,
+            connection_retries,
+            self._rate_limiter,
+            self._cache,
+            MemoryCache(memory_cache_size),
+        )
         try:
             # Each GroClient has its own IOLoop and AsyncHTTPClient.
             self._ioloop = IOLoop()
@@ -162,6 +231,10 @@ class GroClient(object):
             )
 
     def __del__(self):
+        if self._session is not None:
+            self._session.close()
+        if self._cache is not None:
+            self._cache.close()
         if self._async_http_client is not None:
             self._async_http_client.close()
         if self._ioloop is not None:
@@ -171,6 +244,102 @@ class GroClient(object):
     def get_logger(self):
         return self._logger
 
+    def cache_info(self):
+        """Report on the client's in-memory cache of lookup and search results.
+
+        Returns
+        -------
+        groclient.cache.CacheInfo
+            A namedtuple of the number of :code:`hits` and :code:`misses`, the
+            number of :code:`entries`, and their approximate :code:`size` and
+            :code:`max_size` in bytes.
+
+        Examples
+        --------
+            >>> client.cache_info()
+            CacheInfo(hits=120, misses=14, entries=14, size=53280, max_size=67108864)
+
+        """
+        return self._session.memory_cache.cache_info()
+
+    def cache_clear(self):
+        """Discard cached lookup and search results, in memory and on disk."""
+        self._session.memory_cache.cache_clear()
+        if self._cache is not None:
+            self._cache.clear()
+
+    def get_rate_limit_stats(self):
+        """Report how the client's requests have been paced.
+
+        Returns
+        -------
+        dict
+            Keyed by endpoint path, or :code:`"*"` for requests sharing the
+            client-wide limit. Each value is a dict with the number of
+            :code:`requests`, the total :code:`wait_time` in seconds spent
+            waiting for the rate limiter, and the achieved :code:`rate` in
+            requests per second.
+
+        Examples
+        --------
+            >>> client.get_rate_limit_stats()
+            {'*': {'requests': 120, 'wait_time': 4.2, 'rate': 9.98}}
+
+        """
+        return self._rate_limiter.stats()
+
+    def _check_retry_after(self, url, response):
+        """Pause the rate limiter if the response asks the client to wait.
+
+        Returns
+        -------
+        float or None
+            The delay the server asked for, see :func:`lib.get_retry_after`.
+
+        """
+        headers = getattr(response, "headers", None)
+        retry_after = lib.get_retry_after(headers) if headers is not None else None
+        if retry_after:
+            # Hold back every request sharing this limit, not just this one.
+            self._rate_limiter.pause(url, retry_after)
+        return retry_after
+
+    @gen.coroutine
+    def _fetch(self, url, http_request):
+        """Fetch http_request, within the rate limit of url and the adaptive
+        concurrency limit if enabled."""
+        limiter = self._concurrency_limiter
+        if limiter is None:
+            # Wait on the IOLoop, not the thread, so other requests can proceed.
+            yield gen.sleep(self._rate_limiter.reserve(url))
+            response = yield self._async_http_client.fetch(http_request)
+            raise gen.Return(response)
+        yield limiter.acquire()
+        try:
+            # Only reserved once a slot is free, so requests waiting for one
+            # don't hold tokens they can't use yet.
+            yield gen.sleep(self._rate_limiter.reserve(url))
+        except Exception:
+            limiter.release()
+            raise
+        start_time = time.time()
+        try:
+            response = yield self._async_http_client.fetch(http_request)
+        except HTTPError as e:
+            # 599 is Tornado's code for timeouts and connection failures.
+            if e.code in [429, 500, 502, 503, 504, 599]:
+                limiter.on_congestion(start_time)
+            else:
+                limiter.on_success(time.time() - start_time)
+            raise
+        except Exception:
+            limiter.on_congestion(start_time)
+            raise
+        finally:
+            limiter.release()
+        limiter.on_success(time.time() - start_time)
+        raise gen.Return(response)
+
     @gen.coroutine
     def async_get_data(self, url, headers, params=None):
         base_log_record = dict(route=url, params=params)
@@ -201,7 +370,7 @@ class GroClient(object):
             retry_count += 1
             start_time = time.time()
             http_request = HTTPRequest(
-                "{url}?{params}".format(url=url, params=urlencode(params)),
+                "{url}?{params}".format(url=url, params=urlencode(params, doseq=True)),
                 method="GET",
                 headers=headers,
                 request_timeout=cfg.TIMEOUT,
@@ -209,7 +378,7 @@ class GroClient(object):
             )
             try:
                 try:
-                    response = yield self._async_http_client.fetch(http_request)
+                    response = yield self._fetch(url, http_request)
                     status_code = response.code
                 except HTTPError as e:
                     # Catch non-200 codes that aren't errors
@@ -222,9 +391,7 @@ class GroClient(object):
                         log_request(start_time, retry_count, log_msg, status_code)
                         # Do not retry.
                     elif status_code == 301:
-                        redirected_ids = json.loads(e.response.body.decode("utf-8"))[
-                            "data"
-                        ][0]
+                        redirected_ids = decoding.loads(e.response.body)["data"][0]
                         new_params = lib.redirect(params, redirected_ids)
                         log_request(
                             start_time,
@@ -248,18 +415,21 @@ class GroClient(object):
                 )
                 log_request(start_time, retry_count, error_msg, status_code)
                 if status_code in [429, 500, 502, 503, 504]:
-                    # First retry is immediate.
-                    # After that, exponential backoff before retrying.
-                    if retry_count > 0:
-                        time.sleep(2**retry_count)
+                    # Wait as long as the server asked, if it did. Otherwise the
+                    # first retry is immediate, and after that exponential
+                    # backoff. gen.sleep yields to the IOLoop, so other requests
+                    # in the batch keep running while this one waits.
+                    retry_after = self._check_retry_after(url, response)
+                    yield gen.sleep(lib.get_backoff_delay(retry_count, retry_after))
                     continue
                 elif status_code in [400, 401, 402, 404]:
                     break  # Do not retry. Go right to raising an Exception.
 
             # Request was successful
             log_request(start_time, retry_count, "OK", status_code)
+            self._check_retry_after(url, response)
             raise gen.Return(
-                json_decode(response.body) if hasattr(response, "body") else None
+                decoding.loads(response.body) if hasattr(response, "body") else None
             )
 
         # Retries failed. Raise exception
@@ -320,14 +490,7 @@ class GroClient(object):
                 try:
                     idx, item = q.get().result()
                     self._logger.debug("Doing work on {}".format(idx))
-                    if type(item) is dict:
-                        # Assume that dict types should be unpacked as kwargs
-                        result = yield func(**item)
-                    elif type(item) is list:
-                        # Assume that list types should be unpacked as positional args
-                        result = yield func(*item)
-                    else:
-                        result = yield func(item)
+                    result = yield self._call_with_item(func, item)
                     output_data["result"] = map_result(
                         idx, item, result, output_data["result"]
                     )
@@ -350,7 +513,7 @@ class GroClient(object):
         @gen.coroutine
         def main():
             # Start consumer without waiting (since it never finishes).
-            for i in range(cfg.MAX_QUERIES_PER_SECOND):
+            for i in range(self._num_consumers()):
                 self._ioloop.spawn_callback(consumer)
             producer()  # Wait for producer to put all tasks.
             yield q.join()  # Wait for consumer to finish all tasks.
@@ -358,10 +521,91 @@ class GroClient(object):
         self._ioloop.run_sync(main)
         return output_data["result"]
 
-    # TODO: deprecate  the following  two methods, standardize  on one
-    # approach with get_data_points and get_df
+    def iter_async_queue(self, func, batched_args, max_pending=None):
+        """Asynchronously call func, yielding each result as it completes.
+
+        Like :meth:`~.batch_async_queue`, with the same concurrency, but results are yielded in
+        completion order instead of being accumulated. The IOLoop only runs while the caller
+        waits for the next result, so at most :code:`max_pending` results are held while the
+        caller processes one. Closing the generator, e.g. breaking out of a loop over it,
+        stops the remaining calls.
+
+        Parameters
+        ----------
+        func : function
+            The function to be batched. Typically a Client coroutine.
+        batched_args : list of dicts
+            Inputs
+        max_pending : integer, optional
+            How many completed results to hold before pausing the calls. Defaults to the number
+            of concurrent calls.
+
+        Yields
+        ------
+        tuple
+            An element of batched_args and its result. If the call raised an exception, the
+            result is the exception.
+
+        """
+        num_consumers = min(self._num_consumers(), len(batched_args))
+        if not num_consumers:
+            return
+        q = Queue()
+        for item in batched_args:
+            q.put_nowait(item)
+        results = Queue(maxsize=max_pending or num_consumers)
+        state = {"running": num_consumers, "stopped": False}
+        done = object()
+
+        @gen.coroutine
+        def consumer():
+            while q.qsize() and not state["stopped"]:
+                item = q.get_nowait()
+                try:
+                    result = yield self._call_with_item(func, item)
+                except Exception as e:
+                    result = e
+                if state["stopped"]:
+                    break
+                # Waits while max_pending results are unconsumed.
+                yield results.put((item, result))
+            state["running"] -= 1
+            if not state["running"] and not state["stopped"]:
+                yield results.put(done)
+
+        for i in range(num_consumers):
+            self._ioloop.spawn_callback(consumer)
+        try:
+            while True:
+                result = self._ioloop.run_sync(results.get)
+                if result is done:
+                    return
+                yield result
+        finally:
+            state["stopped"] = True
+            # Wake consumers waiting to put a result, so they see they are stopped.
+            while results.qsize():
+                results.get_nowait()
+
+    def _num_consumers(self):
+        # With adaptive concurrency, the limiter decides how many of the
+        # consumers' requests are actually in flight at a time.
+        if self._concurrency_limiter is not None:
+            return self._concurrency_limiter.maximum
+        return cfg.MAX_QUERIES_PER_SECOND
+
+    @staticmethod
+    def _call_with_item(func, item):
+        if type(item) is dict:
+            # Assume that dict types should be unpacked as kwargs
+            return func(**item)
+        elif type(item) is list:
+            # Assume that list types should be unpacked as positional args
+            return func(*item)
+        return func(item)
+
     @gen.coroutine
-    def get_data_points_generator(self, **selection):
+    def _async_get_list_of_series(self, selection):
         headers = {"authorization": "Bearer " + self.access_token}
         url = "/".join(["https:", "", self.api_host, "v2/data"])
         params = lib.get_data_call_params(**selection)
@@ -385,31 +629,52 @@ class GroClient(object):
             self._logger.warning(message)
             raise ValueError(message)
 
+        list_of_series = yield self.async_get_data(url, headers, params)
+        raise gen.Return(list_of_series)
+
+    # TODO: deprecate  the following  two methods, standardize  on one
+    # approach with get_data_points and get_df
+    @gen.coroutine
+    def get_data_points_generator(self, **selection):
         try:
-            list_of_series_points = yield self.async_get_data(url, headers, params)
-            include_historical = selection.get("include_historical", True)
-            points = lib.list_of_series_to_single_series(
-                list_of_series_points, False, include_historical
+            list_of_series_points = yield self._async_get_list_of_series(selection)
+            raise gen.Return(
+                self._list_of_series_to_points(list_of_series_points, selection)
             )
-            # Apply unit conversion if a unit is specified
-            if "unit_id" in selection:
-                raise gen.Return(
-                    list(
-                        map(
-                            partial(
-                                self.convert_unit, target_unit_id=selection["unit_id"]
-                            ),
-                            points,
-                        )
-                    )
-                )
+        except BatchError as b:
+            raise gen.Return(b)
 
+    def _list_of_series_to_points(self, list_of_series, selection):
+        points = lib.list_of_series_to_single_series(
+            list_of_series, False, selection.get("include_historical", True)
+        )
+        # Apply unit conversion if a unit is specified
+        if "unit_id" in selection:
+            self.get_unit_converter().convert_points(points, selection["unit_id"])
+        return points
+
+    @gen.coroutine
+    def _get_data_points_df_generator(self, columns=None, **selection):
+        points = yield self._get_data_points_columns_generator(columns, **selection)
+        if isinstance(points, BatchError):
             raise gen.Return(points)
+        raise gen.Return(pandas.DataFrame(points))
+
+    @gen.coroutine
+    def _get_data_points_columns_generator(self, columns=None, **selection):
+        try:
+            list_of_series = yield self._async_get_list_of_series(selection)
         except BatchError as b:
             raise gen.Return(b)
+        points = lib.list_of_series_to_columns(
+            list_of_series,
+            selection.get("include_historical", True),
+            self._decoded_columns(columns, selection),
+        )
+        raise gen.Return(self._convert_points_unit(points, selection, columns))
 
     def batch_async_get_data_points(
-        self, batched_args, output_list=None, map_result=None
+        self, batched_args, output_list=None, map_result=None, merge_requests=False
     ):
         """Make many :meth:`~get_data_points` requests asynchronously.
 
@@ -451,6 +716,13 @@ class GroClient(object):
                                                                   output_list=output_list,
                                                                   map_result=map_response)
 
+        merge_requests : boolean, optional
+            If set, selections that differ only in their metric, item or region ids, like one
+            metric and item for many regions, are fetched together in requests for lists of ids,
+            as planned by :func:`groclient.planner.plan_requests`. Each request's series are then
+            split back between the selections, which are passed to map_result one by one as
+            usual. Many fewer requests are made for large batches.
+
         Returns
         -------
         any
@@ -473,8 +745,42 @@ class GroClient(object):
                 ]
 
         """
+        if not merge_requests:
+            return self.batch_async_queue(
+                self.get_data_points_generator, batched_args, output_list, map_result
+            )
+        if output_list is None:
+            output_list = [0] * len(batched_args)
+        if map_result is None:
+
+            def map_result(idx, query, response, accumulator):
+                accumulator[idx] = response
+                return accumulator
+
+        plan = planner.plan_requests(batched_args)
+
+        @gen.coroutine
+        def get_list_of_series(index):
+            try:
+                list_of_series = yield self._async_get_list_of_series(plan[index][0])
+            except BatchError as b:
+                list_of_series = b
+            raise gen.Return(list_of_series)
+
+        def map_request(index, _, list_of_series, accumulator):
+            selections = [batched_args[idx] for idx in plan[index][1]]
+            for idx, selection, series_list in zip(
+                plan[index][1],
+                selections,
+                planner.demultiplex(list_of_series, selections),
+            ):
+                if not isinstance(series_list, BatchError):
+                    series_list = self._list_of_series_to_points(series_list, selection)
+                accumulator = map_result(idx, selection, series_list, accumulator)
+            return accumulator
+
         return self.batch_async_queue(
-            self.get_data_points_generator, batched_args, output_list, map_result
+            get_list_of_series, list(range(len(plan))), output_list, map_request
         )
 
     @gen.coroutine
@@ -516,7 +822,9 @@ class GroClient(object):
                 ... ]
 
         """
-        return lib.get_available(self.access_token, self.api_host, entity_type)
+        return lib.get_available(
+            self.access_token, self.api_host, entity_type, session=self._session
+        )
 
     def list_available(self, selected_entities):
         """List available entities given some selected entities.
@@ -549,7 +857,9 @@ class GroClient(object):
                 ... ]
 
         """
-        return lib.list_available(self.access_token, self.api_host, selected_entities)
+        return lib.list_available(
+            self.access_token, self.api_host, selected_entities, session=self._session
+        )
 
     def lookup(self, entity_type, entity_ids):
         """Retrieve details about a given id or list of ids of type entity_type.
@@ -599,7 +909,13 @@ class GroClient(object):
                 }
 
         """
-        return lib.lookup(self.access_token, self.api_host, entity_type, entity_ids)
+        return lib.lookup(
+            self.access_token,
+            self.api_host,
+            entity_type,
+            entity_ids,
+            session=self._session,
+        )
 
     def lookup_unit_abbreviation(self, unit_id):
         return self.lookup("units", unit_id)["abbreviation"]
@@ -620,7 +936,11 @@ class GroClient(object):
 
         """
         return lib.get_allowed_units(
-            self.access_token, self.api_host, metric_id, item_id
+            self.access_token,
+            self.api_host,
+            metric_id,
+            item_id,
+            session=self._session,
         )
 
     def get_data_series(self, **selection):
@@ -653,7 +973,9 @@ class GroClient(object):
                  }, { ... }, ... ]
 
         """
-        return lib.get_data_series(self.access_token, self.api_host, **selection)
+        return lib.get_data_series(
+            self.access_token, self.api_host, **selection, session=self._session
+        )
 
     def stream_data_series(self, **selection):
         """Retrieve available data series for the given selections.
@@ -684,7 +1006,9 @@ class GroClient(object):
                  }, { ... }, ... ]
 
         """
-        return lib.stream_data_series(self.access_token, self.api_host, **selection)
+        return lib.stream_data_series(
+            self.access_token, self.api_host, **selection, session=self._session
+        )
 
     def search(self, entity_type, search_terms):
         """Search for the given search term. Better matches appear first.
@@ -703,7 +1027,13 @@ class GroClient(object):
                 [{'id': 5604}, {'id': 10204}, {'id': 10210}, ....]
 
         """
-        return lib.search(self.access_token, self.api_host, entity_type, search_terms)
+        return lib.search(
+            self.access_token,
+            self.api_host,
+            entity_type,
+            search_terms,
+            session=self._session,
+        )
 
     def search_and_lookup(self, entity_type, search_terms, num_results=10):
         """Search for the given search terms and look up their details.
@@ -734,7 +1064,12 @@ class GroClient(object):
 
         """
         return lib.search_and_lookup(
-            self.access_token, self.api_host, entity_type, search_terms, num_results
+            self.access_token,
+            self.api_host,
+            entity_type,
+            search_terms,
+            num_results,
+            session=self._session,
         )
 
     def lookup_belongs(self, entity_type, entity_id):
@@ -760,7 +1095,11 @@ class GroClient(object):
 
         """
         return lib.lookup_belongs(
-            self.access_token, self.api_host, entity_type, entity_id
+            self.access_token,
+            self.api_host,
+            entity_type,
+            entity_id,
+            session=self._session,
         )
 
     def rank_series_by_source(self, selections_list):
@@ -780,7 +1119,10 @@ class GroClient(object):
 
         """
         return lib.rank_series_by_source(
-            self.access_token, self.api_host, selections_list
+            self.access_token,
+            self.api_host,
+            selections_list,
+            session=self._session,
         )
 
     def get_geo_centre(self, region_id):
@@ -798,7 +1140,9 @@ class GroClient(object):
 
                 [{'centre': [ 39.8333, -98.5855 ], 'regionId': 1215, 'regionName': 'United States'}]
         """
-        return lib.get_geo_centre(self.access_token, self.api_host, region_id)
+        return lib.get_geo_centre(
+            self.access_token, self.api_host, region_id, session=self._session
+        )
 
     def get_geojsons(self, region_id, descendant_level=None, zoom_level=7):
         """Given a region ID, return shape information in geojson, for the
@@ -826,7 +1170,12 @@ class GroClient(object):
 
         """
         return lib.get_geojsons(
-            self.access_token, self.api_host, region_id, descendant_level, zoom_level
+            self.access_token,
+            self.api_host,
+            region_id,
+            descendant_level,
+            zoom_level,
+            session=self._session,
         )
 
     def get_geojson(self, region_id, zoom_level=7):
@@ -850,7 +1199,13 @@ class GroClient(object):
                                 'coordinates': [[[[-38.394, -4.225], ...]]]}, ...]}
 
         """
-        return lib.get_geojson(self.access_token, self.api_host, region_id, zoom_level)
+        return lib.get_geojson(
+            self.access_token,
+            self.api_host,
+            region_id,
+            zoom_level,
+            session=self._session,
+        )
 
     def get_ancestor(
         self,
@@ -918,6 +1273,7 @@ class GroClient(object):
             include_details,
             ancestor_level,
             include_historical,
+            session=self._session,
         )
 
     def get_descendant(
@@ -986,6 +1342,7 @@ class GroClient(object):
             include_details,
             descendant_level,
             include_historical,
+            session=self._session,
         )
 
     def get_descendant_regions(
@@ -1009,6 +1366,7 @@ class GroClient(object):
             include_details,
             descendant_level,
             include_historical,
+            session=self._session,
         )
 
     def get_available_timefrequency(self, **selection):
@@ -1040,7 +1398,10 @@ class GroClient(object):
                     'name': u'daily'}, ... ]
         """
         return lib.get_available_timefrequency(
-            self.access_token, self.api_host, **selection
+            self.access_token,
+            self.api_host,
+            **selection,
+            session=self._session,
         )
 
     def get_top(self, entity_type, num_results=5, **selection):
@@ -1099,7 +1460,12 @@ class GroClient(object):
             :meth:`~.get_data_points` to get the individual time series points.
         """
         return lib.get_top(
-            self.access_token, self.api_host, entity_type, num_results, **selection
+            self.access_token,
+            self.api_host,
+            entity_type,
+            num_results,
+            **selection,
+            session=self._session,
         )
 
     def get_df(
@@ -1111,6 +1477,15 @@ class GroClient(object):
         compress_format=False,
         async_mode=False,
         show_revisions=False,
+        stream=False,
+        output="pandas",
+        compact=False,
+        value_dtype=None,
+        columns=None,
+        spill_to=None,
+        unit_id=None,
+        merge_requests=False,
+        date_partitions=None,
     ):
         """Call :meth:`~.get_data_points` for each saved data series and return as a combined
         dataframe.
@@ -1141,9 +1516,54 @@ class GroClient(object):
                 Note that when running in a Jupyter Ipython notebook with async_mode, you will need to use nest_asyncio module.
             show_revisions(deprecating) : boolean, optional
                 This parameter has been renamed as reporting_history.
+            stream : boolean, optional
+                If set, each response is parsed as it downloads and added to the dataframe one
+                series at a time, instead of being loaded whole. This keeps peak memory close to
+                the size of the dataframe for very large responses, e.g. complete_history over
+                many regions. Not used with async_mode.
+            output : { 'pandas', 'arrow' }, optional
+                'arrow' returns a pyarrow.Table, built directly from the responses, with
+                dictionary-encoded id columns and UTC timestamps. Its points are not added to the
+                dataframe returned by later calls. Requires pyarrow, and cannot be combined with
+                index_by_series, include_names or compress_format.
+            compact : boolean, optional
+                If set, the dataframe is built to use less memory: id columns use the smallest
+                integer type that holds them, name columns are categoricals sharing one set of
+                names, and the deprecated input_unit_id and input_unit_scale columns are left out,
+                as are metadata columns of series that weren't requested with show_metadata.
+            value_dtype : string or numpy.dtype, optional
+                Type of the value column, e.g. 'float32' to halve its size at the cost of
+                precision. Defaults to float64.
+            columns : list of strings, optional
+                Only these columns of the points are decoded and returned, e.g.
+                ['end_date', 'value', 'region_id']. See :meth:`~.get_data_points`. Other fields of
+                the responses are skipped rather than built and dropped, which saves memory and
+                time in proportion. compress_format needs end_date, value and an id column, and
+                include_names only names the id columns that are selected.
+            spill_to : string, optional
+                A directory. If set, each series' points are written to a Parquet file there as
+                soon as they are fetched, instead of being held in memory, and a
+                :class:`groclient.arrow.PartitionedDataset` on the directory is returned. Points
+                can then be read for some of the series, or all of them, on demand. Requires
+                pyarrow, and cannot be combined with index_by_series, include_names or
+                compress_format. The directory can be reopened later with
+                :code:`groclient.arrow.PartitionedDataset(spill_to)`, and series fetched again
+                replace their points there.
+            unit_id : integer, optional
+                If set, the points of every series are converted to this unit, as if each had
+                been added with it. See :meth:`~.get_unit_converter`.
+            merge_requests : boolean, optional
+                If set, series that differ only in their metric, item or region ids are fetched
+                together in requests for lists of ids, and the responses split back between them.
+                See :meth:`~.batch_async_get_data_points`. Not used with stream.
+            date_partitions : integer, optional
+                If set, each series' date range is split into this many parts, which are fetched
+                concurrently. See :meth:`~.get_data_points`. Every saved series needs a start_date
+                and an end_date. Series are fetched one after another, so async_mode, stream and
+                merge_requests are not used. Requires pandas output.
         Returns
         -------
-        pandas.DataFrame
+        pandas.DataFrame or pyarrow.Table or groclient.arrow.PartitionedDataset
             The results to :meth:`~.get_data_points` for all the saved series, appended together
             into a single dataframe.
             See https://developers.gro-intelligence.com/data-point-definition.html
@@ -1154,6 +1574,75 @@ class GroClient(object):
             and (reporting_history or show_revisions or complete_history)
         ), "compress_format cannot be used simultaneously with reporting_history or complete_history"
 
+        self._decoded_columns(columns, {})
+        if compress_format and columns is not None:
+            if not {"end_date", "value"}.issubset(columns):
+                raise ValueError("compress_format needs the end_date and value columns")
+            if not intersect(DATA_SERIES_UNIQUE_TYPES_ID + ["unit_id"], columns):
+                raise ValueError(
+                    "compress_format needs an id column to name the series' columns"
+                )
+
+        if output == "arrow" or spill_to is not None:
+            if date_partitions is not None:
+                raise ValueError(
+                    "date_partitions can't be used with arrow output or spill_to"
+                )
+            if index_by_series or include_names or compress_format:
+                raise ValueError(
+                    "index_by_series, include_names and compress_format can't be "
+                    "used with arrow output or spill_to"
+                )
+        if output not in ["pandas", "arrow"]:
+            raise ValueError(
+                "output must be 'pandas' or 'arrow', not {}".format(output)
+            )
+        if unit_id is not None:
+            # Copies, so the added selections are left as they were.
+            self._data_series_queue = [
+                dict(data_series, unit_id=unit_id)
+                for data_series in self._data_series_queue
+            ]
+        if spill_to is not None:
+            with arrow.PartitionedDataset(spill_to, self._logger) as dataset:
+                self._load_data_series(
+                    lambda data_series, points: dataset.write_table(
+                        data_series,
+                        arrow.columns_to_table(
+                            points, self._source_id_column(data_series, columns)
+                        ),
+                    ),
+                    reporting_history or show_revisions,
+                    complete_history,
+                    async_mode,
+                    stream,
+                    columns,
+                    merge_requests,
+                )
+            return dataset
+        if output == "arrow":
+            tables = []
+            self._load_data_series(
+                lambda data_series, points: tables.append(
+                    arrow.columns_to_table(
+                        points, self._source_id_column(data_series, columns)
+                    )
+                ),
+                reporting_history or show_revisions,
+                complete_history,
+                async_mode,
+                stream,
+                columns,
+                merge_requests,
+            )
+            return arrow.concat_tables(tables)
+
+        add_data_frame = partial(
+            self._add_data_frame,
+            compact=compact,
+            value_dtype=value_dtype,
+            columns=columns,
+        )
         data_series_list = []
         while self._data_series_queue:
             data_series = self._data_series_queue.pop()
@@ -1161,19 +1650,50 @@ class GroClient(object):
                 data_series["reporting_history"] = True
             if complete_history:
                 data_series["complete_history"] = True
-            if async_mode:
+            if date_partitions is not None:
+                add_data_frame(
+                    None,
+                    data_series,
+                    self._fetch_date_partitions(
+                        self._get_data_points_df,
+                        planner.stitch_frames,
+                        columns,
+                        date_partitions,
+                        data_series,
+                    ),
+                )
+            elif async_mode or merge_requests:
                 data_series_list.append(data_series)
+            elif stream:
+                for df in self._stream_data_points_df(columns, **data_series):
+                    add_data_frame(None, data_series, df)
             else:
-                self.add_points_to_df(
-                    None, data_series, self.get_data_points(**data_series)
+                add_data_frame(
+                    None,
+                    data_series,
+                    self._get_data_points_df(columns, **data_series),
                 )
 
-        if async_mode:
-            self.batch_async_get_data_points(
+        if merge_requests:
+            for data_series, points in self._iter_merged_data_points(
+                data_series_list, columns, async_mode
+            ):
+                add_data_frame(None, data_series, pandas.DataFrame(points))
+        elif async_mode:
+            # Failures are raised here, outside the IOLoop.
+            for data_series, df in self.iter_async_queue(
+                partial(self._get_data_points_df_generator, columns),
                 data_series_list,
-                output_list=self._data_frame,
-                map_result=self.add_points_to_df,
-            )
+            ):
+                if isinstance(df, Exception):
+                    raise df
+                add_data_frame(None, data_series, df)
+
+        self._concat_pending_frames()
+        if compact:
+            # Once for all the series: downcast per series, they would be
+            # upcast again by the concat.
+            self._data_frame = self._downcast_ids(self._data_frame)
 
         if compress_format:
             include_names = True
@@ -1182,21 +1702,11 @@ class GroClient(object):
             return self._data_frame
 
         if include_names:
-            name_cols = []
-            for entity_type_id in DATA_SERIES_UNIQUE_TYPES_ID + ["unit_id"]:
-                name_col = entity_type_id.replace("_id", "_name")
-                name_cols.append(name_col)
-                entity_dict = self.lookup(
-                    ENTITY_KEY_TO_TYPE[entity_type_id],
-                    self._data_frame[entity_type_id].unique(),
-                )
-                self._data_frame[name_col] = self._data_frame[entity_type_id].apply(
-                    lambda entity_id: entity_dict.get(str(entity_id))["name"]
-                )
+            name_cols = self._add_name_columns(compact)
 
             if compress_format:
                 return self._data_frame.pivot_table(
-                    index="end_date", values="value", columns=name_cols
+                    index="end_date", values="value", columns=name_cols, observed=True
                 )
 
         if index_by_series:
@@ -1209,6 +1719,74 @@ class GroClient(object):
 
         return self._data_frame
 
+    def _add_name_columns(self, compact=False):
+        """Add a name column for each id column of the data frame.
+
+        The ids of every entity type are looked up concurrently, and each name
+        column is filled from its id column's factorized codes rather than row
+        by row.
+
+        Returns
+        -------
+        list of strings
+            The name columns.
+
+        """
+        id_cols = intersect(
+            DATA_SERIES_UNIQUE_TYPES_ID + ["unit_id"], self._data_frame.columns
+        )
+        if not id_cols:
+            return []
+        factorized = [pandas.factorize(self._data_frame[col]) for col in id_cols]
+        with ThreadPoolExecutor(max_workers=len(id_cols)) as executor:
+            entity_dicts = list(
+                executor.map(
+                    lambda col, unique_ids: (
+                        self.lookup(ENTITY_KEY_TO_TYPE[col], unique_ids)
+                        if len(unique_ids)
+                        else {}
+                    ),
+                    id_cols,
+                    [unique_ids for _, unique_ids in factorized],
+                )
+            )
+        names = [
+            [entity_dict[str(entity_id)].get("name") for entity_id in unique_ids]
+            for entity_dict, (_, unique_ids) in zip(entity_dicts, factorized)
+        ]
+        if compact:
+            # One set of categories shared by all name columns. Entities
+            # without a name are left missing, as categories can't be null.
+            name_dtype = pandas.CategoricalDtype(
+                pandas.unique(
+                    numpy.array(
+                        [
+                            name
+                            for name in itertools.chain(*names)
+                            if pandas.notna(name)
+                        ],
+                        dtype=object,
+                    )
+                )
+            )
+        name_cols = []
+        for col, (codes, _), col_names in zip(id_cols, factorized, names):
+            name_col = col.replace("_id", "_name")
+            name_cols.append(name_col)
+            # Missing ids have code -1, which picks the trailing None.
+            if compact:
+                category_codes = numpy.append(
+                    name_dtype.categories.get_indexer(col_names), -1
+                )
+                self._data_frame[name_col] = pandas.Categorical.from_codes(
+                    category_codes[codes], dtype=name_dtype
+                )
+            else:
+                self._data_frame[name_col] = numpy.array(
+                    col_names + [None], dtype=object
+                )[codes]
+        return name_cols
+
     def async_get_df(
         self,
         reporting_history=False,
@@ -1228,6 +1806,254 @@ class GroClient(object):
             show_revisions,
         )
 
+    def get_df_iter(
+        self,
+        reporting_history=False,
+        complete_history=False,
+        async_mode=False,
+        compact=False,
+        value_dtype=None,
+        columns=None,
+        max_pending=None,
+        merge_requests=False,
+    ):
+        """Fetch each saved data series, yielding its points as soon as they arrive.
+
+        Like :meth:`~.get_df`, but instead of waiting for every series and concatenating them,
+        yield one dataframe per series, so they can be processed, written out, or the loop
+        stopped early while the rest are still being fetched. The points are not added to the
+        dataframe returned by :meth:`~.get_df`.
+
+        Example::
+
+            client.add_data_series(item='corn', metric='production', region='brazil')
+            for data_series, df in client.get_df_iter(async_mode=True):
+                df.to_csv('{}.csv'.format(data_series['region_id']))
+
+        Parameters
+        ----------
+        reporting_history : boolean, optional
+        complete_history : boolean, optional
+        async_mode : boolean, optional
+            If set, series are fetched concurrently as in :meth:`~.get_df`, and yielded in the
+            order they complete.
+        compact : boolean, optional
+        value_dtype : string or numpy.dtype, optional
+        columns : list of strings, optional
+            See :meth:`~.get_df`.
+        max_pending : integer, optional
+            With async_mode, how many fetched series can wait to be yielded before fetching
+            pauses. Bounds memory when the loop body is slower than the requests. Defaults to
+            the number of concurrent requests.
+        merge_requests : boolean, optional
+            See :meth:`~.get_df`. The series of a merged request are yielded one after another
+            once it completes.
+
+        Yields
+        ------
+        tuple of (dict, pandas.DataFrame)
+            The data series, as saved by :meth:`~.add_single_data_series`, and its points.
+
+        """
+        self._decoded_columns(columns, {})
+        data_series_list = []
+        while self._data_series_queue:
+            data_series = self._data_series_queue.pop()
+            if reporting_history:
+                data_series["reporting_history"] = True
+            if complete_history:
+                data_series["complete_history"] = True
+            data_series_list.append(data_series)
+        prepare_data_frame = partial(
+            self._prepare_data_frame,
+            compact=compact,
+            value_dtype=value_dtype,
+            columns=columns,
+        )
+        if merge_requests:
+            for data_series, points in self._iter_merged_data_points(
+                data_series_list, columns, async_mode, max_pending
+            ):
+                yield data_series, self._parse_dates(
+                    prepare_data_frame(data_series, pandas.DataFrame(points))
+                )
+            return
+        if not async_mode:
+            for data_series in data_series_list:
+                df = self._get_data_points_df(columns, **data_series)
+                yield data_series, self._parse_dates(
+                    prepare_data_frame(data_series, df)
+                )
+            return
+        for data_series, df in self.iter_async_queue(
+            partial(self._get_data_points_df_generator, columns),
+            data_series_list,
+            max_pending,
+        ):
+            if isinstance(df, Exception):
+                raise df
+            yield data_series, self._parse_dates(prepare_data_frame(data_series, df))
+
+    def to_parquet(
+        self,
+        path,
+        reporting_history=False,
+        complete_history=False,
+        async_mode=False,
+        stream=False,
+        columns=None,
+        **kwargs
+    ):
+        """Write the points of each saved data series to a Parquet file.
+
+        Like :meth:`~.get_df`, but each series is written as soon as it has been fetched, so
+        the points are never all held in memory. Columns are as in :code:`get_df(output="arrow")`.
+        Requires pyarrow.
+
+        Parameters
+        ----------
+        path : string
+        reporting_history : boolean, optional
+        complete_history : boolean, optional
+        async_mode : boolean, optional
+        stream : boolean, optional
+        columns : list of strings, optional
+            See :meth:`~.get_df`.
+        **kwargs
+            Passed to :code:`pyarrow.parquet.ParquetWriter`, e.g. :code:`compression="zstd"`.
+
+        Returns
+        -------
+        integer
+            Number of points written.
+
+        """
+        with arrow.ParquetWriter(path, self._logger, **kwargs) as writer:
+            self._load_data_series(
+                lambda data_series, points: writer.write_table(
+                    arrow.columns_to_table(
+                        points, self._source_id_column(data_series, columns)
+                    )
+                ),
+                reporting_history,
+                complete_history,
+                async_mode,
+                stream,
+                columns,
+            )
+        return writer.rows
+
+    def sync(
+        self,
+        path,
+        reporting_history=False,
+        complete_history=False,
+        async_mode=False,
+        merge_requests=False,
+        **kwargs
+    ):
+        """Bring a local store of the saved data series up to date.
+
+        The first sync of a series fetches all its points. Later ones only fetch the points made
+        available since the previous sync, with available_since, and merge them into the stored
+        points: new points are added and revised ones replace their previous values. With
+        reporting_history or complete_history, every version of a point is kept instead. Fetch
+        volume then scales with how much the series changed rather than with their history.
+        Requires pyarrow.
+
+        Example::
+
+            client.add_data_series(item='corn', metric='production', region='brazil')
+            dataset = client.sync('corn_production')
+            df = dataset.to_pandas()
+
+        Parameters
+        ----------
+        path : string
+            Directory of the store, created by the first sync. See
+            :class:`groclient.arrow.SyncedDataset`.
+        reporting_history : boolean, optional
+        complete_history : boolean, optional
+        async_mode : boolean, optional
+        merge_requests : boolean, optional
+            See :meth:`~.get_df`. A store should always be synced with the same reporting_history
+            and complete_history.
+        **kwargs
+            Passed to :code:`pyarrow.parquet.ParquetWriter`, e.g. :code:`compression="zstd"`.
+
+        Returns
+        -------
+        groclient.arrow.SyncedDataset
+
+        """
+        # Watermarks are dates: points made available later on the day of a sync
+        # are fetched again by the next one, and merged in idempotently.
+        watermark = datetime.datetime.utcnow().strftime("%Y-%m-%d")
+        with arrow.SyncedDataset(path, self._logger, **kwargs) as dataset:
+            for data_series in self._data_series_queue:
+                since = dataset.watermark(data_series)
+                if since is not None:
+                    data_series["available_since"] = since
+            self._load_data_series(
+                lambda data_series, points: dataset.merge_table(
+                    data_series,
+                    arrow.columns_to_table(points, data_series["source_id"]),
+                    watermark,
+                    reporting_history or complete_history,
+                ),
+                reporting_history,
+                complete_history,
+                async_mode,
+                False,
+                merge_requests=merge_requests,
+            )
+        return dataset
+
+    def _load_data_series(
+        self,
+        add_columns,
+        reporting_history,
+        complete_history,
+        async_mode,
+        stream,
+        columns=None,
+        merge_requests=False,
+    ):
+        """Fetch every queued data series, passing each one's points to
+        :code:`add_columns(data_series, points)` as they arrive."""
+        arrow.require_pyarrow()
+        self._decoded_columns(columns, {})
+        data_series_list = []
+        while self._data_series_queue:
+            data_series = self._data_series_queue.pop()
+            if reporting_history:
+                data_series["reporting_history"] = True
+            if complete_history:
+                data_series["complete_history"] = True
+            data_series_list.append(data_series)
+        if merge_requests:
+            for data_series, points in self._iter_merged_data_points(
+                data_series_list, columns, async_mode
+            ):
+                add_columns(data_series, points)
+            return
+        if not async_mode:
+            for data_series in data_series_list:
+                for points in self._iter_data_points_columns(
+                    data_series, stream, columns
+                ):
+                    add_columns(data_series, points)
+            return
+        # Failures are raised here, outside the IOLoop: raising in a consumer
+        # would stop the loop instead.
+        for data_series, points in self.iter_async_queue(
+            partial(self._get_data_points_columns_generator, columns),
+            data_series_list,
+        ):
+            if isinstance(points, Exception):
+                raise points
+            add_columns(data_series, points)
+
     def add_points_to_df(self, index, data_series, data_points, *args):
         """Add the given datapoints to a pandas dataframe.
 
@@ -1239,26 +2065,93 @@ class GroClient(object):
 
         """
 
-        tmp = pandas.DataFrame(data=[dict_unnest(point) for point in data_points])
+        self._add_data_frame(
+            index,
+            data_series,
+            pandas.DataFrame(data=[dict_unnest(point) for point in data_points]),
+        )
+
+    def _add_data_frame(
+        self,
+        index,
+        data_series,
+        tmp,
+        *args,
+        compact=False,
+        value_dtype=None,
+        columns=None
+    ):
         if tmp.empty:
             return
+        # Concatenating into self._data_frame on every call would copy the
+        # whole accumulated frame each time, so frames are collected here and
+        # concatenated once by _concat_pending_frames.
+        self._pending_frames.append(
+            self._prepare_data_frame(
+                data_series, tmp, compact, value_dtype, columns, downcast_ids=False
+            )
+        )
+
+    def _prepare_data_frame(
+        self,
+        data_series,
+        tmp,
+        compact=False,
+        value_dtype=None,
+        columns=None,
+        downcast_ids=True,
+    ):
         # get_data_points response doesn't include the
         # source_id. We add it as a column, in case we have
         # several selections series which differ only by source id.
-        tmp["source_id"] = data_series["source_id"]
-        # tmp should always have end_date/start_date/reporting_date/available_date as columns if not empty
-        tmp.end_date = pandas.to_datetime(tmp.end_date)
-        tmp.start_date = pandas.to_datetime(tmp.start_date)
-        tmp.reporting_date = pandas.to_datetime(tmp.reporting_date)
-        if "available_date" in tmp.columns:
-            tmp.available_date = pandas.to_datetime(tmp.available_date)
+        if columns is None or "source_id" in columns:
+            tmp["source_id"] = data_series["source_id"]
+        if compact:
+            tmp = self._compact_data_frame(tmp, data_series.get("show_metadata"))
+            if downcast_ids:
+                tmp = self._downcast_ids(tmp)
+        if value_dtype is not None and "value" in tmp.columns:
+            tmp["value"] = tmp["value"].astype(value_dtype)
+        return tmp
+
+    @staticmethod
+    def _compact_data_frame(df, keep_metadata=False):
+        """Drop the redundant columns of a series' points."""
+        dropped = ["input_unit_id", "input_unit_scale"]
+        if not keep_metadata:
+            dropped += [
+                column for column in df.columns if column.startswith("metadata")
+            ]
+        return df.drop(columns=dropped, errors="ignore")
+
+    @staticmethod
+    def _downcast_ids(df):
+        """Store the id columns in the smallest integer type that holds them."""
+        for column in DATA_SERIES_UNIQUE_TYPES_ID + ["unit_id"]:
+            if column in df.columns and df[column].notna().all():
+                df[column] = pandas.to_numeric(df[column], downcast="integer")
+        return df
+
+    def _concat_pending_frames(self):
+        if not self._pending_frames:
+            return
+        tmp = self._parse_dates(pandas.concat(self._pending_frames))
+        self._pending_frames = []
 
         if self._data_frame.empty:
             self._data_frame = tmp
         else:
             self._data_frame = pandas.concat([self._data_frame, tmp])
 
-    def get_data_points(self, **selections):
+    @staticmethod
+    def _parse_dates(df):
+        # Date columns can be left out by a columns= projection.
+        for column in ["end_date", "start_date", "reporting_date", "available_date"]:
+            if column in df.columns:
+                df[column] = pandas.to_datetime(df[column])
+        return df
+
+    def get_data_points(self, columns=None, date_partitions=None, **selections):
         """Get all the data points for a given selection.
 
         https://developers.gro-intelligence.com/data-point-definition.html
@@ -1377,26 +2270,198 @@ class GroClient(object):
             Fetch points since last data retrieval where available date is equal to or after this date
         show_metadata : bool, optional
             False by default. If True, include metadata for each datapoint within the response.
+        columns : list of strings, optional
+            Only these keys of the points are decoded and returned, e.g.
+            ['end_date', 'value', 'region_id']. Any of start_date, end_date, value, unit_id,
+            metadata, input_unit_id, input_unit_scale, reporting_date, available_date, metric_id,
+            item_id, region_id, partner_region_id and frequency_id. All of them by default.
+        date_partitions : integer, optional
+            If set, the range from start_date to end_date, which are then required, is split into
+            this many parts of about the same length, which are fetched concurrently. Their
+            points are joined in order, and points that span two parts are only returned once,
+            as told apart by their ids and dates. Speeds up long daily series, whose single
+            response would be slow to generate and download.
 
         Returns
         -------
         list of dicts
 
         """
+        if date_partitions is not None:
+            return self._fetch_date_partitions(
+                self.get_data_points,
+                planner.stitch_points,
+                columns,
+                date_partitions,
+                selections,
+            )
         data_points = lib.get_data_points(
-            self.access_token, self.api_host, **selections
+            self.access_token,
+            self.api_host,
+            columns=self._decoded_columns(columns, selections),
+            **selections,
+            session=self._session,
         )
         # Apply unit conversion if a unit is specified
         if "unit_id" in selections:
-            return list(
-                map(
-                    partial(self.convert_unit, target_unit_id=selections["unit_id"]),
-                    data_points,
-                )
-            )
+            self.get_unit_converter().convert_points(data_points, selections["unit_id"])
+            if columns is not None and "unit_id" not in columns:
+                for point in data_points:
+                    del point["unit_id"]
         # Return data points in input units if not unit is specified
         return data_points
 
+    def _fetch_date_partitions(
+        self, fetch, stitch, columns, date_partitions, selection
+    ):
+        """Fetch the parts of :func:`planner.partition_dates` concurrently, with
+        :code:`fetch(columns, **part)`, and join their points with :code:`stitch`."""
+        partitions = planner.partition_dates(selection, date_partitions)
+        partition_columns = planner.partition_columns(columns)
+        with ThreadPoolExecutor(
+            max_workers=min(len(partitions), self._num_consumers())
+        ) as executor:
+            results = list(
+                executor.map(
+                    lambda partition: fetch(partition_columns, **partition),
+                    partitions,
+                )
+            )
+        return stitch(results, columns)
+
+    def _get_data_points_df(self, columns=None, **selections):
+        """Like :meth:`~.get_data_points`, but decoded straight into a DataFrame."""
+        df = lib.get_data_points_df(
+            self.access_token,
+            self.api_host,
+            columns=self._decoded_columns(columns, selections),
+            **selections,
+            session=self._session,
+        )
+        return self._convert_points_unit(df, selections, columns)
+
+    def _stream_data_points_df(self, columns=None, **selections):
+        """Like :meth:`~._get_data_points_df`, but yield a DataFrame per series
+        as the response downloads."""
+        for points in self._iter_data_points_columns(selections, True, columns):
+            yield pandas.DataFrame(points)
+
+    @staticmethod
+    def _decoded_columns(columns, selection):
+        """Columns to decode for a :code:`columns` projection of a selection's
+        points, checking their names. Unit conversion needs unit_id, even if it
+        isn't one of them."""
+        if columns is None:
+            return None
+        unknown = [
+            column
+            for column in columns
+            if column not in lib.DATA_POINT_COLUMNS + ["source_id"]
+            and not column.startswith("metadata_")
+        ]
+        if unknown:
+            raise ValueError(
+                "Unknown columns {}. Columns can be any of {}".format(
+                    unknown, ", ".join(lib.DATA_POINT_COLUMNS + ["source_id"])
+                )
+            )
+        if "unit_id" in selection and "unit_id" not in columns:
+            return list(columns) + ["unit_id"]
+        return list(columns)
+
+    def _convert_points_unit(self, points, selection, columns=None):
+        """Convert columns of points to the selection's unit, if it has one,
+        dropping unit_id if it was only decoded for the conversion."""
+        if "unit_id" in selection:
+            self.get_unit_converter().convert_columns(points, selection["unit_id"])
+            if columns is not None and "unit_id" not in columns:
+                del points["unit_id"]
+        return points
+
+    @staticmethod
+    def _source_id_column(data_series, columns=None):
+        """source_id to add to a series' points, None if not in :code:`columns`."""
+        if columns is None or "source_id" in columns:
+            return data_series["source_id"]
+        return None
+
+    def _iter_data_points_columns(self, selections, stream=False, columns=None):
+        """Get the points for a selection as :func:`lib.list_of_series_to_columns`,
+        converted to the selection's unit. If :code:`stream` is set, yield the
+        columns of each series as the response downloads, otherwise once for the
+        whole response. Only :code:`columns` are decoded, if given."""
+        if stream:
+            series_lists = (
+                [series]
+                for series in lib.stream_list_of_series(
+                    self.access_token,
+                    self.api_host,
+                    **selections,
+                    session=self._session,
+                )
+            )
+        else:
+            series_lists = [
+                lib.get_list_of_series(
+                    self.access_token,
+                    self.api_host,
+                    **selections,
+                    session=self._session,
+                )
+            ]
+        include_historical = selections.get("include_historical", True)
+        decoded_columns = self._decoded_columns(columns, selections)
+        for series_list in series_lists:
+            points = lib.list_of_series_to_columns(
+                series_list, include_historical, decoded_columns
+            )
+            yield self._convert_points_unit(points, selections, columns)
+
+    def _iter_merged_data_points(
+        self, data_series_list, columns=None, async_mode=False, max_pending=None
+    ):
+        """Fetch the points of data series in the requests :func:`planner.plan_requests`
+        merges them into, yielding each series and its
+        :func:`lib.list_of_series_to_columns` as its request completes."""
+        plan = planner.plan_requests(data_series_list)
+        if async_mode:
+            responses = (
+                (index, list_of_series)
+                for index, list_of_series in self.iter_async_queue(
+                    lambda index: self._async_get_list_of_series(plan[index][0]),
+                    list(range(len(plan))),
+                    max_pending,
+                )
+            )
+        else:
+            responses = (
+                (
+                    index,
+                    lib.get_list_of_series(
+                        self.access_token,
+                        self.api_host,
+                        **request,
+                        session=self._session,
+                    ),
+                )
+                for index, (request, _) in enumerate(plan)
+            )
+        for index, list_of_series in responses:
+            if isinstance(list_of_series, Exception):
+                raise list_of_series
+            members = [data_series_list[idx] for idx in plan[index][1]]
+            for data_series, series_list in zip(
+                members, planner.demultiplex(list_of_series, members)
+            ):
+                points = lib.list_of_series_to_columns(
+                    series_list,
+                    data_series.get("include_historical", True),
+                    self._decoded_columns(columns, data_series),
+                )
+                yield data_series, self._convert_points_unit(
+                    points, data_series, columns
+                )
+
     def GDH(self, gdh_selection, **optional_selections):
         """Wrapper for :meth:`~.get_data_points`. with alternative input and output style.
 
@@ -1748,32 +2813,44 @@ class GroClient(object):
             new unit_id. Other properties are unchanged.
 
         """
-        if point.get("unit_id") is None or point.get("unit_id") == target_unit_id:
-            return point
-        from_convert_factor = self.lookup("units", point["unit_id"]).get(
-            "baseConvFactor"
-        )
-        if not from_convert_factor.get("factor"):
-            raise Exception("unit_id {} is not convertible".format(point["unit_id"]))
-        to_convert_factor = self.lookup("units", target_unit_id).get("baseConvFactor")
-        if not to_convert_factor.get("factor"):
-            raise Exception("unit_id {} is not convertible".format(target_unit_id))
-
-        if point.get("value") is not None:
-            point["value"] = lib.convert_value(
-                point["value"], from_convert_factor, to_convert_factor
-            )
-        if (
-            point.get("metadata") is not None
-            and point["metadata"].get("conf_interval") is not None
-        ):
-            point["metadata"]["conf_interval"] = lib.convert_value(
-                point["metadata"]["conf_interval"],
-                from_convert_factor,
-                to_convert_factor,
+        return self.get_unit_converter().convert_points([point], target_unit_id)[0]
+
+    def convert_unit_df(self, df, target_unit_id):
+        """Convert a dataframe of data points to another unit.
+
+        Vectorized equivalent of :meth:`~.convert_unit`, for the output of :meth:`~.get_df`.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            With unit_id and value columns, and optionally metadata_conf_interval.
+        target_unit_id : integer
+
+        Returns
+        -------
+        pandas.DataFrame
+            A copy of :code:`df`, with unit_id changed to the target, and value and
+            metadata_conf_interval converted to it. Points without a unit are unchanged.
+
+        """
+        return self.get_unit_converter().convert_columns(df.copy(), target_unit_id)
+
+    def get_unit_converter(self):
+        """Get the client's :class:`groclient.units.UnitConverter`.
+
+        The conversion factors of all units are requested once, the first time, and kept.
+        Units missing from them are looked up when first converted.
+
+        Returns
+        -------
+        groclient.units.UnitConverter
+
+        """
+        if self._unit_converter is None:
+            self._unit_converter = UnitConverter(
+                self.get_available("units"), partial(self.lookup, "units")
             )
-        point["unit_id"] = target_unit_id
-        return point
+        return self._unit_converter
 
     def get_area_weighting_series_names(self):
         """Returns a list of valid series names that can be used to
@@ -1791,7 +2868,9 @@ class GroClient(object):
                     ...
                 ]
         """
-        return lib.get_area_weighting_series_names(self.access_token, self.api_host)
+        return lib.get_area_weighting_series_names(
+            self.access_token, self.api_host, session=self._session
+        )
 
     def get_area_weighting_weight_names(self):
         """Returns a list of valid weight names that can be used to
@@ -1807,7 +2886,9 @@ class GroClient(object):
                     ...
                 ]
         """
-        return lib.get_area_weighting_weight_names(self.access_token, self.api_host)
+        return lib.get_area_weighting_weight_names(
+            self.access_token, self.api_host, session=self._session
+        )
 
     def get_area_weighted_series(
         self,
@@ -1887,6 +2968,7 @@ class GroClient(object):
             method,
             latest_date_only,
             metadata,
+            session=self._session,
         )
 
     def get_area_weighting_weight_metadata(
@@ -1920,6 +3002,7 @@ class GroClient(object):
             self.api_host,
             "weight",
             names,
+            session=self._session,
         )
 
     def get_area_weighting_series_metadata(
@@ -1955,6 +3038,7 @@ class GroClient(object):
             self.api_host,
             "series",
             names,
+            session=self._session,
         )
 
     def reverse_geocode_points(self, points: list):
@@ -1990,7 +3074,9 @@ class GroClient(object):
           'l3_name': 'East Timor'}]
         ```
         """
-        return lib.reverse_geocode_points(self.access_token, self.api_host, points)
+        return lib.reverse_geocode_points(
+            self.access_token, self.api_host, points, session=self._session
+        )
 
     def get_area_weighted_series_df(
         self,
@@ -2047,4 +3133,5 @@ class GroClient(object):
             start_date,
             end_date,
             method,
+            session=self._session,
         )
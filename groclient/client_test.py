@@ -8,25 +8,36 @@ from datetime import date
 import os
 import pandas as pd
 from pandas.testing import assert_frame_equal
-from unittest import TestCase
-
-from groclient import GroClient
-from groclient.utils import zip_selections
-from groclient.mock_data import mock_entities, mock_data_series, mock_data_points
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+
+from tornado import gen
+
+from groclient import GroClient, arrow
+from groclient.bitemporal import BitemporalStore
+from groclient.client import BatchError
+from groclient.utils import dict_unnest, zip_selections
+from groclient.mock_data import (
+    mock_entities,
+    mock_data_series,
+    mock_data_points,
+    mock_list_of_series_points,
+)
 
 MOCK_HOST = "pytest.groclient.url"
 MOCK_TOKEN = "pytest.groclient.token"
 
 
-def mock_get_available(access_token, api_host, entity_type):
+def mock_get_available(access_token, api_host, entity_type, session=None):
     return list(mock_entities[entity_type].values())
 
 
-def mock_list_available(access_token, api_host, selected_entities):
+def mock_list_available(access_token, api_host, selected_entities, session=None):
     return [dict(data_series) for data_series in mock_data_series]
 
 
-def mock_lookup(access_token, api_host, entity_type, entity_ids):
+def mock_lookup(access_token, api_host, entity_type, entity_ids, session=None):
     try:
         entity_ids = list(entity_ids)
         return {
@@ -38,15 +49,15 @@ def mock_lookup(access_token, api_host, entity_type, entity_ids):
         return mock_entities[entity_type][entity_ids]
 
 
-def mock_get_allowed_units(access_token, api_host, metric_id, item_id):
+def mock_get_allowed_units(access_token, api_host, metric_id, item_id, session=None):
     return [unit["id"] for unit in mock_entities["units"].values()]
 
 
-def mock_get_data_series(access_token, api_host, **selection):
+def mock_get_data_series(access_token, api_host, session=None, **selection):
     return [dict(data_series) for data_series in mock_data_series]
 
 
-def mock_search(access_token, api_host, entity_type, search_terms):
+def mock_search(access_token, api_host, entity_type, search_terms, session=None):
     return [
         {"id": entity["id"]}
         for entity in mock_entities[entity_type].values()
@@ -54,18 +65,18 @@ def mock_search(access_token, api_host, entity_type, search_terms):
     ]
 
 
-def mock_rank_series_by_source(access_token, api_host, selections_list):
+def mock_rank_series_by_source(access_token, api_host, selections_list, session=None):
     for data_series in mock_data_series:
         yield data_series
 
 
-def mock_get_geo_centre(access_token, api_host, region_id):
+def mock_get_geo_centre(access_token, api_host, region_id, session=None):
     return [
         {"centre": [45.7228, -112.996], "regionId": 1215, "regionName": "United States"}
     ]
 
 
-def mock_get_geojson(access_token, api_host, region_id, zoom_level):
+def mock_get_geojson(access_token, api_host, region_id, zoom_level, session=None):
     if zoom_level < 7:
         return {
             "type": "GeometryCollection",
@@ -80,7 +91,9 @@ def mock_get_geojson(access_token, api_host, region_id, zoom_level):
         }
 
 
-def mock_get_geojsons(access_token, api_host, region_id, descendant_level, zoom_level):
+def mock_get_geojsons(
+    access_token, api_host, region_id, descendant_level, zoom_level, session=None
+):
     return [
         {
             "region_id": 13051,
@@ -129,6 +142,7 @@ def mock_get_descendant(
     include_details=True,
     descendant_level=None,
     include_historical=True,
+    session=None,
 ):
     childs = [
         child
@@ -165,6 +179,7 @@ def mock_get_ancestor(
     include_details=True,
     ancestor_level=None,
     include_historical=True,
+    session=None,
 ):
     childs = [
         child
@@ -192,7 +207,7 @@ def mock_get_ancestor(
         return [{"id": child["id"]} for child in childs]
 
 
-def mock_get_available_timefrequency(access_token, api_host, **selection):
+def mock_get_available_timefrequency(access_token, api_host, session=None, **selection):
     return [
         {
             "start_date": "2000-02-18T00:00:00.000Z",
@@ -209,7 +224,9 @@ def mock_get_available_timefrequency(access_token, api_host, **selection):
     ]
 
 
-def mock_get_top(access_token, api_host, entity_type, num_results, **selection):
+def mock_get_top(
+    access_token, api_host, entity_type, num_results, session=None, **selection
+):
     return [
         {
             "metricId": 860032,
@@ -241,13 +258,15 @@ def mock_get_top(access_token, api_host, entity_type, num_results, **selection):
     ]
 
 
-def mock_get_data_points(access_token, api_host, **selections):
+def mock_get_data_points(
+    access_token, api_host, session=None, columns=None, **selections
+):
     if isinstance(selections["region_id"], int):
         data_point = dict(mock_data_points[0])
         # set the data_point to use the selected region
         # other ids in mocked data points may not line up with selected ids
         data_point["region_id"] = selections["region_id"]
-        return [data_point]
+        data_points = [data_point]
     elif isinstance(selections["region_id"], list):
         data_points = []
         for idx, region_id in enumerate(selections["region_id"]):
@@ -256,14 +275,32 @@ def mock_get_data_points(access_token, api_host, **selections):
             data_point = dict(mock_data_points[idx % 2])
             data_point["region_id"] = region_id
             data_points.append(data_point)
-        return data_points
+    if columns is not None:
+        data_points = [
+            {key: value for key, value in point.items() if key in columns}
+            for point in data_points
+        ]
+    return data_points
+
+
+def mock_get_data_points_df(
+    access_token, api_host, session=None, columns=None, **selections
+):
+    return pd.DataFrame(
+        [
+            dict_unnest(point)
+            for point in mock_get_data_points(
+                access_token, api_host, columns=columns, **selections
+            )
+        ]
+    )
 
 
-def mock_get_area_weighting_series_names(access_token, api_host):
+def mock_get_area_weighting_series_names(access_token, api_host, session=None):
     return ["CPC_max_temp_daily", "CPC_min_temp_daily", "ET_PET_monthly"]
 
 
-def mock_get_area_weighting_weight_names(access_token, api_host):
+def mock_get_area_weighting_weight_names(access_token, api_host, session=None):
     return ["Almonds (CA only)", "Bananas (ha)", "Canola (ha)"]
 
 
@@ -281,11 +318,12 @@ def mock_get_area_weighted_series(
     method,
     latest_date_only,
     metadata,
+    session=None,
 ):
     return {"2022-07-11": 0.715615, "2022-07-19": 0.733129, "2022-07-27": 0.748822}
 
 
-def mock_reverse_geocode_points(access_token, api_host, points):
+def mock_reverse_geocode_points(access_token, api_host, points, session=None):
     return [
         {
             "latitude": 33.4484,
@@ -320,6 +358,7 @@ def mock_get_area_weighted_series_df(
     start_date,
     end_date,
     method,
+    session=None,
 ):
     return pd.DataFrame(
         data=[
@@ -354,6 +393,9 @@ def mock_get_area_weighted_series_df(
 )
 @patch("groclient.lib.get_top", MagicMock(side_effect=mock_get_top))
 @patch("groclient.lib.get_data_points", MagicMock(side_effect=mock_get_data_points))
+@patch(
+    "groclient.lib.get_data_points_df", MagicMock(side_effect=mock_get_data_points_df)
+)
 @patch(
     "groclient.lib.get_area_weighting_series_names",
     MagicMock(side_effect=mock_get_area_weighting_series_names),
@@ -496,12 +538,369 @@ class GroClientTests(TestCase):
         series = zip_selections(indexed_df.iloc[0].name)
         self.assertEqual(series, mock_data_series[0])
 
+    def test_get_df_include_names(self):
+        for region_id in [12345, 1215]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], region_id=region_id)
+            )
+        with patch.object(self.client, "lookup", wraps=self.client.lookup) as lookup:
+            df = self.client.get_df(include_names=True)
+        # One lookup per entity type, however many rows.
+        self.assertEqual(lookup.call_count, 7)
+        self.assertEqual(list(df["region_name"]), ["United States", "Minnesota"])
+        self.assertEqual(list(df["item_name"]), ["Corn", "Corn"])
+        self.assertEqual(list(df["unit_name"]), ["tonne", "tonne"])
+
+        for region_id in [12345, 1215]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], region_id=region_id)
+            )
+        compressed = self.client.get_df(compress_format=True, compact=True)
+        self.assertEqual(compressed.shape, (1, 2))
+        self.assertEqual(
+            sorted(compressed.columns.get_level_values("region_name")),
+            ["Minnesota", "United States"],
+        )
+
+    def test_get_df_compact(self):
+        for region_id in [12345, 1215]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], region_id=region_id)
+            )
+        df = self.client.get_df(include_names=True, compact=True, value_dtype="float32")
+        self.assertEqual(df["region_id"].dtype, "int16")
+        self.assertEqual(df["partner_region_id"].dtype, "int8")
+        self.assertEqual(df["value"].dtype, "float32")
+        self.assertNotIn("input_unit_id", df.columns)
+        self.assertTrue(isinstance(df["region_name"].dtype, pd.CategoricalDtype))
+        # All name columns share one set of categories.
+        self.assertEqual(df["region_name"].dtype, df["item_name"].dtype)
+        self.assertEqual(list(df["region_name"]), ["United States", "Minnesota"])
+
+    def test_get_df_compact_missing_name(self):
+        for region_id in [12345, 1215]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], region_id=region_id)
+            )
+        unnamed = dict(mock_entities["regions"][12345], name=None)
+        with patch.dict(mock_entities["regions"], {12345: unnamed}):
+            df = self.client.get_df(include_names=True, compact=True)
+        self.assertEqual(df["region_name"].iloc[0], "United States")
+        self.assertTrue(pd.isna(df["region_name"].iloc[1]))
+        self.assertFalse(df["region_name"].dtype.categories.isna().any())
+        # Ids are downcast once all the series are concatenated.
+        self.assertEqual(df["region_id"].dtype, "int16")
+        self.assertEqual(df["item_id"].dtype, "int16")
+
+    def test_get_df_columns(self):
+        self.client.add_single_data_series(dict(mock_data_series[0], unit_id=10))
+        df = self.client.get_df(
+            columns=["end_date", "value", "region_id", "source_id"], include_names=True
+        )
+        self.assertEqual(
+            list(df.columns),
+            [
+                "end_date",
+                "value",
+                "region_id",
+                "source_id",
+                "region_name",
+                "source_name",
+            ],
+        )
+        self.assertEqual(df.iloc[0]["end_date"].date(), date(2017, 12, 31))
+        self.assertEqual(df.iloc[0]["value"], 40891000)
+        with self.assertRaises(ValueError):
+            self.client.get_df(columns=["region_id"], compress_format=True)
+
+    def test_get_df_columns_without_ids(self):
+        self.client.add_single_data_series(mock_data_series[0])
+        df = self.client.get_df(columns=["end_date", "value"], include_names=True)
+        self.assertEqual(list(df.columns), ["end_date", "value"])
+        self.assertEqual(list(df["value"]), [40891])
+        with self.assertRaisesRegex(ValueError, "id column"):
+            self.client.get_df(columns=["end_date", "value"], compress_format=True)
+
+    def test_get_df_iter(self):
+        for region_id in [1215, 12345]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], region_id=region_id)
+            )
+        results = list(self.client.get_df_iter(columns=["end_date", "region_id"]))
+        self.assertEqual(
+            [data_series["region_id"] for data_series, _ in results], [12345, 1215]
+        )
+        for data_series, df in results:
+            self.assertEqual(list(df.columns), ["end_date", "region_id"])
+            self.assertEqual(list(df["region_id"]), [data_series["region_id"]])
+            self.assertEqual(df.iloc[0]["end_date"].date(), date(2017, 12, 31))
+        # The series were consumed, and their points not kept.
+        self.assertTrue(self.client.get_df().empty)
+
     def test_get_df_complete_history(self):
         self.client.add_single_data_series(mock_data_series[0])
         df = self.client.get_df(complete_history=True)
         self.assertEqual(df.iloc[0]["reporting_date"].date(), date(2018, 1, 1))
         self.assertEqual(df.iloc[0]["available_date"].date(), date(2018, 1, 31))
 
+    def test_get_df_unit_conversion(self):
+        self.client.add_single_data_series(dict(mock_data_series[0], unit_id=10))
+        df = self.client.get_df()
+        self.assertEqual(df.iloc[0]["unit_id"], 10)
+        self.assertEqual(df.iloc[0]["value"], 40891000)
+
+    def test_get_df_unit_id(self):
+        self.client.add_single_data_series(mock_data_series[0])
+        with patch(
+            "groclient.lib.get_available", side_effect=mock_get_available
+        ) as get_available:
+            df = self.client.get_df(unit_id=10)
+            self.assertEqual(list(df["value"]), [40891000])
+            self.assertEqual(list(df["unit_id"]), [10])
+            converted = self.client.convert_unit_df(df, 14)
+        self.assertEqual(list(converted["value"]), [40891])
+        self.assertEqual(list(converted["unit_id"]), [14])
+        self.assertEqual(list(df["unit_id"]), [10])
+        # The factors of all units are requested once.
+        get_available.assert_called_once()
+
+    def test_get_df_async_error(self):
+        error = BatchError(Exception("Bad request"), 0, "v2/data", {})
+        points_df = self.client._get_data_points_df
+
+        @gen.coroutine
+        def get_data_points_df(columns=None, **selection):
+            if selection["region_id"] == 12345:
+                raise gen.Return(error)
+            raise gen.Return(points_df(columns, **selection))
+
+        for region_id in [1215, 12345]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], region_id=region_id)
+            )
+        with patch.object(
+            self.client, "_get_data_points_df_generator", get_data_points_df
+        ):
+            # The series' error is raised, rather than stopping the IOLoop.
+            with self.assertRaises(BatchError) as raised:
+                self.client.get_df(async_mode=True)
+        self.assertIs(raised.exception, error)
+
+    def test_get_df_unit_id_invalid(self):
+        selection = dict(mock_data_series[0])
+        self.client.add_single_data_series(selection)
+        with self.assertRaises(ValueError):
+            self.client.get_df(unit_id=10, output="csv")
+        with self.assertRaisesRegex(ValueError, "end_date and value"):
+            self.client.get_df(unit_id=10, columns=["value"], compress_format=True)
+        # A request that fails validation leaves the added series unchanged.
+        self.assertNotIn("unit_id", self.client._data_series_queue[0])
+        self.assertNotIn("unit_id", selection)
+        df = self.client.get_df()
+        self.assertEqual(list(df["value"]), [40891])
+
+    @patch("groclient.lib.get_list_of_series")
+    def test_get_df_merge_requests(self, get_list_of_series):
+        def list_of_series(access_token, api_host, session=None, **selection):
+            series = mock_list_of_series_points[0]
+            return [
+                dict(
+                    series,
+                    series=dict(
+                        series["series"],
+                        regionId=region_id,
+                        belongsTo=dict(
+                            series["series"]["belongsTo"], regionId=region_id
+                        ),
+                    ),
+                )
+                for region_id in selection["region_id"]
+            ]
+
+        get_list_of_series.side_effect = list_of_series
+        for region_id in [1215, 12345]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], region_id=region_id)
+            )
+        df = self.client.get_df(merge_requests=True, include_names=True)
+        get_list_of_series.assert_called_once()
+        self.assertEqual(get_list_of_series.call_args[1]["region_id"], [12345, 1215])
+        self.assertEqual(
+            list(df["region_name"]),
+            ["Minnesota", "Minnesota", "United States", "United States"],
+        )
+        self.assertEqual(list(df["source_id"]), [2] * 4)
+
+    def test_get_df_concatenates_once(self):
+        for region_id in [1215, 1216, 1217]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], region_id=region_id)
+            )
+        with patch("pandas.concat", wraps=pd.concat) as concat:
+            df = self.client.get_df()
+        concat.assert_called_once()
+        self.assertEqual(sorted(df["region_id"]), [1215, 1216, 1217])
+        self.assertEqual(df.iloc[0]["end_date"].date(), date(2017, 12, 31))
+
+    @patch("groclient.lib.stream_list_of_series")
+    def test_get_df_stream(self, stream_list_of_series):
+        stream_list_of_series.side_effect = lambda *args, **kwargs: iter(
+            mock_list_of_series_points * 2
+        )
+        self.client.add_single_data_series(dict(mock_data_series[0], unit_id=10))
+        df = self.client.get_df(stream=True)
+        self.assertEqual(len(df), 4)
+        self.assertEqual(list(df["unit_id"]), [10] * 4)
+        self.assertEqual(list(df["value"]), [40891000, 56789, 40891000, 56789])
+        self.assertEqual(df.iloc[1]["reporting_date"].date(), date(2019, 3, 14))
+
+    @skipIf(arrow.pyarrow is None, "pyarrow is not installed")
+    @patch(
+        "groclient.lib.get_list_of_series",
+        MagicMock(return_value=mock_list_of_series_points),
+    )
+    def test_get_df_arrow(self):
+        self.client.add_single_data_series(dict(mock_data_series[0], unit_id=10))
+        table = self.client.get_df(output="arrow")
+        self.assertEqual(table.column("value").to_pylist(), [40891000, 56789])
+        self.assertEqual(table.column("unit_id").to_pylist(), [10, 10])
+        self.assertEqual(table.column("source_id").to_pylist(), [2, 2])
+        # Arrow output isn't added to the client's dataframe.
+        self.assertTrue(self.client.get_df().empty)
+        with self.assertRaises(ValueError):
+            self.client.get_df(include_names=True, output="arrow")
+
+    @skipIf(arrow.pyarrow is None, "pyarrow is not installed")
+    @patch("groclient.lib.stream_list_of_series")
+    def test_to_parquet(self, stream_list_of_series):
+        stream_list_of_series.side_effect = lambda *args, **kwargs: iter(
+            mock_list_of_series_points * 2
+        )
+        self.client.add_single_data_series(mock_data_series[0])
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "points.parquet")
+        self.assertEqual(self.client.to_parquet(path, stream=True), 4)
+        table = arrow.pyarrow.parquet.read_table(path)
+        self.assertEqual(table.column("value").to_pylist(), [40891, 56789] * 2)
+
+    @skipIf(arrow.pyarrow is None, "pyarrow is not installed")
+    @patch(
+        "groclient.lib.get_list_of_series",
+        MagicMock(return_value=mock_list_of_series_points),
+    )
+    def test_get_df_spill_to(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for source_id in [2, 3]:
+            self.client.add_single_data_series(
+                dict(mock_data_series[0], source_id=source_id)
+            )
+        dataset = self.client.get_df(spill_to=directory)
+        self.assertEqual(len(dataset), 4)
+        self.assertEqual([s["source_id"] for s in dataset.series()], [2, 3])
+        df = dataset.to_pandas(source_id=3)
+        self.assertEqual(list(df["value"]), [40891, 56789])
+        self.assertEqual(list(df["source_id"]), [3, 3])
+        # The points aren't kept in memory.
+        self.assertTrue(self.client.get_df().empty)
+        with self.assertRaises(ValueError):
+            self.client.get_df(index_by_series=True, spill_to=directory)
+
+    @skipIf(arrow.pyarrow is None, "pyarrow is not installed")
+    @patch("groclient.lib.get_list_of_series")
+    def test_sync(self, get_list_of_series):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        get_list_of_series.return_value = mock_list_of_series_points
+        self.client.add_single_data_series(mock_data_series[0])
+        dataset = self.client.sync(directory)
+        self.assertNotIn("available_since", get_list_of_series.call_args[1])
+        self.assertEqual(len(dataset), 2)
+
+        # A revision of the 2017 point, and a new point for 2019.
+        get_list_of_series.return_value = [
+            dict(
+                mock_list_of_series_points[0],
+                data=[
+                    [
+                        "2017-01-01T00:00:00.000Z",
+                        "2017-12-31T00:00:00.000Z",
+                        1,
+                        None,
+                        14,
+                    ],
+                    [
+                        "2019-01-01T00:00:00.000Z",
+                        "2019-12-31T00:00:00.000Z",
+                        7,
+                        None,
+                        14,
+                    ],
+                ],
+            )
+        ]
+        # As in a later run, by a new client.
+        client = GroClient(MOCK_HOST, MOCK_TOKEN)
+        client.add_single_data_series(mock_data_series[0])
+        dataset = client.sync(directory)
+        self.assertEqual(
+            get_list_of_series.call_args[1]["available_since"],
+            dataset.watermark(mock_data_series[0]),
+        )
+        df = dataset.to_pandas()
+        self.assertEqual(list(df["value"]), [1, 56789, 7])
+        self.assertEqual(list(df["source_id"]), [2, 2, 2])
+
+    @skipIf(arrow.pyarrow is None, "pyarrow is not installed")
+    @patch("groclient.lib.get_list_of_series")
+    def test_sync_complete_history(self, get_list_of_series):
+        def versions(*values_and_dates):
+            return [
+                dict(
+                    mock_list_of_series_points[0],
+                    data=[
+                        [
+                            "2017-01-01T00:00:00.000Z",
+                            "2017-12-31T00:00:00.000Z",
+                            value,
+                            None,
+                            14,
+                            {},
+                            available_date,
+                        ]
+                        for value, available_date in values_and_dates
+                    ],
+                )
+            ]
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        get_list_of_series.return_value = versions(
+            (1, "2018-01-01T00:00:00.000Z"), (2, "2018-06-01T00:00:00.000Z")
+        )
+        self.client.add_single_data_series(mock_data_series[0])
+        self.assertEqual(len(self.client.sync(directory, complete_history=True)), 2)
+
+        # The latest version again, and a new one.
+        get_list_of_series.return_value = versions(
+            (2, "2018-06-01T00:00:00.000Z"), (3, "2019-01-01T00:00:00.000Z")
+        )
+        client = GroClient(MOCK_HOST, MOCK_TOKEN)
+        client.add_single_data_series(mock_data_series[0])
+        df = client.sync(directory, complete_history=True).to_pandas()
+        self.assertEqual(list(df["value"]), [1, 2, 3])
+        self.assertEqual(
+            list(df["available_date"].dt.date),
+            [date(2018, 1, 1), date(2018, 6, 1), date(2019, 1, 1)],
+        )
+
+        # The synced versions answer point-in-time queries.
+        store = BitemporalStore(df)
+        self.assertEqual(list(store.as_of("2018-03-01")["value"]), [1])
+        self.assertEqual(list(store.as_of("2018-12-31")["value"]), [2])
+        self.assertEqual(list(store.as_of("2019-01-01")["value"]), [3])
+
     def test_add_points_to_df(self):
         self.client.add_points_to_df(None, mock_data_series[0], [])
         self.assertTrue(self.client.get_df().empty)
@@ -530,6 +929,69 @@ class GroClientTests(TestCase):
         self.assertEqual(data_points[0]["unit_id"], 10)
         self.assertEqual(data_points[0]["value"], 40891000)
 
+    def test_get_data_points_date_partitions(self):
+        selections = dict(
+            mock_data_series[0], start_date="1980-01-01", end_date="2019-12-31"
+        )
+        with patch(
+            "groclient.lib.get_data_points", side_effect=mock_get_data_points
+        ) as get_data_points:
+            data_points = self.client.get_data_points(
+                columns=["value"], date_partitions=4, **selections
+            )
+        dates = sorted(
+            (call[1]["start_date"], call[1]["end_date"])
+            for call in get_data_points.call_args_list
+        )
+        self.assertEqual(len(dates), 4)
+        self.assertEqual(dates[0][0], "1980-01-01")
+        self.assertEqual(dates[-1][1], "2019-12-31")
+        # Each part starts the day after the previous one ends.
+        for (_, end_date), (start_date, _) in zip(dates, dates[1:]):
+            self.assertEqual(
+                pd.Timestamp(end_date) + pd.Timedelta(days=1),
+                pd.Timestamp(start_date),
+            )
+        # The mock returns the same point for every part.
+        self.assertEqual(data_points, [{"value": 40891}])
+
+        self.client.add_single_data_series(selections)
+        df = self.client.get_df(date_partitions=4)
+        self.assertEqual(len(df), 1)
+        self.assertEqual(df.iloc[0]["source_id"], 2)
+
+    def test_get_data_points_date_partitions_complete_history(self):
+        def versions(access_token, api_host, session=None, columns=None, **selection):
+            # Every part returns both versions of the same point.
+            return [
+                dict(mock_data_points[0], value=value, available_date=available_date)
+                for value, available_date in [
+                    (1, "2018-01-01T00:00:00.000Z"),
+                    (2, "2018-06-01T00:00:00.000Z"),
+                ]
+            ]
+
+        selections = dict(
+            mock_data_series[0],
+            start_date="2017-01-01",
+            end_date="2017-12-31",
+            complete_history=True,
+        )
+        with patch("groclient.lib.get_data_points", side_effect=versions):
+            data_points = self.client.get_data_points(date_partitions=3, **selections)
+        self.assertEqual([point["value"] for point in data_points], [1, 2])
+
+    def test_get_data_points_columns(self):
+        selections = dict(mock_data_series[0], unit_id=10)
+        data_points = self.client.get_data_points(
+            columns=["end_date", "value"], **selections
+        )
+        self.assertEqual(
+            data_points, [{"end_date": "2017-12-31T00:00:00.000Z", "value": 40891000}]
+        )
+        with self.assertRaises(ValueError):
+            self.client.get_data_points(columns=["end_date", "valeu"], **selections)
+
     def test_GDH(self):
         df = self.client.GDH("860032-274-1215-0-9-2")
         self.assertEqual(df.iloc[0]["start_date"].date(), date(2017, 1, 1))
@@ -755,7 +1217,7 @@ class GroClientConstructorTests(TestCase):
         with patch("groclient.lib.get_available") as get_available:
             _ = client.get_available("items")
             get_available.assert_called_once_with(
-                MOCK_TOKEN, self.PROD_API_HOST, "items"
+                MOCK_TOKEN, self.PROD_API_HOST, "items", session=client._session
             )
 
     # A common use case: user passes an API token but no API host.
@@ -764,14 +1226,16 @@ class GroClientConstructorTests(TestCase):
         with patch("groclient.lib.get_available") as get_available:
             _ = client.get_available("items")
             get_available.assert_called_once_with(
-                MOCK_TOKEN, self.PROD_API_HOST, "items"
+                MOCK_TOKEN, self.PROD_API_HOST, "items", session=client._session
             )
 
     def test_explicit_host_and_token(_self):
         client = GroClient(MOCK_HOST, MOCK_TOKEN)
         with patch("groclient.lib.get_available") as get_available:
             _ = client.get_available("items")
-            get_available.assert_called_once_with(MOCK_TOKEN, MOCK_HOST, "items")
+            get_available.assert_called_once_with(
+                MOCK_TOKEN, MOCK_HOST, "items", session=client._session
+            )
 
     def test_missing_token(self):
         # Explicitly unset GROAPI_TOKEN if it's set (eg, its set in our Shippable config).
@@ -785,3 +1249,34 @@ class GroClientConstructorTests(TestCase):
                 RuntimeError, "environment variable must be set"
             ):
                 _ = GroClient()
+
+    def test_connection_pool_size(self):
+        client = GroClient(MOCK_HOST, MOCK_TOKEN, connection_pool_size=3)
+        adapter = client._session.get_adapter("https://" + MOCK_HOST)
+        self.assertEqual(adapter._pool_maxsize, 3)
+
+    def test_cache_dir(self):
+        env_without_cache = {
+            k: v for k, v in os.environ.items() if k != "GROCLIENT_CACHE_DIR"
+        }
+        with patch.dict(os.environ, env_without_cache, clear=True):
+            self.assertIsNone(GroClient(MOCK_HOST, MOCK_TOKEN)._session.cache)
+            client = GroClient(MOCK_HOST, MOCK_TOKEN, cache_dir="/tmp/gro-cache")
+            self.assertEqual(client._session.cache.cache_dir, "/tmp/gro-cache")
+        with patch.dict(os.environ, {"GROCLIENT_CACHE_DIR": "/tmp/gro-env-cache"}):
+            client = GroClient(MOCK_HOST, MOCK_TOKEN)
+            self.assertEqual(client._session.cache.cache_dir, "/tmp/gro-env-cache")
+
+    def test_cache_info(self):
+        client = GroClient(MOCK_HOST, MOCK_TOKEN, memory_cache_size=1024)
+        self.assertEqual(client.cache_info(), (0, 0, 0, 0, 1024))
+        client._session.memory_cache.set("key", "value")
+        self.assertEqual(client.cache_info().entries, 1)
+        client.cache_clear()
+        self.assertEqual(client.cache_info().entries, 0)
+
+    def test_session_closed_on_delete(self):
+        client = GroClient(MOCK_HOST, MOCK_TOKEN)
+        with patch.object(client._session, "close") as close:
+            client.__del__()
+            close.assert_called_once()
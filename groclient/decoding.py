@@ -0,0 +1,78 @@
+"""JSON decoding for API responses.
+
+Parsing dominates the time spent on large responses, such as data points for
+daily series or region geometries. When orjson or pysimdjson is installed,
+responses are decoded with it, several times faster than the standard library.
+Otherwise the standard library json module is used.
+"""
+
+import json
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# Installed backends, fastest first.
+BACKENDS = OrderedDict()
+if orjson is not None:
+    BACKENDS["orjson"] = orjson.loads
+if simdjson is not None:
+    BACKENDS["simdjson"] = simdjson.loads
+BACKENDS["json"] = json.loads
+
+_backend = next(iter(BACKENDS))
+
+
+def get_backend():
+    """Name of the backend used by :func:`loads`."""
+    return _backend
+
+
+def set_backend(name):
+    """Choose the backend used by :func:`loads`.
+
+    Parameters
+    ----------
+    name : string
+        One of the installed backends in :data:`BACKENDS`: :code:`"orjson"`,
+        :code:`"simdjson"` or :code:`"json"`.
+
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(
+            "JSON backend {} is not installed. Available: {}".format(
+                name, ", ".join(BACKENDS)
+            )
+        )
+    _backend = name
+
+
+def loads(data):
+    """Decode a JSON document.
+
+    Parameters
+    ----------
+    data : bytes or string
+
+    Returns
+    -------
+    list or dict or scalar
+
+    """
+    if _backend == "json":
+        return json.loads(data)
+    try:
+        return BACKENDS[_backend](data)
+    except ValueError:
+        # The faster backends reject some documents the standard library
+        # accepts, like NaN or integers beyond 64 bits. Retrying keeps results
+        # and errors the same whichever backend is installed.
+        return json.loads(data)
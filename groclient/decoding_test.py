@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+from groclient import decoding
+
+PAYLOAD = (
+    '[{"series": {"metricId": 860032, "unitId": 14}, "data": '
+    '[["2017-01-01T00:00:00.000Z", "2017-12-31T00:00:00.000Z", 40891.5, null, '
+    '14, {"confInterval": 2}, "2018-01-31T00:00:00.000Z"]], "name": "Ma\\u00efs"}]'
+)
+
+
+class DecodingTests(TestCase):
+    def tearDown(self):
+        decoding.set_backend(next(iter(decoding.BACKENDS)))
+
+    def test_backends_agree(self):
+        expected = decoding.BACKENDS["json"](PAYLOAD)
+        for backend in decoding.BACKENDS:
+            decoding.set_backend(backend)
+            self.assertEqual(decoding.get_backend(), backend)
+            self.assertEqual(decoding.loads(PAYLOAD), expected)
+            self.assertEqual(decoding.loads(PAYLOAD.encode("utf-8")), expected)
+
+    def test_falls_back_to_json(self):
+        for backend in decoding.BACKENDS:
+            decoding.set_backend(backend)
+            self.assertEqual(
+                decoding.loads("[1e400, 123456789012345678901234567890]"),
+                [float("inf"), 123456789012345678901234567890],
+            )
+            with self.assertRaises(ValueError):
+                decoding.loads("[1,")
+
+    def test_set_backend(self):
+        with self.assertRaises(ValueError):
+            decoding.set_backend("yaml")
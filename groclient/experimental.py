@@ -105,7 +105,7 @@ class Experimental(GroClient):
                 ]
         """
         data_stream_list = lib.get_data_points_v2_prime(
-            self.access_token, self.api_host, **selections
+            self.access_token, self.api_host, session=self._session, **selections
         )
 
         # due to the issue in javascript when dealing with 'int64'
@@ -178,7 +178,7 @@ class Experimental(GroClient):
                 1  32.734329      2021-12-20    2021-12-21   2540047    3457  100023990               NaN            1        26      36
         """
         res = lib.get_data_points_v2_prime(
-            self.access_token, self.api_host, **selections
+            self.access_token, self.api_host, session=self._session, **selections
         )
 
         v2_data_description_meta = [
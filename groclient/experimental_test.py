@@ -34,11 +34,17 @@ class ExperimentalTests(TestCase):
         point = res[0]['data_points'][0]
         self.assertTrue(isinstance(point["start_timestamp"], int))
         self.assertTrue(isinstance(point["end_timestamp"], int))
+        mock_get_data_points.assert_called_once_with(
+            MOCK_TOKEN, MOCK_HOST, session=self.client._session, **mock_v2_prime_data_request
+        )
 
     @patch("groclient.lib.get_data_points_v2_prime")
     def test_get_data_points_df(self, mock_get_data_points):
         mock_get_data_points.return_value = mock_v2_prime_data_response.copy()
         df = self.client.get_data_points_df(**mock_v2_prime_data_request)
+        mock_get_data_points.assert_called_once_with(
+            MOCK_TOKEN, MOCK_HOST, session=self.client._session, **mock_v2_prime_data_request
+        )
 
         expected_df = pd.DataFrame({
             "value": [33.20, 32.73],
@@ -7,29 +7,41 @@ than here.
 
 from builtins import str
 from groclient import cfg
+from groclient.cache import MemoryCache
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from groclient.constants import (
     REGION_LEVELS,
     DATA_SERIES_UNIQUE_TYPES_ID,
     ITR_CHUNK_READ_SIZE,
 )
+import groclient.decoding
 import groclient.utils
+import codecs
+import functools
 import json
+import itertools
 import logging
+import numpy
+import operator
+import random
+import re
 import requests
 import time
+from email.utils import parsedate_tz, mktime_tz
 import platform
 import warnings
 import pandas as pd
 
 from pkg_resources import get_distribution, DistributionNotFound
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Optional, Union, Any
+from urllib3.util.retry import Retry
 
 try:
-    # functools are native in Python 3.2.3+
-    from functools import lru_cache as memoize
+    import ijson
 except ImportError:
-    from backports.functools_lru_cache import lru_cache as memoize
+    ijson = None
 
 # Interpreter and API client library version information.
 #
@@ -73,6 +85,142 @@ class APIError(Exception):
             )
 
 
+class JSONResponse(requests.Response):
+    """A requests.Response whose :meth:`json` uses :func:`groclient.decoding.loads`."""
+
+    def json(self, **kwargs):
+        if kwargs or not self.content:
+            return super(JSONResponse, self).json(**kwargs)
+        return groclient.decoding.loads(self.content)
+
+
+class APIAdapter(HTTPAdapter):
+    """An HTTPAdapter that builds :class:`JSONResponse` objects."""
+
+    def build_response(self, req, resp):
+        response = super(APIAdapter, self).build_response(req, resp)
+        # JSONResponse only overrides a method, so the response built by
+        # requests can be converted in place.
+        response.__class__ = JSONResponse
+        return response
+
+
+class APISession(requests.Session):
+    """A requests.Session with a pooled, keep-alive connection adapter.
+
+    Reusing one session across requests avoids a new TCP and TLS handshake per
+    call. Connection-level failures (refused connections, dropped sockets) are
+    retried by the adapter; HTTP error statuses are still handled by
+    :func:`get_data`. Responses are decoded with the fastest installed JSON
+    library, see :mod:`groclient.decoding`.
+
+    Parameters
+    ----------
+    pool_size : integer, optional
+        Maximum number of connections kept alive per host.
+    max_retries : integer, optional
+        Number of times the adapter retries a request on connection errors.
+    rate_limiter : groclient.ratelimit.RateLimiter, optional
+        If given, every request made through the session, retries included,
+        first waits for a token from the limiter.
+    cache : groclient.cache.SQLiteCache, optional
+        If given, responses from ontology and discovery endpoints are cached
+        there. See :func:`get_cached_json`.
+    memory_cache : groclient.cache.MemoryCache, optional
+        In-memory cache for the results of :func:`cached` functions called with
+        this session. Defaults to a new cache with the default budget.
+
+    """
+
+    def __init__(
+        self,
+        pool_size=cfg.CONNECTION_POOL_SIZE,
+        max_retries=cfg.CONNECTION_RETRIES,
+        rate_limiter=None,
+        cache=None,
+        memory_cache=None,
+    ):
+        super(APISession, self).__init__()
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.memory_cache = memory_cache if memory_cache is not None else MemoryCache()
+        adapter = APIAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=max_retries,
+                connect=max_retries,
+                read=0,
+                status=0,
+                backoff_factor=0.1,
+            ),
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        if self.rate_limiter is None:
+            return super(APISession, self).request(method, url, *args, **kwargs)
+        self.rate_limiter.acquire(url)
+        response = super(APISession, self).request(method, url, *args, **kwargs)
+        # Hold back every request sharing this limit, not just this one.
+        retry_after = get_retry_after(response.headers)
+        if retry_after:
+            self.rate_limiter.pause(url, retry_after)
+        return response
+
+
+# Results of cached functions called without an APISession.
+_default_memory_cache = MemoryCache()
+_MISSING = object()
+
+
+def cached(func):
+    """Cache a lib function's results in memory.
+
+    Calls made with an :class:`APISession` use the session's own
+    :code:`memory_cache`, so each client's cache is bounded and released along
+    with the client. Other calls share a module-wide cache; see
+    :func:`cache_info` and :func:`cache_clear`.
+
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = kwargs.get("session")
+        if isinstance(session, APISession):
+            memory_cache = session.memory_cache
+            kwargs_key = [(k, v) for k, v in kwargs.items() if k != "session"]
+        else:
+            memory_cache = _default_memory_cache
+            kwargs_key = list(kwargs.items())
+        key = (func.__name__, args, tuple(sorted(kwargs_key)))
+        result = memory_cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = func(*args, **kwargs)
+            memory_cache.set(key, result)
+        return result
+
+    return wrapper
+
+
+def cache_info():
+    """Statistics of the cache used by lib functions called without a session.
+
+    Returns
+    -------
+    groclient.cache.CacheInfo
+
+    """
+    return _default_memory_cache.cache_info()
+
+
+def cache_clear():
+    """Clear the cache used by lib functions called without a session."""
+    _default_memory_cache.cache_clear()
+
+
 def get_default_logger():
     """Get a logging object using the default log level set in cfg.
 
@@ -134,12 +282,86 @@ def convert_value(value, from_convert_factor, to_convert_factor):
         value * from_convert_factor.get("factor")
     ) + from_convert_factor.get("offset", 0)
 
-    return float(
-        value_in_base_unit - to_convert_factor.get("offset", 0)
-    ) / to_convert_factor.get("factor")
+    return (value_in_base_unit - to_convert_factor.get("offset", 0)) / float(
+        to_convert_factor.get("factor")
+    )
+
+
+def get_retry_after(headers):
+    """Number of seconds the server asked the client to wait, if any.
+
+    Reads the :code:`Retry-After` header, in seconds or as an HTTP date, and
+    the :code:`X-RateLimit-Remaining`/:code:`X-RateLimit-Reset` pair (also
+    without the :code:`X-` prefix), where the reset is in seconds or a Unix
+    timestamp.
+
+    >>> get_retry_after({'Retry-After': '3'})
+    3.0
+    >>> get_retry_after({'X-RateLimit-Remaining': '5', 'X-RateLimit-Reset': '3'})
+
+    Parameters
+    ----------
+    headers : dict-like
+        Response headers. Lookups should be case-insensitive, as they are for
+        both requests and tornado responses.
+
+    Returns
+    -------
+    float or None
+
+    """
+    retry_after = headers.get("Retry-After")
+    if isinstance(retry_after, str):
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            retry_at = parsedate_tz(retry_after)
+            if retry_at is not None:
+                return max(mktime_tz(retry_at) - time.time(), 0.0)
+    remaining = headers.get("X-RateLimit-Remaining", headers.get("RateLimit-Remaining"))
+    reset = headers.get("X-RateLimit-Reset", headers.get("RateLimit-Reset"))
+    if isinstance(remaining, str) and isinstance(reset, str):
+        try:
+            if float(remaining) > 0:
+                return None
+            reset = float(reset)
+        except ValueError:
+            return None
+        # Large values are timestamps rather than a number of seconds.
+        if reset > 1e9:
+            reset -= time.time()
+        return max(reset, 0.0)
+    return None
+
 
+def get_backoff_delay(retry_count, retry_after=None):
+    """Number of seconds to wait before making the given retry of a request.
 
-def get_data(url, headers, params=None, logger=None, stream=False):
+    If the server said how long to wait, that is used. Otherwise the first retry
+    is immediate and after that the delay grows exponentially, with random jitter
+    so that requests throttled at the same time don't all retry at the same time
+    as well.
+
+    Parameters
+    ----------
+    retry_count : integer
+    retry_after : float, optional
+        Delay requested by the server. See :func:`get_retry_after`.
+
+    Returns
+    -------
+    float
+
+    """
+    if retry_after is not None:
+        return retry_after
+    if retry_count <= 0:
+        return 0
+    delay = 2**retry_count
+    return delay / 2.0 + random.uniform(0, delay / 2.0)
+
+
+def get_data(url, headers, params=None, logger=None, stream=False, session=None):
     """General 'make api request' function.
 
     Assigns headers and builds in retries and logging.
@@ -150,6 +372,10 @@ def get_data(url, headers, params=None, logger=None, stream=False):
     headers : dict
     params : dict
     logger : logging.Logger
+    stream : boolean, optional
+    session : APISession, optional
+        If given, the request reuses the session's pooled connections and is
+        paced by its rate limiter. Otherwise a one-off connection is made.
 
     Returns
     -------
@@ -164,10 +390,11 @@ def get_data(url, headers, params=None, logger=None, stream=False):
         logger = get_default_logger()
         logger.debug(url)
         logger.debug(params)
+    http = session if session is not None else requests
     while retry_count <= cfg.MAX_RETRIES:
         start_time = time.time()
         try:
-            response = requests.get(
+            response = http.get(
                 url, params=params, headers=headers, timeout=None, stream=stream
             )
         except Exception as e:
@@ -201,34 +428,67 @@ def get_data(url, headers, params=None, logger=None, stream=False):
             params = new_params
         else:
             logger.warning("{}".format(response), extra=log_record)
-            if retry_count > 0:
-                # Retry immediately on first failure.
-                # Exponential backoff before retrying repeatedly failing requests.
-                time.sleep(2**retry_count)
+            # Retry immediately on first failure, unless the server said
+            # otherwise. Exponential backoff before retrying repeatedly
+            # failing requests.
+            retry_after = (
+                get_retry_after(response.headers)
+                if hasattr(response, "headers")
+                else None
+            )
+            time.sleep(get_backoff_delay(retry_count, retry_after))
         retry_count += 1
     raise APIError(response, retry_count, url, params)
 
 
-@memoize(maxsize=None)
-def get_allowed_units(access_token, api_host, metric_id, item_id):
+def get_cached_json(url, headers, params=None, session=None):
+    """Make a GET request and decode its JSON body, going through the session's
+    response cache if it has one.
+
+    Only use this for endpoints whose responses can be reused for a while; see
+    :class:`groclient.cache.SQLiteCache` for how long.
+
+    Parameters
+    ----------
+    url : string
+    headers : dict
+    params : dict, optional
+    session : APISession, optional
+
+    Returns
+    -------
+    data : list or dict
+
+    """
+    cache = getattr(session, "cache", None)
+    if cache is None:
+        return get_data(url, headers, params, session=session).json()
+    data = cache.get(url, params)
+    if data is None:
+        data = get_data(url, headers, params, session=session).json()
+        cache.set(url, params, data)
+    return data
+
+
+@cached
+def get_allowed_units(access_token, api_host, metric_id, item_id, session=None):
     url = "/".join(["https:", "", api_host, "v2/units/allowed"])
     headers = {"authorization": "Bearer " + access_token}
     params = {"metricIds": metric_id}
     if item_id:
         params["itemIds"] = item_id
-    resp = get_data(url, headers, params)
-    return [unit["id"] for unit in resp.json()["data"]]
+    data = get_cached_json(url, headers, params, session=session)
+    return [unit["id"] for unit in data["data"]]
 
 
-@memoize(maxsize=None)
-def get_available(access_token, api_host, entity_type):
+@cached
+def get_available(access_token, api_host, entity_type, session=None):
     url = "/".join(["https:", "", api_host, "v2", entity_type])
     headers = {"authorization": "Bearer " + access_token}
-    resp = get_data(url, headers)
-    return resp.json()["data"]
+    return get_cached_json(url, headers, session=session)["data"]
 
 
-def list_available(access_token, api_host, selected_entities):
+def list_available(access_token, api_host, selected_entities, session=None):
     url = "/".join(["https:", "", api_host, "v2/entities/list"])
     headers = {"authorization": "Bearer " + access_token}
     params = dict(
@@ -237,48 +497,128 @@ def list_available(access_token, api_host, selected_entities):
             for (key, value) in list(selected_entities.items())
         ]
     )
-    resp = get_data(url, headers, params)
+    resp = get_data(url, headers, params, session=session)
     try:
         return resp.json()["data"]
     except KeyError:
         raise Exception(resp.text)
 
 
-@memoize(maxsize=None)
-def lookup_single(access_token, api_host, entity_type, entity_id):
-    url = "/".join(["https:", "", api_host, "v2", entity_type])
-    headers = {"authorization": "Bearer " + access_token}
-    params = {"ids": [entity_id]}
-    resp = get_data(url, headers, params)
-    try:
-        return resp.json()["data"].get(str(entity_id))
-    except KeyError:
-        raise Exception(resp.text)
+def get_lookup_chunks(url, entity_ids):
+    """Split ids into as few lookup requests as fit within cfg.MAX_URL_LENGTH.
+
+    Each id is sent as an :code:`&ids=<id>` query parameter.
+
+    Parameters
+    ----------
+    url : string
+        The lookup URL, without query parameters.
+    entity_ids : list of integers
+
+    Returns
+    -------
+    list of lists of integers
+
+    """
+    return groclient.utils.list_chunk_by_size(
+        entity_ids,
+        cfg.MAX_URL_LENGTH - len(url) - 1,
+        lambda entity_id: len("&ids=") + len(str(entity_id)),
+    )
+
 
+def lookup_single(access_token, api_host, entity_type, entity_id, session=None):
+    return lookup_batch(
+        access_token, api_host, entity_type, [entity_id], session=session
+    ).get(str(entity_id))
 
-def lookup_batch(access_token, api_host, entity_type, entity_ids):
+
+def lookup_batch(access_token, api_host, entity_type, entity_ids, session=None):
+    """Look up entities by id, fetching only those not already cached.
+
+    Entities are cached one by one, in the same memory cache as :func:`cached`
+    functions and, if the session has one, the persistent cache. So an entity
+    fetched as part of one batch is reused by every later lookup that includes
+    it, whether single or batched.
+    """
     url = "/".join(["https:", "", api_host, "v2", entity_type])
     headers = {"authorization": "Bearer " + access_token}
+    if isinstance(session, APISession):
+        memory_cache, disk_cache, scope = session.memory_cache, session.cache, ()
+    else:
+        memory_cache, disk_cache, scope = (
+            _default_memory_cache,
+            None,
+            (access_token, session),
+        )
+
+    def cache_key(id_str):
+        return ("lookup", url, id_str) + scope
+
     all_results = {}
-    for id_batch in groclient.utils.list_chunk(entity_ids):
-        params = {"ids": id_batch}
-        resp = get_data(url, headers, params)
-        result = resp.json()["data"]
-        for id_str in result.keys():
-            all_results[id_str] = result[id_str]
+    missing_ids = []
+    for entity_id in entity_ids:
+        id_str = str(entity_id)
+        if id_str in all_results:
+            continue
+        entity = memory_cache.get(cache_key(id_str), _MISSING)
+        if entity is _MISSING and disk_cache is not None:
+            entity = disk_cache.get(url, {"id": id_str})
+            if entity is None:
+                entity = _MISSING
+            else:
+                memory_cache.set(cache_key(id_str), entity)
+        if entity is _MISSING:
+            missing_ids.append(entity_id)
+        elif entity is not None:
+            all_results[id_str] = entity
+
+    def fetch(id_batch):
+        resp = get_data(url, headers, {"ids": id_batch}, session=session)
+        try:
+            return resp.json()["data"]
+        except KeyError:
+            raise Exception(resp.text)
+
+    id_batches = get_lookup_chunks(url, list(OrderedDict.fromkeys(missing_ids)))
+    if len(id_batches) > 1:
+        # Fetch the chunks concurrently, within the connection pool's size.
+        pool_size = getattr(session, "pool_size", cfg.CONNECTION_POOL_SIZE)
+        with ThreadPoolExecutor(min(len(id_batches), pool_size)) as executor:
+            results = list(executor.map(fetch, id_batches))
+    else:
+        results = [fetch(id_batch) for id_batch in id_batches]
+
+    for id_batch, result in zip(id_batches, results):
+        fetched = []
+        for entity_id in id_batch:
+            id_str = str(entity_id)
+            entity = result.get(id_str)
+            # Cache ids the API doesn't know too, so they aren't requested again.
+            memory_cache.set(cache_key(id_str), entity)
+            if entity is not None:
+                fetched.append(({"id": id_str}, entity))
+                all_results[id_str] = entity
+        if disk_cache is not None:
+            # One transaction per chunk, rather than one per entity.
+            disk_cache.set_many(url, fetched)
     return all_results
 
 
-def lookup(access_token, api_host, entity_type, entity_ids):
+def lookup(access_token, api_host, entity_type, entity_ids, session=None):
     try:  # Convert iterable types like numpy arrays or tuples into plain lists
         entity_ids = list(entity_ids)
-        return lookup_batch(access_token, api_host, entity_type, entity_ids)
+        return lookup_batch(
+            access_token, api_host, entity_type, entity_ids, session=session
+        )
     except (
         TypeError
     ):  # Convert anything else, like strings or numpy integers, into plain integers
         entity_id = int(entity_ids)
         # If an integer is given, return only the dict with that id
-        return lookup_single(access_token, api_host, entity_type, entity_id)
+        return lookup_single(
+            access_token, api_host, entity_type, entity_id, session=session
+        )
 
 
 def get_params_from_selection(**selection):
@@ -378,14 +718,14 @@ def get_data_call_params(**selection):
     return params
 
 
-def get_data_series(access_token, api_host, **selection):
+def get_data_series(access_token, api_host, session=None, **selection):
     logger = get_default_logger()
     url = "/".join(["https:", "", api_host, "v2/data_series/list"])
     headers = {"authorization": "Bearer " + access_token}
     params = get_params_from_selection(**selection)
-    resp = get_data(url, headers, params)
+    data = get_cached_json(url, headers, params, session=session)
     try:
-        response = resp.json()["data"]
+        response = data["data"]
         if any(
             (series.get("metadata", {}).get("includes_historical_region", False))
             for series in response
@@ -396,21 +736,21 @@ def get_data_series(access_token, api_host, **selection):
             )
         return response
     except KeyError:
-        raise Exception(resp.text)
+        raise Exception(json.dumps(data))
 
 
-def stream_data_series(access_token, api_host, **selection):
+def stream_data_series(access_token, api_host, session=None, **selection):
     logger = get_default_logger()
     url = "/".join(["https:", "", api_host, "v2/stream/data_series/list"])
     headers = {"authorization": "Bearer " + access_token}
     params = get_params_from_selection(**selection)
-    resp = get_data(url, headers, params, logger, True)
+    resp = get_data(url, headers, params, logger, True, session=session)
     try:
         for line in resp.iter_lines(
             chunk_size=ITR_CHUNK_READ_SIZE, decode_unicode=True
         ):
             if line:
-                current_ds_list = json.loads(line)
+                current_ds_list = groclient.decoding.loads(line)
                 if any(
                     (
                         series.get("metadata", {}).get(
@@ -428,12 +768,14 @@ def stream_data_series(access_token, api_host, **selection):
         raise Exception(resp.text)
 
 
-def get_top(access_token, api_host, entity_type, num_results=5, **selection):
+def get_top(
+    access_token, api_host, entity_type, num_results=5, session=None, **selection
+):
     url = "/".join(["https:", "", api_host, "v2/top/{}".format(entity_type)])
     headers = {"authorization": "Bearer " + access_token}
     params = get_params_from_selection(**selection)
     params["n"] = num_results
-    resp = get_data(url, headers, params)
+    resp = get_data(url, headers, params, session=session)
     try:
         return resp.json()
     except KeyError as e:
@@ -446,12 +788,13 @@ def make_key(key):
     return key
 
 
-def get_source_ranking(access_token, api_host, series):
+def get_source_ranking(access_token, api_host, series, session=None):
     """Given a series, return a list of ranked sources.
 
     :param access_token: API access token.
     :param api_host: API host.
     :param series: Series to calculate source raking for.
+    :param session: Optional APISession to make the request with.
     :return: List of sources that match the series parameters, sorted by rank.
     """
     params = dict(
@@ -460,10 +803,10 @@ def get_source_ranking(access_token, api_host, series):
     )
     url = "/".join(["https:", "", api_host, "v2/available/sources"])
     headers = {"authorization": "Bearer " + access_token}
-    return get_data(url, headers, params).json()
+    return get_data(url, headers, params, session=session).json()
 
 
-def rank_series_by_source(access_token, api_host, selections_list):
+def rank_series_by_source(access_token, api_host, selections_list, session=None):
     series_map = OrderedDict()
     for selection in selections_list:
         series_key = ".".join(
@@ -487,7 +830,7 @@ def rank_series_by_source(access_token, api_host, selections_list):
         }
         try:
             source_ids = get_source_ranking(
-                access_token, api_host, series_without_source
+                access_token, api_host, series_without_source, session=session
             )
         # Catch "no content" response from get_source_ranking()
         except ValueError:
@@ -502,14 +845,14 @@ def rank_series_by_source(access_token, api_host, selections_list):
                 )
 
 
-def get_available_timefrequency(access_token, api_host, **series):
+def get_available_timefrequency(access_token, api_host, session=None, **series):
     params = dict(
         (make_key(k), v)
         for k, v in iter(list(get_params_from_selection(**series).items()))
     )
     url = "/".join(["https:", "", api_host, "v2/available/time-frequencies"])
     headers = {"authorization": "Bearer " + access_token}
-    response = get_data(url, headers, params)
+    response = get_data(url, headers, params, session=session)
     if response.status_code == 204:
         return []
     return [
@@ -519,9 +862,12 @@ def get_available_timefrequency(access_token, api_host, **series):
 
 
 def list_of_series_to_single_series(
-    series_list, add_belongs_to=False, include_historical=True
+    series_list, add_belongs_to=False, include_historical=True, columns=None
 ):
-    """Convert list_of_series format from API back into the familiar single_series output format."""
+    """Convert list_of_series format from API back into the familiar single_series output format.
+
+    If :code:`columns` is given, points only have those keys. See :func:`column_filter`.
+    """
     if not isinstance(series_list, list):
         # If the output is an error or None or something else that's not a list, just propagate
         return series_list
@@ -542,6 +888,16 @@ def list_of_series_to_single_series(
             series.get("series", {}).get("belongsTo", {}),
             groclient.utils.str_camel_to_snake,
         )
+        if columns is not None:
+            output.extend(
+                _project_points(
+                    series["series"],
+                    series.get("data", []),
+                    columns,
+                    belongs_to if add_belongs_to else None,
+                )
+            )
+            continue
         for point in series.get("data", []):
             formatted_point = {
                 "start_date": point[0],
@@ -584,7 +940,255 @@ def list_of_series_to_single_series(
     return output
 
 
-def get_data_points(access_token, api_host, **selection):
+# Fields of each point of a v2/data response, in order.
+_POINT_FIELDS = [
+    "start_date",
+    "end_date",
+    "value",
+    "reporting_date",
+    "unit_id",
+    "metadata",
+    "available_date",
+]
+
+# Columns of the points returned by get_data_points and get_data_points_df,
+# in order. metadata is flattened into metadata_<key> columns in DataFrames.
+DATA_POINT_COLUMNS = [
+    "start_date",
+    "end_date",
+    "value",
+    "unit_id",
+    "metadata",
+    "input_unit_id",
+    "input_unit_scale",
+    "reporting_date",
+    "available_date",
+    "metric_id",
+    "item_id",
+    "region_id",
+    "partner_region_id",
+    "frequency_id",
+]
+
+
+def column_filter(columns=None):
+    """Test whether a column is in a :code:`columns` projection.
+
+    Parameters
+    ----------
+    columns : list of strings, optional
+        Names from :data:`DATA_POINT_COLUMNS`. :code:`"metadata"` selects every
+        metadata_<key> column, which can also be selected one by one. If None,
+        every column is selected.
+
+    Returns
+    -------
+    function
+        Takes a column name and returns a boolean.
+
+    """
+    if columns is None:
+        return lambda name: True
+    columns = frozenset(columns)
+    return lambda name: name in columns or (
+        name.startswith("metadata_") and "metadata" in columns
+    )
+
+
+def _point_field(data, index, default=None):
+    """One field of every point in a series' data, default if it is missing."""
+    try:
+        return list(map(operator.itemgetter(index), data))
+    except IndexError:
+        # Older responses omit trailing fields.
+        return [point[index] if len(point) > index else default for point in data]
+
+
+def _project_points(attributes, data, columns, belongs_to=None):
+    """Points of a series as list_of_series_to_single_series formats them,
+    with only the keys in :code:`columns`. Each metadata_<key> column is a key
+    of its own, None where the point has no such metadata."""
+    unit_id = attributes.get("unitId", None)
+    getters = OrderedDict(
+        [
+            ("start_date", operator.itemgetter(0)),
+            ("end_date", operator.itemgetter(1)),
+            ("value", operator.itemgetter(2)),
+            ("unit_id", lambda point: point[4] if len(point) > 4 else unit_id),
+            (
+                "metadata",
+                lambda point: _format_point_metadata(
+                    point[5] if len(point) > 5 else None
+                ),
+            ),
+            ("input_unit_id", lambda point: point[4] if len(point) > 4 else unit_id),
+            ("input_unit_scale", lambda point: 1),
+            ("reporting_date", lambda point: point[3] if len(point) > 3 else None),
+            ("available_date", lambda point: point[6] if len(point) > 6 else None),
+        ]
+    )
+    for type_id in DATA_SERIES_UNIQUE_TYPES_ID:
+        if type_id != "source_id":
+            default = 0 if type_id == "partner_region_id" else None
+            value = attributes.get(groclient.utils.str_snake_to_camel(type_id), default)
+            getters[type_id] = lambda point, value=value: value
+    getters = [(name, getter) for name, getter in getters.items() if name in columns]
+    # metadata_<key> columns, as list_of_series_to_columns flattens them.
+    metadata_columns = [name for name in columns if name.startswith("metadata_")]
+    for point in data:
+        formatted_point = {name: getter(point) for name, getter in getters}
+        if metadata_columns:
+            metadata = groclient.utils.dict_unnest(
+                {
+                    "metadata": _format_point_metadata(
+                        point[5] if len(point) > 5 else None
+                    )
+                }
+            )
+            for name in metadata_columns:
+                formatted_point[name] = metadata.get(name)
+        if belongs_to is not None:
+            formatted_point["belongs_to"] = belongs_to
+        yield formatted_point
+
+
+def list_of_series_to_columns(series_list, include_historical=True, columns=None):
+    """Convert list_of_series format from API into columns of points.
+
+    Columnar equivalent of list_of_series_to_single_series followed by
+    dict_unnest on every point: the same fields, without building a dict per
+    point. Point fields are transposed into one array each and the series
+    attributes are repeated once per series, so large responses decode in a
+    fraction of the time and memory.
+
+    Parameters
+    ----------
+    series_list : list of dicts
+        Response from the v2/data endpoint.
+    include_historical : boolean, optional
+    columns : list of strings, optional
+        Only these columns are decoded. See :func:`column_filter`.
+
+    Returns
+    -------
+    collections.OrderedDict
+        Column name to numpy array, one element per point. Metadata is
+        flattened into metadata_<key> columns. Dates are left as strings.
+
+    """
+    if not isinstance(series_list, list):
+        series_list = []
+    selected = column_filter(columns)
+    decode_metadata = columns is None or any(
+        name.startswith("metadata") for name in columns
+    )
+    point_fields = OrderedDict(
+        (name, [])
+        for name in _POINT_FIELDS
+        if selected(name)
+        or (name == "unit_id" and selected("input_unit_id"))
+        or (name == "metadata" and decode_metadata)
+    )
+    series_ids = OrderedDict(
+        (type_id, [])
+        for type_id in [
+            "metric_id",
+            "item_id",
+            "region_id",
+            "partner_region_id",
+            "frequency_id",
+        ]
+        if selected(type_id)
+    )
+    counts = []
+    for series in series_list:
+        if not (isinstance(series, dict) and isinstance(series.get("data", []), list)):
+            continue
+        series_metadata = series.get("series", {}).get("metadata", {})
+        has_historical_regions = series_metadata.get(
+            "includesHistoricalRegion", False
+        ) or series_metadata.get("includesHistoricalPartnerRegion", False)
+        if not include_historical and has_historical_regions:
+            continue
+        data = series.get("data", [])
+        if not data:
+            continue
+        attributes = series["series"]
+        for name, column in point_fields.items():
+            # Points without a unit_id are in the series unit.
+            default = attributes.get("unitId", None) if name == "unit_id" else None
+            column.extend(_point_field(data, _POINT_FIELDS.index(name), default))
+        for type_id, column in series_ids.items():
+            default = 0 if type_id == "partner_region_id" else None
+            column.append(
+                attributes.get(groclient.utils.str_snake_to_camel(type_id), default)
+            )
+        counts.append(len(data))
+
+    result = OrderedDict()
+    for name in ["start_date", "end_date"]:
+        if selected(name):
+            result[name] = numpy.array(point_fields[name], dtype=object)
+    if selected("value"):
+        result["value"] = numpy.array(point_fields["value"], dtype=float)
+    if "unit_id" in point_fields:
+        unit_ids = numpy.array(point_fields["unit_id"])
+    if selected("unit_id"):
+        result["unit_id"] = unit_ids
+    if decode_metadata and any(point_fields["metadata"]):
+        metadata = pd.DataFrame(
+            [
+                groclient.utils.dict_unnest(
+                    {"metadata": _format_point_metadata(point_metadata)}
+                )
+                for point_metadata in point_fields["metadata"]
+            ]
+        )
+        for name in metadata.columns:
+            if selected(name):
+                result[name] = metadata[name].values
+    # input_unit_id and input_unit_scale are deprecated but provided for
+    # backwards compatibility. unit_id should be used instead.
+    if selected("input_unit_id"):
+        result["input_unit_id"] = unit_ids
+    if selected("input_unit_scale"):
+        result["input_unit_scale"] = numpy.ones(sum(counts), dtype=int)
+    for name in ["reporting_date", "available_date"]:
+        if selected(name):
+            result[name] = numpy.array(point_fields[name], dtype=object)
+    for type_id, values in series_ids.items():
+        result[type_id] = numpy.repeat(numpy.array(values), counts)
+    return result
+
+
+def list_of_series_to_df(series_list, include_historical=True, columns=None):
+    """Convert list_of_series format from API into a DataFrame of points.
+
+    See :func:`list_of_series_to_columns`.
+    """
+    return pd.DataFrame(
+        list_of_series_to_columns(series_list, include_historical, columns)
+    )
+
+
+def _format_point_metadata(point_metadata):
+    if not point_metadata:
+        return {}
+    if point_metadata.get("confInterval") is not None:
+        point_metadata = dict(point_metadata)
+        point_metadata["conf_interval"] = point_metadata.pop("confInterval")
+    return point_metadata
+
+
+def get_data_points_request(access_token, api_host, **selection):
+    """Build the v2/data request for a selection, checking required ids.
+
+    Returns
+    -------
+    tuple
+        The url, headers and params to pass to :func:`get_data`.
+
+    """
     logger = get_default_logger()
     headers = {"authorization": "Bearer " + access_token}
     url = "/".join(["https:", "", api_host, "v2/data"])
@@ -603,23 +1207,192 @@ def get_data_points(access_token, api_host, **selection):
         )
         logger.warning(message)
         raise ValueError(message)
-    resp = get_data(url, headers, params)
+    return url, headers, params
+
+
+def get_list_of_series(access_token, api_host, session=None, **selection):
+    url, headers, params = get_data_points_request(access_token, api_host, **selection)
+    return get_data(url, headers, params, session=session).json()
+
+
+def stream_list_of_series(access_token, api_host, session=None, **selection):
+    """Like :func:`get_list_of_series`, but yield each series as it downloads.
+
+    The response is parsed incrementally by :func:`iter_json_array`, so only
+    one series is held in memory at a time rather than the whole body.
+
+    Yields
+    ------
+    dict
+        One element of the v2/data response.
+
+    """
+    url, headers, params = get_data_points_request(access_token, api_host, **selection)
+    resp = get_data(url, headers, params, stream=True, session=session)
+    try:
+        for series in iter_json_array(
+            resp.iter_content(chunk_size=ITR_CHUNK_READ_SIZE)
+        ):
+            yield series
+    finally:
+        resp.close()
+
+
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_JSON_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+
+def iter_json_array(chunks):
+    """Decode the elements of a JSON array incrementally.
+
+    Uses ijson when it is installed. Otherwise elements are decoded with
+    json.JSONDecoder.raw_decode as soon as they are complete in the buffer.
+
+    Parameters
+    ----------
+    chunks : iterable of bytes
+        UTF-8 encoded JSON array, e.g. from requests.Response.iter_content.
+
+    Yields
+    ------
+    Each element of the array, as soon as it has been read. An empty document
+    yields nothing.
+
+    Raises
+    ------
+    ValueError
+        If the document isn't a JSON array, whichever decoder is used.
+
+    """
+    if ijson is not None:
+        items = ijson.sendable_list()
+        coroutine = ijson.items_coro(items, "item", use_float=True)
+        started = False
+        try:
+            for chunk in chunks:
+                if not started:
+                    # Checked here, as ijson yields no items for a document
+                    # that isn't an array, and fails on an empty one.
+                    if not chunk.lstrip():
+                        continue
+                    if chunk.lstrip()[:1] != b"[":
+                        raise ValueError("Expected a JSON array")
+                    started = True
+                coroutine.send(chunk)
+                for item in items:
+                    yield item
+                del items[:]
+            if started:
+                coroutine.close()
+        except ijson.JSONError as e:
+            raise ValueError(str(e)) from e
+        for item in items:
+            yield item
+        return
+
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pending = []
+    pending_size = 0
+    started = False
+    # Whether the last token read was an element, or the comma after one.
+    after_item = False
+    after_comma = False
+    # Decoding an element that is still incomplete is attempted again only once
+    # the buffer has grown fourfold, so large elements aren't re-parsed or
+    # copied for every chunk.
+    retry_size = 0
+    for chunk in itertools.chain(chunks, [None]):
+        final = chunk is None
+        pending.append(text_decoder.decode(b"" if final else chunk, final=final))
+        pending_size += len(pending[-1])
+        if len(buffer) + pending_size < retry_size and not final:
+            continue
+        buffer += "".join(pending)
+        pending = []
+        pending_size = 0
+        position = 0
+        while True:
+            if not started:
+                position = len(buffer) - len(buffer.lstrip())
+                if position == len(buffer):
+                    break
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                position += 1
+            position = _JSON_WHITESPACE.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            if after_item:
+                if buffer[position] == "]":
+                    return
+                if buffer[position] != ",":
+                    raise ValueError("Expected ',' or ']' after a JSON array element")
+                after_item = False
+                after_comma = True
+                position += 1
+                continue
+            if buffer[position] == "]" and not after_comma:
+                return
+            if buffer[position] in ",]":
+                raise ValueError("Expected a JSON array element")
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if final:
+                    raise
+                break
+            if not final and _JSON_NUMBER_TAIL.match(buffer, end).end() == len(buffer):
+                # A number at the end of the buffer may continue in the next
+                # chunk, even if it was cut after a "." or an exponent.
+                break
+            yield item
+            position = end
+            after_item = True
+            after_comma = False
+        buffer = buffer[position:]
+        retry_size = 4 * len(buffer)
+    if started:
+        raise ValueError("Unterminated JSON array")
+
+
+def get_data_points(access_token, api_host, session=None, columns=None, **selection):
     include_historical = selection.get("include_historical", True)
-    return list_of_series_to_single_series(resp.json(), False, include_historical)
+    return list_of_series_to_single_series(
+        get_list_of_series(access_token, api_host, session=session, **selection),
+        False,
+        include_historical,
+        columns,
+    )
+
 
+def get_data_points_df(access_token, api_host, session=None, columns=None, **selection):
+    """Get the data points for a selection as a DataFrame.
 
-def get_data_points_v2_prime(access_token, api_host, **selection):
+    Same points as :func:`get_data_points`, decoded by :func:`list_of_series_to_df`.
+    """
+    include_historical = selection.get("include_historical", True)
+    return list_of_series_to_df(
+        get_list_of_series(access_token, api_host, session=session, **selection),
+        include_historical,
+        columns,
+    )
+
+
+def get_data_points_v2_prime(access_token, api_host, session=None, **selection):
     headers = {"authorization": "Bearer " + access_token}
     url = "/".join(["https:", "", api_host, "v2prime/data"])
     params = {}
     for key, value in list(selection.items()):
         params[groclient.utils.str_snake_to_camel(key)] = value
-    resp = get_data(url, headers, params)
+    resp = get_data(url, headers, params, session=session)
     return resp.json()
 
 
-@memoize(maxsize=None)
-def universal_search(access_token, api_host, search_terms):
+@cached
+def universal_search(access_token, api_host, search_terms, session=None):
     """Search across all entity types for the given terms.
 
     Parameters
@@ -627,6 +1400,7 @@ def universal_search(access_token, api_host, search_terms):
     access_token : string
     api_host : string
     search_terms : string
+    session : APISession, optional
 
     Returns
     -------
@@ -640,64 +1414,70 @@ def universal_search(access_token, api_host, search_terms):
     url_pieces = ["https:", "", api_host, "v2/search"]
     url = "/".join(url_pieces)
     headers = {"authorization": "Bearer " + access_token}
-    resp = get_data(url, headers, {"q": search_terms})
-    return resp.json()
+    return get_cached_json(url, headers, {"q": search_terms}, session=session)
 
 
-@memoize(maxsize=None)
-def search(access_token, api_host, entity_type, search_terms):
+@cached
+def search(access_token, api_host, entity_type, search_terms, session=None):
     url = "/".join(["https:", "", api_host, "v2/search", entity_type])
     headers = {"authorization": "Bearer " + access_token}
-    resp = get_data(url, headers, {"q": search_terms})
-    return resp.json()
+    return get_cached_json(url, headers, {"q": search_terms}, session=session)
 
 
 def search_and_lookup(
-    access_token, api_host, entity_type, search_terms, num_results=10
+    access_token, api_host, entity_type, search_terms, num_results=10, session=None
 ):
-    search_results = search(access_token, api_host, entity_type, search_terms)[
-        :num_results
-    ]
+    search_results = search(
+        access_token, api_host, entity_type, search_terms, session=session
+    )[:num_results]
     search_result_ids = [result["id"] for result in search_results]
     search_result_details = lookup(
-        access_token, api_host, entity_type, search_result_ids
+        access_token, api_host, entity_type, search_result_ids, session=session
     )
     for search_result_id in search_result_ids:
         yield search_result_details[str(search_result_id)]
 
 
-def lookup_belongs(access_token, api_host, entity_type, entity_id):
-    parent_ids = lookup(access_token, api_host, entity_type, entity_id)["belongsTo"]
-    parent_details = lookup(access_token, api_host, entity_type, parent_ids)
+def lookup_belongs(access_token, api_host, entity_type, entity_id, session=None):
+    parent_ids = lookup(
+        access_token, api_host, entity_type, entity_id, session=session
+    )["belongsTo"]
+    parent_details = lookup(
+        access_token, api_host, entity_type, parent_ids, session=session
+    )
     for parent_id in parent_ids:
         yield parent_details[str(parent_id)]
 
 
-def get_geo_centre(access_token, api_host, region_id):
+def get_geo_centre(access_token, api_host, region_id, session=None):
     url = "/".join(["https:", "", api_host, "v2/geocentres"])
     headers = {"authorization": "Bearer " + access_token}
-    resp = get_data(url, headers, {"regionIds": region_id})
+    resp = get_data(url, headers, {"regionIds": region_id}, session=session)
     return resp.json()["data"]
 
 
-@memoize(maxsize=None)
-def get_geojsons(access_token, api_host, region_id, descendant_level, zoom_level):
+@cached
+def get_geojsons(
+    access_token, api_host, region_id, descendant_level, zoom_level, session=None
+):
     url = "/".join(["https:", "", api_host, "v2/geocentres"])
     params = {"includeGeojson": True, "regionIds": region_id, "zoom": zoom_level}
     if descendant_level:
         params["reqRegionLevelId"] = descendant_level
         params["stringify"] = "false"
     headers = {"authorization": "Bearer " + access_token}
-    resp = get_data(url, headers, params)
+    data = get_cached_json(url, headers, params, session=session)
     return [
         groclient.utils.dict_reformat_keys(r, groclient.utils.str_camel_to_snake)
-        for r in resp.json()["data"]
+        for r in data["data"]
     ]
 
 
-def get_geojson(access_token, api_host, region_id, zoom_level):
-    for region in get_geojsons(access_token, api_host, region_id, None, zoom_level):
-        return json.loads(region["geojson"])
+def get_geojson(access_token, api_host, region_id, zoom_level, session=None):
+    for region in get_geojsons(
+        access_token, api_host, region_id, None, zoom_level, session=session
+    ):
+        return groclient.decoding.loads(region["geojson"])
 
 
 def get_ancestor(
@@ -709,6 +1489,7 @@ def get_ancestor(
     include_details=True,
     ancestor_level=None,
     include_historical=True,
+    session=None,
 ):
     url = f"https://{api_host}/v2/{entity_type}/belongs-to"
     headers = {"authorization": "Bearer " + access_token}
@@ -721,13 +1502,13 @@ def get_ancestor(
         else:
             params["distance"] = -1
 
-    resp = get_data(url, headers, params)
+    resp = get_data(url, headers, params, session=session)
     ancestor_entity_ids = resp.json()["data"][str(entity_id)]
 
     # Filter out regions with the 'historical' flag set to true
     if not include_historical or include_details:
         entity_details = lookup(
-            access_token, api_host, entity_type, ancestor_entity_ids
+            access_token, api_host, entity_type, ancestor_entity_ids, session=session
         )
 
         if not include_historical:
@@ -755,6 +1536,7 @@ def get_descendant(
     include_details=True,
     descendant_level=None,
     include_historical=True,
+    session=None,
 ):
     url = f"https://{api_host}/v2/{entity_type}/contains"
     headers = {"authorization": "Bearer " + access_token}
@@ -770,13 +1552,13 @@ def get_descendant(
     if entity_type == "regions":
         params["includeHistorical"] = include_historical
 
-    resp = get_data(url, headers, params)
+    resp = get_data(url, headers, params, session=session)
     descendant_entity_ids = resp.json()["data"][str(entity_id)]
 
     # Filter out regions with the 'historical' flag set to true
     if include_details:
         entity_details = lookup(
-            access_token, api_host, entity_type, descendant_entity_ids
+            access_token, api_host, entity_type, descendant_entity_ids, session=session
         )
         return [
             entity_details[str(child_entity_id)]
@@ -788,17 +1570,17 @@ def get_descendant(
     ]
 
 
-def get_area_weighting_series_names(access_token, api_host):
+def get_area_weighting_series_names(access_token, api_host, session=None):
     url = f"https://{api_host}/area-weighting-series-names"
     headers = {"authorization": "Bearer " + access_token}
-    resp = get_data(url, headers)
+    resp = get_data(url, headers, session=session)
     return resp.json()
 
 
-def get_area_weighting_weight_names(access_token, api_host):
+def get_area_weighting_weight_names(access_token, api_host, session=None):
     url = f"https://{api_host}/area-weighting-weight-names"
     headers = {"authorization": "Bearer " + access_token}
-    resp = get_data(url, headers)
+    resp = get_data(url, headers, session=session)
     return resp.json()
 
 
@@ -816,6 +1598,7 @@ def get_area_weighted_series(
     method: str,
     latest_date_only: bool,
     metadata: bool,
+    session: Optional[APISession] = None,
 ) -> Dict[str, float]:
     url = f"https://{api_host}/area-weighting"
     headers = {"authorization": "Bearer " + access_token}
@@ -834,7 +1617,7 @@ def get_area_weighted_series(
         "latestDateOnly": latest_date_only,
         "metadata": metadata,
     }
-    resp = get_data(url, headers, params=params)
+    resp = get_data(url, headers, params=params, session=session)
     return resp.json()
 
 
@@ -843,22 +1626,29 @@ def get_area_weighting_metadata(
     api_host: str,
     metadata_type: str,
     names: List[str],
+    session: Optional[APISession] = None,
 ):
     url = f"https://{api_host}/area-weighting/{metadata_type}-metadata"
     headers = {"authorization": "Bearer " + access_token}
     params = {
         "names": names,
     }
-    resp = get_data(url, headers, params=params)
+    resp = get_data(url, headers, params=params, session=session)
     return resp.json()
 
 
-def reverse_geocode_points(access_token: str, api_host: str, points: list):
+def reverse_geocode_points(
+    access_token: str,
+    api_host: str,
+    points: list,
+    session: Optional[APISession] = None,
+):
     # Don't need to send empty request to API
     if len(points) == 0:
         return []
     payload: dict = {"latlng": f"{points}"}
-    r = requests.post(
+    http = session if session is not None else requests
+    r = http.post(
         f"https://{api_host}/v2/geocode",
         data=payload,
         headers={"Authorization": "Bearer " + access_token},
@@ -967,6 +1757,7 @@ def get_area_weighted_series_df(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     method: Optional[str] = "sum",
+    session: Optional[APISession] = None,
 ) -> pd.DataFrame:
     payload = generate_payload_for_v2_area_weighting(
         series,
@@ -977,7 +1768,8 @@ def get_area_weighted_series_df(
         end_date,
         method
     )
-    response = requests.post(
+    http = session if session is not None else requests
+    response = http.post(
         f"https://{api_host}/v2/area-weighting",
         data=payload,
         headers={"Authorization": "Bearer " + access_token},
@@ -1,11 +1,18 @@
 import unittest.mock as mock
+import io
 import json
+import threading
+import time
 import numpy as np
 import pandas as pd
+import pytest
 from pandas.testing import assert_frame_equal
+import requests
+from requests.structures import CaseInsensitiveDict
+from urllib3.response import HTTPResponse
 
-from groclient import lib
-from groclient.utils import dict_assign
+from groclient import decoding, lib
+from groclient.utils import dict_assign, dict_unnest
 
 MOCK_HOST = "pytest.groclient.url"
 MOCK_TOKEN = "pytest.groclient.token"
@@ -494,6 +501,143 @@ def test_list_of_series_to_single_series():
     assert lib.list_of_series_to_single_series("test input") == "test input"
 
 
+def test_list_of_series_to_df():
+    list_of_series = [
+        {
+            "series": {"metricId": 1, "itemId": 2, "regionId": 3, "unitId": 4},
+            "data": [
+                ["2001-01-01", "2001-12-31", 123],
+                ["2002-01-01", "2002-12-31", None, "2012-01-01", 15, None],
+            ],
+        },
+        {
+            "series": {"metricId": 1, "itemId": 5, "regionId": 3, "frequencyId": 9},
+            "data": [
+                ["2003-01-01", "2003-12-31", 1.5, None, 15, {"confInterval": 2}],
+                ["2004-01-01", "2004-12-31", 2.5, None, 15, {}, "2005-01-01"],
+            ],
+        },
+        {"series": {"metricId": 1}, "data": []},
+    ]
+    # Same frame as unnesting every point of list_of_series_to_single_series.
+    expected = pd.DataFrame(
+        [
+            dict_unnest(point)
+            for point in lib.list_of_series_to_single_series(list_of_series)
+        ]
+    )
+    df = lib.list_of_series_to_df(list_of_series)
+    assert_frame_equal(df, expected, check_dtype=False, check_like=True)
+    assert df["value"].dtype == np.float64
+    assert list(df["metadata_conf_interval"].isna()) == [True, True, False, True]
+
+    assert lib.list_of_series_to_df([]).empty
+
+
+def test_list_of_series_columns_projection():
+    list_of_series = [
+        {
+            "series": {"metricId": 1, "itemId": 2, "regionId": 3, "unitId": 4},
+            "data": [
+                ["2001-01-01", "2001-12-31", 123],
+                ["2003-01-01", "2003-12-31", 1.5, None, 15, {"confInterval": 2}],
+            ],
+        }
+    ]
+    full = lib.list_of_series_to_df(list_of_series)
+    columns = ["end_date", "value", "unit_id", "region_id", "metadata"]
+    df = lib.list_of_series_to_df(list_of_series, columns=columns)
+    assert list(df.columns) == [
+        "end_date",
+        "value",
+        "unit_id",
+        "metadata_conf_interval",
+        "region_id",
+    ]
+    assert_frame_equal(df, full[df.columns])
+    df = lib.list_of_series_to_df(list_of_series, columns=["input_unit_id"])
+    assert list(df["input_unit_id"]) == [4, 15]
+    assert list(lib.list_of_series_to_df([], columns=["value"]).columns) == ["value"]
+
+    points = lib.list_of_series_to_single_series(
+        list_of_series, add_belongs_to=True, columns=columns
+    )
+    expected = lib.list_of_series_to_single_series(list_of_series, add_belongs_to=True)
+    assert points == [
+        {key: value for key, value in point.items() if key in columns + ["belongs_to"]}
+        for point in expected
+    ]
+    # Metadata can be projected one key at a time, as in DataFrames.
+    columns = ["value", "metadata_conf_interval"]
+    assert lib.list_of_series_to_single_series(list_of_series, columns=columns) == [
+        {"value": 123, "metadata_conf_interval": None},
+        {"value": 1.5, "metadata_conf_interval": 2},
+    ]
+    df = lib.list_of_series_to_df(list_of_series, columns=columns)
+    assert list(df["metadata_conf_interval"].fillna(0)) == [0, 2]
+    assert lib.list_of_series_to_df("test input").empty
+
+
+@pytest.mark.parametrize("backend", ["ijson", "json"])
+def test_iter_json_array(backend):
+    if backend == "ijson" and lib.ijson is None:
+        pytest.skip("ijson is not installed")
+    document = json.dumps(
+        [{"name": "Ma\u00efs", "data": [[1, 2.5, None]]}, 12, "x", [], 345, 1e5]
+    ).encode("utf-8")
+    # Both decoders give the same elements, of the same types.
+    with mock.patch("groclient.lib.ijson", lib.ijson if backend == "ijson" else None):
+        # Elements split across chunks anywhere, even inside a character.
+        for chunk_size in range(1, len(document) + 1):
+            chunks = [
+                document[i : i + chunk_size]
+                for i in range(0, len(document), chunk_size)
+            ]
+            items = list(lib.iter_json_array(chunks))
+            assert items == json.loads(document)
+            assert [type(item) for item in items] == [
+                type(item) for item in json.loads(document)
+            ]
+        assert list(lib.iter_json_array([b" [ ] "])) == []
+        assert list(lib.iter_json_array([])) == []
+        assert list(lib.iter_json_array([b" ", b""])) == []
+        for invalid in [b'{"data": []}', b"[1, 2", b"[{]"]:
+            with pytest.raises(ValueError):
+                list(lib.iter_json_array([invalid]))
+        # Elements must be separated by exactly one comma, however the
+        # document is split into chunks.
+        for invalid in [b"[1 2]", b'[{} "x"]', b"[,1]", b"[1,,2]", b"[1,]", b"[,]"]:
+            for split in range(1, len(invalid)):
+                with pytest.raises(ValueError):
+                    list(lib.iter_json_array([invalid[:split], invalid[split:]]))
+
+
+@mock.patch("requests.get")
+def test_stream_list_of_series(mock_requests_get):
+    list_of_series = [
+        {"series": {"regionId": region_id}, "data": [["2000-01-01", "2000-12-31", 1]]}
+        for region_id in range(3)
+    ]
+    document = json.dumps(list_of_series).encode("utf-8")
+    mock_requests_get.return_value.status_code = 200
+    mock_requests_get.return_value.iter_content.return_value = [
+        document[:30],
+        document[30:],
+    ]
+    selection = {
+        "metric_id": 1,
+        "item_id": 2,
+        "region_id": 3,
+        "frequency_id": 9,
+        "source_id": 2,
+    }
+    series = lib.stream_list_of_series(MOCK_TOKEN, MOCK_HOST, **selection)
+    assert next(series) == list_of_series[0]
+    assert list(series) == list_of_series[1:]
+    assert mock_requests_get.call_args[1]["stream"] is True
+    mock_requests_get.return_value.close.assert_called_once_with()
+
+
 @mock.patch("requests.get")
 def test_search(mock_requests_get):
     mock_data = ["obj1", "obj2", "obj3"]
@@ -589,7 +733,7 @@ def test_rank_series_by_source(mock_requests_get):
         assert series == expected[idx]
 
 
-def lookup_mock(MOCK_TOKEN, MOCK_HOST, entity_type, entity_ids):
+def lookup_mock(MOCK_TOKEN, MOCK_HOST, entity_type, entity_ids, session=None):
     if isinstance(entity_ids, int):
         return LOOKUP_MAP[entity_type][str(entity_ids)]
     if isinstance(entity_ids, list):
@@ -1350,3 +1494,282 @@ def test_get_data_call_params():
         "responseType": "list_of_series",
     }
     assert lib.get_data_call_params(**selections) == expected
+
+
+def test_api_session_pools_connections():
+    session = lib.APISession(pool_size=4, max_retries=2)
+    adapter = session.get_adapter("https://" + MOCK_HOST)
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.connect == 2
+    # HTTP statuses are retried by get_data(), not by the adapter.
+    assert adapter.max_retries.status == 0
+    session.close()
+
+
+def test_api_session_decodes_with_fastest_backend():
+    session = lib.APISession()
+    adapter = session.get_adapter("https://" + MOCK_HOST)
+    request = requests.Request("GET", "https://" + MOCK_HOST).prepare()
+    response = adapter.build_response(
+        request,
+        HTTPResponse(
+            body=io.BytesIO(b'{"data": [{"id": 14}]}'),
+            status=200,
+            preload_content=False,
+        ),
+    )
+    with mock.patch("groclient.decoding.loads", wraps=decoding.loads) as loads:
+        assert response.json() == {"data": [{"id": 14}]}
+    loads.assert_called_once_with(b'{"data": [{"id": 14}]}')
+    session.close()
+
+
+def test_get_data_uses_session():
+    session = mock.MagicMock(cache=None)
+    session.get.return_value.status_code = 200
+    session.get.return_value.json.return_value = {"data": [{"id": 1}]}
+    assert lib.get_available(MOCK_TOKEN, MOCK_HOST, "units", session=session) == [
+        {"id": 1}
+    ]
+    session.get.assert_called_once_with(
+        f"https://{MOCK_HOST}/v2/units",
+        params=None,
+        headers=mock.ANY,
+        timeout=mock.ANY,
+        stream=False,
+    )
+
+
+@mock.patch("requests.post")
+def test_reverse_geocode_points_uses_session(mock_requests_post):
+    session = mock.MagicMock()
+    session.post.return_value.status_code = 200
+    session.post.return_value.json.return_value = {"data": []}
+    lib.reverse_geocode_points(MOCK_TOKEN, MOCK_HOST, [[1.0, 2.0]], session=session)
+    session.post.assert_called_once()
+    mock_requests_post.assert_not_called()
+
+
+def test_get_backoff_delay():
+    assert lib.get_backoff_delay(0) == 0
+    for retry_count in range(1, 5):
+        delay = lib.get_backoff_delay(retry_count)
+        assert 2**retry_count / 2.0 <= delay <= 2**retry_count
+    assert lib.get_backoff_delay(0, retry_after=1.5) == 1.5
+    assert lib.get_backoff_delay(4, retry_after=0.5) == 0.5
+
+
+def test_get_retry_after():
+    headers = CaseInsensitiveDict
+    assert lib.get_retry_after(headers({"retry-after": "2"})) == 2.0
+    assert lib.get_retry_after(headers({"Retry-After": "-1"})) == 0.0
+    with mock.patch("time.time", return_value=1445412470.0):
+        assert (
+            lib.get_retry_after(
+                headers({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+            )
+            == 10.0
+        )
+        assert (
+            lib.get_retry_after(
+                headers(
+                    {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1445412475"}
+                )
+            )
+            == 5.0
+        )
+    assert (
+        lib.get_retry_after(
+            headers({"RateLimit-Remaining": "0", "RateLimit-Reset": "3"})
+        )
+        == 3.0
+    )
+    assert (
+        lib.get_retry_after(
+            headers({"X-RateLimit-Remaining": "4", "X-RateLimit-Reset": "3"})
+        )
+        is None
+    )
+    assert lib.get_retry_after(headers({"Retry-After": "soon"})) is None
+    assert lib.get_retry_after(headers({})) is None
+
+
+@mock.patch("time.sleep")
+@mock.patch("requests.get")
+def test_get_data_honors_retry_after(mock_requests_get, mock_sleep):
+    throttled = mock.Mock(status_code=429, headers={"Retry-After": "7"})
+    ok = mock.Mock(status_code=200)
+    mock_requests_get.side_effect = [throttled, throttled, ok]
+    assert lib.get_data(f"https://{MOCK_HOST}/v2/data", {}) is ok
+    assert mock_sleep.call_args_list == [mock.call(7.0), mock.call(7.0)]
+
+
+def test_api_session_waits_for_rate_limiter():
+    rate_limiter = mock.MagicMock()
+    session = lib.APISession(rate_limiter=rate_limiter)
+    with mock.patch("requests.Session.request", create=True) as request:
+        session.get(f"https://{MOCK_HOST}/v2/units")
+    rate_limiter.acquire.assert_called_once_with(f"https://{MOCK_HOST}/v2/units")
+    request.assert_called_once()
+    rate_limiter.pause.assert_not_called()
+    session.close()
+
+
+def test_api_session_pauses_rate_limiter():
+    rate_limiter = mock.MagicMock()
+    session = lib.APISession(rate_limiter=rate_limiter)
+    with mock.patch("requests.Session.request", create=True) as request:
+        request.return_value.headers = {"Retry-After": "3"}
+        session.get(f"https://{MOCK_HOST}/v2/data")
+    rate_limiter.pause.assert_called_once_with(f"https://{MOCK_HOST}/v2/data", 3.0)
+    session.close()
+
+
+def test_get_cached_json():
+    cache = mock.MagicMock()
+    cache.get.return_value = None
+    session = mock.MagicMock(cache=cache)
+    session.get.return_value.status_code = 200
+    session.get.return_value.json.return_value = [{"id": 274}]
+    assert lib.search(MOCK_TOKEN, MOCK_HOST, "items", "corn", session=session) == [
+        {"id": 274}
+    ]
+    url = f"https://{MOCK_HOST}/v2/search/items"
+    cache.set.assert_called_once_with(url, {"q": "corn"}, [{"id": 274}])
+
+    # Cached responses are returned without making a request.
+    session.get.reset_mock()
+    cache.get.return_value = [{"id": 275}]
+    assert lib.universal_search(MOCK_TOKEN, MOCK_HOST, "corn", session=session) == [
+        {"id": 275}
+    ]
+    session.get.assert_not_called()
+
+
+@mock.patch("requests.get")
+def test_cached_per_session(mock_requests_get):
+    initialize_requests_mocker_and_get_mock_data(mock_requests_get, {"data": [1]})
+    sessions = [lib.APISession(), lib.APISession()]
+    for session in sessions:
+        session.get = mock_requests_get
+        for _ in range(2):
+            assert lib.get_available(
+                MOCK_TOKEN, MOCK_HOST, "cached", session=session
+            ) == [1]
+    # One request per session; repeated calls hit that session's cache.
+    assert mock_requests_get.call_count == 2
+    for session in sessions:
+        assert session.memory_cache.cache_info()[:3] == (1, 1, 1)
+        session.close()
+    lib.cache_clear()
+    assert lib.cache_info()[:3] == (0, 0, 0)
+
+
+def test_lookup_reuses_cached_entities():
+    entities = {str(i): {"id": i, "name": "entity {}".format(i)} for i in range(5)}
+
+    def mock_get(url, params=None, **kwargs):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {
+            "data": {
+                str(i): entities[str(i)] for i in params["ids"] if str(i) in entities
+            }
+        }
+        return response
+
+    session = lib.APISession()
+    session.get = mock.Mock(side_effect=mock_get)
+    session.cache = mock.Mock()
+    session.cache.get.return_value = None
+    assert lib.lookup(MOCK_TOKEN, MOCK_HOST, "items", [0, 1], session=session) == {
+        "0": entities["0"],
+        "1": entities["1"],
+    }
+    assert (
+        lib.lookup(MOCK_TOKEN, MOCK_HOST, "items", 1, session=session) == entities["1"]
+    )
+    assert lib.lookup(
+        MOCK_TOKEN, MOCK_HOST, "items", [1, 2, 99, 2], session=session
+    ) == {"1": entities["1"], "2": entities["2"]}
+    assert lib.lookup(MOCK_TOKEN, MOCK_HOST, "items", 99, session=session) is None
+    # Only ids missing from the cache were requested, each of them once.
+    assert [call[1]["params"]["ids"] for call in session.get.call_args_list] == [
+        [0, 1],
+        [2, 99],
+    ]
+    # Each chunk's entities are written to the persistent cache at once.
+    url = f"https://{MOCK_HOST}/v2/items"
+    assert session.cache.set_many.call_args_list == [
+        mock.call(url, [({"id": "0"}, entities["0"]), ({"id": "1"}, entities["1"])]),
+        mock.call(url, [({"id": "2"}, entities["2"])]),
+    ]
+    session.cache.set.assert_not_called()
+    session.close()
+
+
+def test_get_lookup_chunks():
+    url = f"https://{MOCK_HOST}/v2/regions"
+    entity_ids = list(range(100000, 103000))
+    chunks = lib.get_lookup_chunks(url, entity_ids)
+    assert sum(chunks, []) == entity_ids
+    assert len(chunks) == 5
+    for chunk in chunks:
+        query = "&".join("ids={}".format(entity_id) for entity_id in chunk)
+        assert len(url) + 1 + len(query) <= lib.cfg.MAX_URL_LENGTH
+
+
+def test_lookup_batch_fetches_chunks_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def mock_get(url, params=None, **kwargs):
+        # Only returns once all three chunks are being fetched at the same time.
+        barrier.wait()
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {
+            "data": {str(i): {"id": i} for i in params["ids"]}
+        }
+        return response
+
+    session = lib.APISession()
+    session.get = mock.Mock(side_effect=mock_get)
+    entity_ids = list(range(100000, 101500))
+    with mock.patch.object(lib.cfg, "MAX_URL_LENGTH", 6000):
+        result = lib.lookup(
+            MOCK_TOKEN, MOCK_HOST, "regions", entity_ids, session=session
+        )
+    assert session.get.call_count == 3
+    assert sorted(result) == [str(i) for i in entity_ids]
+    session.close()
+
+
+def test_lookup_batch_within_session_pool_size():
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def mock_get(url, params=None, **kwargs):
+        with lock:
+            in_flight.append(url)
+            peak.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(url)
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {
+            "data": {str(i): {"id": i} for i in params["ids"]}
+        }
+        return response
+
+    session = lib.APISession(pool_size=2)
+    assert session.pool_size == 2
+    session.get = mock.Mock(side_effect=mock_get)
+    entity_ids = list(range(100000, 102500))
+    with mock.patch.object(lib.cfg, "MAX_URL_LENGTH", 6000):
+        result = lib.lookup(
+            MOCK_TOKEN, MOCK_HOST, "regions", entity_ids, session=session
+        )
+    assert session.get.call_count == 5
+    # No more requests at a time than the session has pooled connections.
+    assert max(peak) <= 2
+    assert sorted(result) == [str(i) for i in entity_ids]
+    session.close()
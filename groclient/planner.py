@@ -0,0 +1,336 @@
+"""Merge data point selections into fewer v2/data requests.
+
+v2/data accepts lists of metric, item and region ids, and returns every
+combination of them. Selections that are the same but for their ids in one of
+those dimensions, like the same metric and item for many counties, can be
+fetched together. Selections that also differ in a second dimension are merged
+only where their ids form a full grid, like every item for the same set of
+counties, so no unrequested series are fetched. The series of the merged
+response are then handed back to each selection by their belongsTo ids.
+
+Long selections can also be split the other way, into consecutive parts of their
+date range fetched concurrently, whose points are then stitched back together.
+"""
+
+import itertools
+from collections import OrderedDict
+
+import numpy
+import pandas
+
+from groclient import cfg, lib
+from groclient.constants import DATA_POINTS_UNIQUE_COLS
+from groclient.utils import str_snake_to_camel
+
+# Dimensions that v2/data accepts lists of, in the order they are merged.
+MERGED_TYPES_ID = ["region_id", "item_id", "metric_id"]
+
+
+def _hashable(value):
+    """value, with lists as tuples so it can be part of a request key."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(element) for element in value)
+    if isinstance(value, dict):
+        return frozenset((key, _hashable(element)) for key, element in value.items())
+    return value
+
+
+def _request_key(selection):
+    """What must be equal for selections to share a request: everything that
+    changes the request or how its points are processed, except their ids in
+    MERGED_TYPES_ID. Lists of ids in other dimensions, such as source_id, are
+    part of the key as they are, so only selections with the same list share
+    a request."""
+    params = lib.get_data_call_params(**selection)
+    for type_id in MERGED_TYPES_ID:
+        params.pop(str_snake_to_camel(type_id), None)
+    return (
+        _hashable(params),
+        _hashable(selection.get("unit_id")),
+        selection.get("include_historical", True),
+    )
+
+
+def _ids(value):
+    return tuple(value) if isinstance(value, (list, tuple)) else (value,)
+
+
+def _query_length(type_id, ids):
+    return sum(
+        len("&") + len(str_snake_to_camel(type_id)) + len("=") + len(str(entity_id))
+        for entity_id in ids
+    )
+
+
+def plan_requests(
+    selections,
+    max_series=cfg.MAX_SERIES_PER_REQUEST,
+    max_query_length=cfg.MAX_URL_LENGTH - 200,
+):
+    """Group selections into as few v2/data requests as fit the limits.
+
+    Parameters
+    ----------
+    selections : list of dicts
+        Selections, as passed to :meth:`GroClient.get_data_points`.
+    max_series : integer, optional
+        Most series one request can ask for: the product of its numbers of
+        metric, item and region ids.
+    max_query_length : integer, optional
+        Longest query string of the ids of one request.
+
+    Returns
+    -------
+    list of (dict, list of integers)
+        Each request's selection, and the indices in :code:`selections` of the
+        selections it answers. Requests of one selection are that selection.
+
+    """
+    # A group is [request key, ids by dimension, member indices].
+    groups = []
+    for index, selection in enumerate(selections):
+        key = _request_key(selection)
+        if any(type_id not in selection for type_id in MERGED_TYPES_ID):
+            # Can't be merged: keep it as its own request.
+            key = ("unmerged", index)
+        groups.append(
+            [
+                key,
+                OrderedDict(
+                    (type_id, _ids(selection.get(type_id)))
+                    for type_id in MERGED_TYPES_ID
+                ),
+                [index],
+            ]
+        )
+
+    for type_id in MERGED_TYPES_ID:
+        # Groups with the same request key and the same ids in the other
+        # dimensions differ only in this one, and can be merged along it.
+        buckets = OrderedDict()
+        for group in groups:
+            other_ids = tuple(
+                ids
+                for other_type_id, ids in group[1].items()
+                if other_type_id != type_id
+            )
+            buckets.setdefault((group[0], other_ids), []).append(group)
+        groups = []
+        for (key, _), bucket in buckets.items():
+            merged = None
+            for group in bucket:
+                if merged is not None:
+                    ids = merged[1][type_id] + group[1][type_id]
+                    num_series = len(ids)
+                    for other_type_id, other_ids in merged[1].items():
+                        if other_type_id != type_id:
+                            num_series *= len(other_ids)
+                    query_length = sum(
+                        _query_length(other_type_id, other_ids)
+                        for other_type_id, other_ids in merged[1].items()
+                        if other_type_id != type_id
+                    ) + _query_length(type_id, ids)
+                    if num_series <= max_series and query_length <= max_query_length:
+                        merged[1][type_id] = ids
+                        merged[2] += group[2]
+                        continue
+                merged = [key, OrderedDict(group[1]), list(group[2])]
+                groups.append(merged)
+
+    requests = []
+    for _, ids_by_type, members in groups:
+        if len(members) == 1:
+            requests.append((selections[members[0]], members))
+            continue
+        request = dict(selections[members[0]])
+        for type_id, ids in ids_by_type.items():
+            # Keep the order of first appearance, without repeats.
+            ids = list(OrderedDict.fromkeys(ids))
+            request[type_id] = ids if len(ids) > 1 else ids[0]
+        requests.append((request, members))
+    return requests
+
+
+def _series_ids(series):
+    attributes = series.get("series", {})
+    belongs_to = attributes.get("belongsTo") or attributes
+    return tuple(
+        str(
+            belongs_to.get(
+                str_snake_to_camel(type_id), attributes.get(str_snake_to_camel(type_id))
+            )
+        )
+        for type_id in MERGED_TYPES_ID
+    )
+
+
+def demultiplex(list_of_series, selections):
+    """Split a merged v2/data response between the selections it answers.
+
+    Parameters
+    ----------
+    list_of_series : list of dicts
+        Response to a request of :func:`plan_requests`.
+    selections : list of dicts
+        The selections the request answers.
+
+    Returns
+    -------
+    list of lists of dicts
+        The response's series that belong to each selection, by their
+        belongsTo ids.
+
+    """
+    if len(selections) == 1 or not isinstance(list_of_series, list):
+        return [list_of_series for _ in selections]
+    members = {}
+    for position, selection in enumerate(selections):
+        for ids in itertools.product(
+            *[map(str, _ids(selection.get(type_id))) for type_id in MERGED_TYPES_ID]
+        ):
+            members.setdefault(ids, []).append(position)
+    split = [[] for _ in selections]
+    for series in list_of_series:
+        for position in members.get(_series_ids(series), []):
+            split[position].append(series)
+    return split
+
+
+def partition_dates(selection, date_partitions):
+    """Split a selection into selections of consecutive parts of its date range.
+
+    Parameters
+    ----------
+    selection : dict
+        A selection with a start_date and an end_date.
+    date_partitions : integer
+        Number of parts, of about the same number of days. Fewer are made if
+        the range has fewer days.
+
+    Returns
+    -------
+    list of dicts
+        The selection with the start_date and end_date of each part, in order.
+
+    """
+    if not selection.get("start_date") or not selection.get("end_date"):
+        raise ValueError("Date partitions need a start_date and an end_date")
+    start, end = (
+        pandas.Timestamp(selection[key]).tz_localize(None).normalize()
+        for key in ["start_date", "end_date"]
+    )
+    num_days = (end - start).days + 1
+    date_partitions = min(date_partitions, num_days)
+    if date_partitions <= 1:
+        return [selection]
+    bounds = [
+        start + pandas.Timedelta(days=num_days * part // date_partitions)
+        for part in range(date_partitions + 1)
+    ]
+    partitions = [
+        dict(
+            selection,
+            start_date=part_start.strftime("%Y-%m-%d"),
+            end_date=(next_start - pandas.Timedelta(days=1)).strftime("%Y-%m-%d"),
+        )
+        for part_start, next_start in zip(bounds, bounds[1:])
+    ]
+    # The outer bounds are kept as given, with any time of day.
+    partitions[0]["start_date"] = selection["start_date"]
+    partitions[-1]["end_date"] = selection["end_date"]
+    return partitions
+
+
+# What tells a point apart from the other points of a part, including other
+# versions of it in complete_history or reporting_history responses.
+_POINT_KEY_COLUMNS = DATA_POINTS_UNIQUE_COLS + ["available_date"]
+
+
+def partition_columns(columns):
+    """Columns to decode for each date partition of a :code:`columns` projection.
+
+    Points that span the boundary of two parts are returned for both. They
+    are found by their ids, dates and available_date, which are decoded even
+    if not asked for. :func:`stitch_points` and :func:`stitch_frames` drop
+    them again.
+    """
+    if columns is None:
+        return None
+    return list(columns) + [
+        column
+        for column in _POINT_KEY_COLUMNS
+        if column in lib.DATA_POINT_COLUMNS and column not in columns
+    ]
+
+
+def stitch_points(partitions_points, columns=None):
+    """Join the points of date partitions, from :meth:`GroClient.get_data_points`.
+
+    Parameters
+    ----------
+    partitions_points : list of lists of dicts
+        Points of each part, in order.
+    columns : list of strings, optional
+        The projection the points were fetched for, with
+        :func:`partition_columns`.
+
+    Returns
+    -------
+    list of dicts
+        Points in the order of the parts. Points of a part that the previous
+        part also returned, because they span both, are left out. Versions of
+        a point within a part are all kept.
+
+    """
+    points = []
+    previous_keys = set()
+    for part_points in partitions_points:
+        keys = [
+            tuple(point.get(column) for column in _POINT_KEY_COLUMNS)
+            for point in part_points
+        ]
+        points.extend(
+            point for point, key in zip(part_points, keys) if key not in previous_keys
+        )
+        previous_keys = set(keys)
+    if columns is not None:
+        for column in set(partition_columns(columns)) - set(columns):
+            for point in points:
+                point.pop(column, None)
+    return points
+
+
+def _repeated_rows(df, previous):
+    """Which rows of :code:`df` are points :code:`previous` also has."""
+    subset = [
+        column
+        for column in _POINT_KEY_COLUMNS
+        if column in df.columns and column in previous.columns
+    ]
+    if not subset or df.empty or previous.empty:
+        return numpy.zeros(len(df), dtype=bool)
+    # A left merge on unique keys keeps the rows of df in order.
+    merged = df[subset].merge(
+        previous[subset].drop_duplicates(), how="left", indicator=True
+    )
+    return (merged["_merge"] == "both").values
+
+
+def stitch_frames(frames, columns=None):
+    """Join the points of date partitions as DataFrames. See :func:`stitch_points`.
+
+    Returns
+    -------
+    pandas.DataFrame
+
+    """
+    stitched = frames[:1]
+    for previous, df in zip(frames, frames[1:]):
+        stitched.append(df[~_repeated_rows(df, previous)])
+    df = pandas.concat(stitched, ignore_index=True)
+    if columns is not None:
+        df = df.drop(
+            columns=sorted(set(partition_columns(columns)) - set(columns)),
+            errors="ignore",
+        )
+    return df
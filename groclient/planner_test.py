@@ -0,0 +1,211 @@
+import pandas
+import pytest
+
+from groclient import planner
+
+
+def make_selection(**ids):
+    selection = {
+        "metric_id": 1,
+        "item_id": 2,
+        "region_id": 3,
+        "partner_region_id": 0,
+        "frequency_id": 9,
+        "source_id": 5,
+    }
+    selection.update(ids)
+    return selection
+
+
+def make_series(metric_id, item_id, region_id, belongs_to_region_id=None):
+    return {
+        "series": {
+            "metricId": metric_id,
+            "itemId": item_id,
+            "regionId": region_id,
+            "belongsTo": {
+                "metricId": metric_id,
+                "itemId": item_id,
+                "regionId": belongs_to_region_id or region_id,
+            },
+        },
+        "data": [["2001-01-01", "2001-12-31", region_id]],
+    }
+
+
+def test_plan_requests_merges_one_dimension():
+    selections = [
+        make_selection(region_id=region_id, region_name=str(region_id))
+        for region_id in range(10, 15)
+    ]
+    plan = planner.plan_requests(selections)
+    assert len(plan) == 1
+    request, members = plan[0]
+    assert request["region_id"] == [10, 11, 12, 13, 14]
+    assert request["item_id"] == 2
+    assert members == [0, 1, 2, 3, 4]
+
+    # Chunked to fit the limits.
+    plan = planner.plan_requests(selections, max_series=2)
+    assert [members for _, members in plan] == [[0, 1], [2, 3], [4]]
+    assert plan[2][0] is selections[4]
+    plan = planner.plan_requests(selections, max_query_length=60)
+    assert [members for _, members in plan] == [[0, 1, 2], [3, 4]]
+
+
+def test_plan_requests_merges_grids():
+    selections = [
+        make_selection(item_id=item_id, region_id=region_id)
+        for item_id in [2, 4]
+        for region_id in [10, 11]
+    ]
+    # Not a full grid: item 6 only for region 10.
+    selections.append(make_selection(item_id=6, region_id=10))
+    plan = planner.plan_requests(selections)
+    assert [
+        (request["item_id"], request["region_id"], members) for request, members in plan
+    ] == [([2, 4], [10, 11], [0, 1, 2, 3]), (6, 10, [4])]
+
+
+def test_plan_requests_keeps_different_requests_apart():
+    selections = [
+        make_selection(region_id=10),
+        make_selection(region_id=11, start_date="2001-01-01"),
+        make_selection(region_id=12, unit_id=14),
+        make_selection(region_id=13, source_id=6),
+        make_selection(region_id=[14, 15]),
+        make_selection(region_id=16),
+    ]
+    del selections[5]["item_id"]
+    plan = planner.plan_requests(selections)
+    assert [members for _, members in plan] == [[0, 4], [1], [2], [3], [5]]
+    assert plan[0][0]["region_id"] == [10, 14, 15]
+
+
+def test_plan_requests_list_params():
+    selections = [
+        make_selection(region_id=10, source_id=[5, 6]),
+        make_selection(region_id=11, source_id=[5, 6]),
+        make_selection(region_id=12, source_id=[5, 7]),
+        make_selection(region_id=13, source_id=5),
+        make_selection(region_id=14, source_id=[5, 6], frequency_id=[9, 15]),
+        make_selection(region_id=15, source_id=[5, 6], frequency_id=[9, 15]),
+        make_selection(region_id=16, source_id=[5, 6], frequency_id=[9]),
+    ]
+    plan = planner.plan_requests(selections)
+    # Selections with list-valued params are merged when the lists are equal,
+    # and kept apart when they differ.
+    assert [members for _, members in plan] == [[0, 1], [2], [3], [4, 5], [6]]
+    assert plan[0][0]["region_id"] == [10, 11]
+    assert plan[0][0]["source_id"] == [5, 6]
+    assert plan[3][0]["frequency_id"] == [9, 15]
+
+
+def test_demultiplex():
+    selections = [
+        make_selection(region_id=10),
+        make_selection(region_id=11),
+        make_selection(region_id=[11, 12]),
+    ]
+    list_of_series = [
+        make_series(1, 2, 10),
+        # Expanded by the server from region 11.
+        make_series(1, 2, 111, belongs_to_region_id=11),
+        make_series(1, 2, 12),
+    ]
+    assert planner.demultiplex(list_of_series, selections) == [
+        [list_of_series[0]],
+        [list_of_series[1]],
+        [list_of_series[1], list_of_series[2]],
+    ]
+    error = Exception("Bad request")
+    assert planner.demultiplex(error, selections) == [error] * 3
+
+
+def test_partition_dates():
+    selection = make_selection(
+        start_date="2000-01-01T00:00:00.000Z", end_date="2000-01-10"
+    )
+    partitions = planner.partition_dates(selection, 3)
+    assert [(part["start_date"], part["end_date"]) for part in partitions] == [
+        ("2000-01-01T00:00:00.000Z", "2000-01-03"),
+        ("2000-01-04", "2000-01-06"),
+        ("2000-01-07", "2000-01-10"),
+    ]
+    assert all(part["region_id"] == 3 for part in partitions)
+    # No more parts than days.
+    assert len(planner.partition_dates(selection, 100)) == 10
+    assert planner.partition_dates(selection, 1) == [selection]
+    with pytest.raises(ValueError):
+        planner.partition_dates(make_selection(start_date="2000-01-01"), 3)
+
+
+def test_stitch_points():
+    def point(start_date, end_date, value):
+        return {"start_date": start_date, "end_date": end_date, "value": value}
+
+    def partitions_points():
+        # The point of 2000 spans both parts.
+        return [
+            [
+                point("1999-01-01", "1999-12-31", 1),
+                point("2000-01-01", "2000-12-31", 2),
+            ],
+            [
+                point("2000-01-01", "2000-12-31", 2),
+                point("2001-01-01", "2001-12-31", 3),
+            ],
+        ]
+
+    assert [p["value"] for p in planner.stitch_points(partitions_points())] == [
+        1,
+        2,
+        3,
+    ]
+    # Dates decoded only to tell points apart are dropped.
+    assert planner.stitch_points(partitions_points(), ["value"]) == [
+        {"value": 1},
+        {"value": 2},
+        {"value": 3},
+    ]
+
+    df = planner.stitch_frames(
+        [pandas.DataFrame(points) for points in partitions_points()], ["value"]
+    )
+    assert list(df.columns) == ["value"]
+    assert list(df["value"]) == [1, 2, 3]
+
+
+def test_stitch_keeps_versions():
+    def version(year, value, available_date):
+        return {
+            "start_date": "{}-01-01".format(year),
+            "end_date": "{}-12-31".format(year),
+            "value": value,
+            "available_date": available_date,
+        }
+
+    def partitions_points():
+        # As with complete_history: two versions of the point of 2000, which
+        # spans both parts, and two of the point of 2001.
+        spanning = [version(2000, 1, "2001-01-01"), version(2000, 2, "2001-06-01")]
+        return [
+            [version(1999, 0, "2000-01-01")] + spanning,
+            spanning + [version(2001, 3, "2002-01-01"), version(2001, 4, "2002-06-01")],
+        ]
+
+    assert [p["value"] for p in planner.stitch_points(partitions_points())] == [
+        0,
+        1,
+        2,
+        3,
+        4,
+    ]
+    df = planner.stitch_frames(
+        [pandas.DataFrame(points) for points in partitions_points()]
+    )
+    assert list(df["value"]) == [0, 1, 2, 3, 4]
+    df = planner.stitch_frames(
+        [pandas.DataFrame(points) for points in partitions_points()], ["value"]
+    )
+    assert list(df.columns) == ["value"]
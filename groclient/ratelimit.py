@@ -0,0 +1,298 @@
+"""Client-side request rate and concurrency limiting.
+
+The API allows a fixed number of requests per second for each token. Requests
+made faster than that are answered with 429 Too Many Requests and have to be
+retried, so the client paces itself instead of relying on the server to push
+back.
+"""
+
+import threading
+import time
+
+try:
+    # Python3
+    from urllib.parse import urlparse
+except ImportError:
+    # Python2
+    from urlparse import urlparse
+
+from tornado import gen
+from tornado.locks import Condition
+
+from groclient import cfg
+
+
+class TokenBucket(object):
+    """Allow requests at a sustained rate, with short bursts up to a capacity.
+
+    Tokens accumulate at :code:`rate` per second up to :code:`capacity`. Each
+    request takes a token. When none are left, the request is scheduled for
+    when the next token will arrive, so concurrent callers are spaced evenly
+    rather than all retrying at once.
+
+    Parameters
+    ----------
+    rate : float
+        Requests per second.
+    capacity : float, optional
+        Maximum burst size. Defaults to 1, which spaces every request by
+        :code:`1 / rate` seconds and never exceeds the rate over any window.
+
+    """
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError("rate must be positive, got {}".format(rate))
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._wait_time = 0.0
+        self._first_start = None
+        self._last_start = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        return now
+
+    def reserve(self):
+        """Take a token without blocking.
+
+        Returns
+        -------
+        float
+            Number of seconds the caller must wait before making its request.
+
+        """
+        with self._lock:
+            now = self._refill()
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self._requests += 1
+            self._wait_time += delay
+            if self._first_start is None:
+                self._first_start = now + delay
+            self._last_start = now + delay
+            return delay
+
+    def pause(self, seconds):
+        """Make the next request wait at least :code:`seconds`.
+
+        Used when the server says it is rate limiting the client. Requests that
+        have already taken a token keep their scheduled time.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+    def acquire(self):
+        """Take a token, sleeping until the request may be made.
+
+        Returns
+        -------
+        float
+            Number of seconds spent waiting.
+
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def stats(self):
+        """Summarize the requests that have gone through the bucket.
+
+        Returns
+        -------
+        dict
+            :code:`requests`: number of tokens taken,
+            :code:`wait_time`: total seconds callers were asked to wait,
+            :code:`rate`: achieved requests per second between the first and
+            the most recent request.
+
+        """
+        with self._lock:
+            elapsed = self._last_start - self._first_start if self._requests > 1 else 0
+            return {
+                "requests": self._requests,
+                "wait_time": self._wait_time,
+                "rate": (self._requests - 1) / elapsed if elapsed > 0 else 0.0,
+            }
+
+
+class RateLimiter(object):
+    """Per-client collection of token buckets, one per rate-limited endpoint.
+
+    Requests to endpoints listed in :code:`endpoint_rates` are paced by their
+    own bucket. All other requests share a single bucket, reported under the
+    :code:`"*"` key by :meth:`stats`.
+
+    Parameters
+    ----------
+    rate : float, optional
+        Requests per second shared by all endpoints without their own rate.
+        :code:`None` disables limiting for them.
+    endpoint_rates : dict, optional
+        Requests per second for specific endpoints, keyed by path relative to
+        the API host, e.g. :code:`{"v2/data": 5}`.
+
+    """
+
+    def __init__(self, rate=cfg.MAX_QUERIES_PER_SECOND, endpoint_rates=None):
+        self._default = TokenBucket(rate) if rate else None
+        self._buckets = {
+            endpoint.strip("/"): TokenBucket(endpoint_rate)
+            for endpoint, endpoint_rate in (endpoint_rates or {}).items()
+        }
+
+    def _get_bucket(self, url):
+        endpoint = urlparse(url).path.strip("/")
+        return self._buckets.get(endpoint, self._default)
+
+    def reserve(self, url):
+        """Take a token for a request to :code:`url` without blocking.
+
+        Returns
+        -------
+        float
+            Number of seconds to wait before making the request. Async callers
+            should sleep on their event loop for this long.
+
+        """
+        bucket = self._get_bucket(url)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def acquire(self, url):
+        """Take a token for a request to :code:`url`, sleeping if needed.
+
+        Returns
+        -------
+        float
+            Number of seconds spent waiting.
+
+        """
+        bucket = self._get_bucket(url)
+        return bucket.acquire() if bucket is not None else 0.0
+
+    def pause(self, url, seconds):
+        """Hold back requests sharing :code:`url`'s limit for :code:`seconds`.
+
+        See :meth:`TokenBucket.pause`.
+        """
+        bucket = self._get_bucket(url)
+        if bucket is not None:
+            bucket.pause(seconds)
+
+    def stats(self):
+        """Get :meth:`TokenBucket.stats` for every bucket, keyed by endpoint.
+
+        Returns
+        -------
+        dict
+
+        """
+        stats = {endpoint: bucket.stats() for endpoint, bucket in self._buckets.items()}
+        if self._default is not None:
+            stats["*"] = self._default.stats()
+        return stats
+
+
+class AdaptiveConcurrencyLimiter(object):
+    """Bound the number of requests in flight, adjusting the bound by AIMD.
+
+    The limit starts low and grows by about one request per round trip while
+    requests succeed without their latency rising well above the fastest seen
+    so far (additive increase). A throttled or failed request cuts the limit
+    by :code:`decrease` (multiplicative decrease). Only one cut is made per
+    round trip: requests that were already in flight when the limit was cut
+    report the same congestion and are ignored.
+
+    Each change of the integer limit is logged and appended to
+    :attr:`history` as a :code:`(timestamp, concurrency)` pair.
+
+    Parameters
+    ----------
+    initial : integer, optional
+    minimum : integer, optional
+    maximum : integer, optional
+        Starting, smallest and largest number of concurrent requests.
+    decrease : float, optional
+        Factor the limit is multiplied by on congestion.
+    latency_tolerance : float, optional
+        The limit stops growing while request latency exceeds this multiple
+        of the lowest latency observed.
+    logger : logging.Logger, optional
+
+    """
+
+    def __init__(
+        self,
+        initial=cfg.INITIAL_CONCURRENCY,
+        minimum=1,
+        maximum=cfg.MAX_CONCURRENCY,
+        decrease=0.5,
+        latency_tolerance=2.0,
+        logger=None,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self._logger = logger
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._min_latency = None
+        self._last_decrease = 0.0
+        self._condition = Condition()
+        self.history = [(time.time(), self.concurrency)]
+
+    @property
+    def concurrency(self):
+        """Current maximum number of requests in flight."""
+        return int(self._limit)
+
+    @gen.coroutine
+    def acquire(self):
+        """Wait until a request may be sent. Pair with :meth:`release`."""
+        while self._in_flight >= self.concurrency:
+            yield self._condition.wait()
+        self._in_flight += 1
+
+    def release(self):
+        self._in_flight -= 1
+        self._condition.notify(max(self.concurrency - self._in_flight, 0))
+
+    def on_success(self, latency):
+        """Record a request that completed in :code:`latency` seconds."""
+        if self._min_latency is None or latency < self._min_latency:
+            self._min_latency = latency
+        if latency <= self.latency_tolerance * self._min_latency:
+            self._set_limit(self._limit + 1.0 / self._limit)
+
+    def on_congestion(self, start_time):
+        """Record a request started at :code:`start_time` that was throttled,
+        failed with a server error, or timed out."""
+        if start_time < self._last_decrease:
+            return
+        self._last_decrease = time.time()
+        self._set_limit(self._limit * self.decrease)
+
+    def _set_limit(self, limit):
+        old_concurrency = self.concurrency
+        self._limit = min(max(limit, self.minimum), self.maximum)
+        if self.concurrency != old_concurrency:
+            self.history.append((time.time(), self.concurrency))
+            if self._logger is not None:
+                self._logger.info(
+                    "Batch concurrency {} -> {}".format(
+                        old_concurrency, self.concurrency
+                    ),
+                    extra={"concurrency": self.concurrency},
+                )
+            self._condition.notify(max(self.concurrency - self._in_flight, 0))
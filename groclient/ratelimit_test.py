@@ -0,0 +1,174 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from groclient.ratelimit import AdaptiveConcurrencyLimiter, RateLimiter, TokenBucket
+
+MOCK_HOST = "pytest.groclient.url"
+
+
+class FakeClock(object):
+    """Stand-in for the time module whose sleep() advances monotonic()."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleep = MagicMock(side_effect=self.advance)
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch("groclient.ratelimit.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_spaces_requests(self):
+        bucket = TokenBucket(10)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertAlmostEqual(bucket.acquire(), 0.1)
+        self.assertAlmostEqual(bucket.acquire(), 0.1)
+        self.assertEqual(self.clock.sleep.call_count, 2)
+
+    def test_reserve_queues_concurrent_requests(self):
+        bucket = TokenBucket(10)
+        delays = [bucket.reserve() for _ in range(4)]
+        for delay, expected in zip(delays, [0, 0.1, 0.2, 0.3]):
+            self.assertAlmostEqual(delay, expected)
+        self.clock.sleep.assert_not_called()
+
+    def test_refills_while_idle(self):
+        bucket = TokenBucket(10, capacity=3)
+        for _ in range(3):
+            self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        self.clock.advance(10)
+        # The bucket holds at most capacity tokens, however long it was idle.
+        for _ in range(3):
+            self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+
+    def test_pause(self):
+        bucket = TokenBucket(10)
+        bucket.reserve()
+        bucket.pause(2)
+        self.assertAlmostEqual(bucket.reserve(), 2)
+        self.assertAlmostEqual(bucket.reserve(), 2.1)
+        # A shorter pause doesn't bring queued requests forward.
+        bucket.pause(0.5)
+        self.assertAlmostEqual(bucket.reserve(), 2.2)
+
+    def test_stats(self):
+        bucket = TokenBucket(4)
+        self.assertEqual(bucket.stats(), {"requests": 0, "wait_time": 0, "rate": 0})
+        for _ in range(5):
+            bucket.acquire()
+        stats = bucket.stats()
+        self.assertEqual(stats["requests"], 5)
+        self.assertAlmostEqual(stats["wait_time"], 1.0)
+        self.assertAlmostEqual(stats["rate"], 4.0)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+
+
+class RateLimiterTests(TestCase):
+    def setUp(self):
+        patcher = patch("groclient.ratelimit.time", FakeClock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_endpoint_rates(self):
+        limiter = RateLimiter(10, {"v2/data": 2})
+        data_url = "https://{}/v2/data".format(MOCK_HOST)
+        units_url = "https://{}/v2/units".format(MOCK_HOST)
+        self.assertEqual(limiter.reserve(data_url), 0)
+        self.assertAlmostEqual(limiter.reserve(data_url), 0.5)
+        self.assertEqual(limiter.reserve(units_url), 0)
+        self.assertAlmostEqual(limiter.reserve(units_url + "/allowed"), 0.1)
+        stats = limiter.stats()
+        self.assertEqual(set(stats), {"v2/data", "*"})
+        self.assertEqual(stats["v2/data"]["requests"], 2)
+        self.assertEqual(stats["*"]["requests"], 2)
+
+    def test_pause(self):
+        limiter = RateLimiter(10, {"v2/data": 2})
+        limiter.pause("https://{}/v2/units".format(MOCK_HOST), 3)
+        self.assertAlmostEqual(
+            limiter.reserve("https://{}/v2/regions".format(MOCK_HOST)), 3
+        )
+        self.assertEqual(limiter.reserve("https://{}/v2/data".format(MOCK_HOST)), 0)
+
+    def test_disabled(self):
+        limiter = RateLimiter(None)
+        for _ in range(100):
+            self.assertEqual(limiter.acquire("https://{}/v2/data".format(MOCK_HOST)), 0)
+        self.assertEqual(limiter.stats(), {})
+
+
+class AdaptiveConcurrencyLimiterTests(TestCase):
+    def test_additive_increase(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2, maximum=4)
+        # Grows by about one per window of successful requests.
+        limiter.on_success(0.1)
+        limiter.on_success(0.1)
+        self.assertEqual(limiter.concurrency, 2)
+        limiter.on_success(0.1)
+        self.assertEqual(limiter.concurrency, 3)
+        for _ in range(20):
+            limiter.on_success(0.1)
+        self.assertEqual(limiter.concurrency, 4)
+        self.assertEqual([c for _, c in limiter.history], [2, 3, 4])
+
+    def test_holds_while_latency_is_high(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2)
+        limiter.on_success(0.1)
+        for _ in range(10):
+            limiter.on_success(0.5)
+        self.assertEqual(limiter.concurrency, 2)
+
+    def test_multiplicative_decrease_once_per_round_trip(self):
+        logger = MagicMock()
+        limiter = AdaptiveConcurrencyLimiter(initial=16, logger=logger)
+        start_time = limiter.history[0][0]
+        for _ in range(8):
+            limiter.on_congestion(start_time)
+        self.assertEqual(limiter.concurrency, 8)
+        logger.info.assert_called_once_with(
+            "Batch concurrency 16 -> 8", extra={"concurrency": 8}
+        )
+        limiter.on_congestion(limiter.history[-1][0] + 1)
+        self.assertEqual(limiter.concurrency, 4)
+        for _ in range(10):
+            limiter.on_congestion(float("inf"))
+        self.assertEqual(limiter.concurrency, 1)
+
+    def test_acquire_waits_for_a_slot(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2)
+        in_flight = []
+        peak = []
+
+        @gen.coroutine
+        def request():
+            yield limiter.acquire()
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            yield gen.sleep(0.01)
+            in_flight.pop()
+            limiter.release()
+
+        @gen.coroutine
+        def main():
+            yield [request() for _ in range(6)]
+
+        IOLoop().run_sync(main)
+        self.assertEqual(len(peak), 6)
+        self.assertEqual(max(peak), 2)
@@ -0,0 +1,185 @@
+"""Unit conversion of data points.
+
+Every unit has a baseConvFactor, which converts its values to the base unit of
+its dimension: :code:`value * factor + offset`. :class:`UnitConverter` keeps
+the factors of all units in arrays, so whole columns of points are converted
+with a few NumPy operations, instead of a lookup and a function call per point.
+"""
+
+import numpy
+import pandas
+
+
+class UnitConverter(object):
+    """Convert data points between units.
+
+    Parameters
+    ----------
+    units : iterable of dicts
+        Units with their baseConvFactor, as returned by :code:`get_available("units")`, or the
+        values of :code:`lookup("units", unit_ids)`.
+    lookup_units : function, optional
+        Called with a list of ids of units that aren't in :code:`units`, returning them in a dict
+        like :code:`lookup("units", unit_ids)` does. Without it, converting from or to an unknown
+        unit raises a KeyError.
+
+    """
+
+    def __init__(self, units, lookup_units=None):
+        self._lookup_units = lookup_units
+        self._ids = pandas.Index([], dtype="int64")
+        self._factors = numpy.array([], dtype=float)
+        self._offsets = numpy.array([], dtype=float)
+        self.add_units(units)
+
+    def add_units(self, units):
+        """Add the factors of units. Units already known are left as they are."""
+        units = [unit for unit in units if int(unit["id"]) not in self._ids]
+        if not units:
+            return
+        conv_factors = [unit.get("baseConvFactor") or {} for unit in units]
+        self._ids = self._ids.append(pandas.Index([int(unit["id"]) for unit in units]))
+        # Units without a factor, like constant currencies, aren't convertible.
+        self._factors = numpy.append(
+            self._factors,
+            [conv_factor.get("factor") or numpy.nan for conv_factor in conv_factors],
+        )
+        self._offsets = numpy.append(
+            self._offsets,
+            [conv_factor.get("offset") or 0 for conv_factor in conv_factors],
+        )
+
+    def _positions(self, unit_ids):
+        positions = self._ids.get_indexer(unit_ids)
+        missing = pandas.unique(unit_ids[positions == -1])
+        if len(missing) and self._lookup_units is not None:
+            self.add_units(self._lookup_units([int(i) for i in missing]).values())
+            positions = self._ids.get_indexer(unit_ids)
+            missing = pandas.unique(unit_ids[positions == -1])
+        if len(missing):
+            raise KeyError("Unknown unit_id {}".format(int(missing[0])))
+        return positions
+
+    def _conversion(self, unit_ids, target_unit_id):
+        """Which points to convert, and the factors and offsets of their units
+        and of the target unit."""
+        unit_ids = pandas.Series(unit_ids, dtype=float).values
+        rows = ~numpy.isnan(unit_ids) & (unit_ids != target_unit_id)
+        if not rows.any():
+            return rows, None
+        positions = self._positions(unit_ids[rows])
+        factors = self._factors[positions]
+        unconvertible = numpy.isnan(factors)
+        if unconvertible.any():
+            raise Exception(
+                "unit_id {} is not convertible".format(
+                    int(unit_ids[rows][unconvertible][0])
+                )
+            )
+        (target,) = self._positions(numpy.array([target_unit_id], dtype=float))
+        if numpy.isnan(self._factors[target]):
+            raise Exception("unit_id {} is not convertible".format(target_unit_id))
+        return rows, (
+            factors,
+            self._offsets[positions],
+            self._factors[target],
+            self._offsets[target],
+        )
+
+    def convert(self, values, unit_ids, target_unit_id):
+        """Convert values to another unit.
+
+        Parameters
+        ----------
+        values : array-like of floats
+        unit_ids : array-like of integers
+            Unit of each value. Values with a null unit are left as they are.
+        target_unit_id : integer
+
+        Returns
+        -------
+        numpy.ndarray of floats
+
+        """
+        rows, conversion = self._conversion(unit_ids, target_unit_id)
+        return self._apply(values, rows, conversion)
+
+    @staticmethod
+    def _apply(values, rows, conversion):
+        values = numpy.array(values, dtype=float)
+        if rows.any():
+            # In the same order of operations as lib.convert_value, so results
+            # are identical to converting points one by one.
+            factors, offsets, target_factor, target_offset = conversion
+            values[rows] = (
+                values[rows] * factors + offsets - target_offset
+            ) / target_factor
+        return values
+
+    def convert_columns(self, columns, target_unit_id):
+        """Convert columns of points to another unit, in place.
+
+        Parameters
+        ----------
+        columns : pandas.DataFrame or dict of arrays
+            Points, as returned by :meth:`GroClient.get_df` or
+            :func:`groclient.lib.list_of_series_to_columns`. value and metadata_conf_interval are
+            converted, and unit_id set to the target.
+        target_unit_id : integer
+
+        Returns
+        -------
+        pandas.DataFrame or dict of arrays
+            :code:`columns`
+
+        """
+        rows, conversion = self._conversion(columns["unit_id"], target_unit_id)
+        if not rows.any():
+            return columns
+        for column in ["value", "metadata_conf_interval"]:
+            if column in columns:
+                columns[column] = self._apply(columns[column], rows, conversion)
+        columns["unit_id"] = numpy.where(
+            rows, target_unit_id, numpy.asarray(columns["unit_id"])
+        )
+        return columns
+
+    def convert_points(self, points, target_unit_id):
+        """Convert points to another unit, in place.
+
+        Parameters
+        ----------
+        points : list of dicts
+            Points, as returned by :meth:`GroClient.get_data_points`. value and
+            metadata.conf_interval are converted, and unit_id set to the target.
+        target_unit_id : integer
+
+        Returns
+        -------
+        list of dicts
+            :code:`points`
+
+        """
+        rows, conversion = self._conversion(
+            [point.get("unit_id") for point in points], target_unit_id
+        )
+        converted = [point for point, row in zip(points, rows) if row]
+        if not converted:
+            return points
+        values = self._apply(
+            [point.get("value") for point in converted], rows[rows], conversion
+        )
+        conf_intervals = self._apply(
+            [(point.get("metadata") or {}).get("conf_interval") for point in converted],
+            rows[rows],
+            conversion,
+        )
+        for point, value, conf_interval in zip(
+            converted, values.tolist(), conf_intervals.tolist()
+        ):
+            if point.get("value") is not None:
+                point["value"] = value
+            if (point.get("metadata") or {}).get("conf_interval") is not None:
+                point["metadata"]["conf_interval"] = conf_interval
+            point["unit_id"] = target_unit_id
+        return points
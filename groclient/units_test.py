@@ -0,0 +1,74 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+from groclient import lib
+from groclient.mock_data import mock_entities
+from groclient.units import UnitConverter
+
+UNITS = mock_entities["units"]
+
+
+class UnitConverterTests(TestCase):
+    def setUp(self):
+        self.converter = UnitConverter(UNITS.values())
+
+    def test_convert(self):
+        values = [1.5, None, 3, 4]
+        unit_ids = [36, 36, None, 37]
+        converted = self.converter.convert(values, unit_ids, 37)
+        expected = lib.convert_value(
+            1.5, UNITS[36]["baseConvFactor"], UNITS[37]["baseConvFactor"]
+        )
+        np.testing.assert_array_equal(converted, [expected, np.nan, 3, 4])
+
+    def test_not_convertible(self):
+        with self.assertRaisesRegex(Exception, "unit_id 43 is not convertible"):
+            self.converter.convert([1], [43], 10)
+        with self.assertRaisesRegex(Exception, "unit_id 43 is not convertible"):
+            self.converter.convert([1], [10], 43)
+        # Nothing to convert.
+        self.assertEqual(list(self.converter.convert([1], [43], 43)), [1])
+        with self.assertRaises(KeyError):
+            self.converter.convert([1], [10], 99)
+
+    def test_lookup_missing_units(self):
+        lookup_units = MagicMock(
+            return_value={"99": {"id": 99, "baseConvFactor": {"factor": 10}}}
+        )
+        converter = UnitConverter([UNITS[10]], lookup_units)
+        self.assertEqual(list(converter.convert([1, 2], [99, 99], 10)), [10, 20])
+        self.assertEqual(list(converter.convert([3], [99], 10)), [30])
+        lookup_units.assert_called_once_with([99])
+
+    def test_convert_columns(self):
+        df = pd.DataFrame(
+            {
+                "value": [1, 2, 3],
+                "unit_id": [14, 10, np.nan],
+                "metadata_conf_interval": [0.5, None, 1],
+            }
+        )
+        self.converter.convert_columns(df, 10)
+        self.assertEqual(list(df["value"]), [1000, 2, 3])
+        self.assertEqual(list(df["unit_id"].fillna(0)), [10, 10, 0])
+        self.assertEqual(list(df["metadata_conf_interval"].fillna(0)), [500, 0, 1])
+
+    def test_convert_points(self):
+        points = [
+            {"value": 1, "unit_id": 14, "metadata": {"conf_interval": 0.5}},
+            {"value": None, "unit_id": 14, "metadata": {}},
+            {"value": 2, "unit_id": None},
+            {"value": 3, "unit_id": 10},
+        ]
+        self.assertEqual(
+            self.converter.convert_points(points, 10),
+            [
+                {"value": 1000, "unit_id": 10, "metadata": {"conf_interval": 500}},
+                {"value": None, "unit_id": 10, "metadata": {}},
+                {"value": 2, "unit_id": None},
+                {"value": 3, "unit_id": 10},
+            ],
+        )
@@ -135,6 +135,38 @@ def list_chunk(arr, chunk_size=50):
     ]
 
 
+def list_chunk_by_size(arr, max_size, get_size=len):
+    """Chunk an array so each chunk's item sizes add up to at most max_size.
+
+    An item bigger than max_size on its own gets a chunk to itself.
+
+    >>> list_chunk_by_size(["a", "bb", "ccc", "dddd"], 5)
+    [['a', 'bb'], ['ccc'], ['dddd']]
+
+    Parameters
+    ----------
+    arr : list
+    max_size : int
+    get_size : function, optional
+        Size of an item. Defaults to its length.
+
+    Returns
+    -------
+    list of lists
+
+    """
+    chunks = []
+    chunk_size = 0
+    for item in arr:
+        item_size = get_size(item)
+        if not chunks or chunk_size + item_size > max_size:
+            chunks.append([])
+            chunk_size = 0
+        chunks[-1].append(item)
+        chunk_size += item_size
+    return chunks
+
+
 def intersect(lhs_list, rhs_list):
     """Return the common elements of two lists
 
@@ -6,6 +6,7 @@ from groclient.utils import (
     dict_reformat_keys,
     dict_unnest,
     list_chunk,
+    list_chunk_by_size,
     intersect,
     zip_selections,
 )
@@ -63,6 +64,14 @@ class UtilsTests(TestCase):
             [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10], [11]],
         )
 
+    def test_list_chunk_by_size(self):
+        self.assertEqual(
+            list_chunk_by_size([1, 22, 333, 4444, 1], 5, lambda x: len(str(x))),
+            [[1, 22], [333], [4444, 1]],
+        )
+        self.assertEqual(list_chunk_by_size(["abcdef", "a"], 3), [["abcdef"], ["a"]])
+        self.assertEqual(list_chunk_by_size([], 3), [])
+
     def test_intersect(self):
         self.assertEqual(intersect([1, 2, 3], [4, 5, 6]), [])
         self.assertEqual(intersect([1, 2, 3], [4, 5, 6, 2]), [2])